@@ -14,7 +14,6 @@ Security note: this executes arbitrary Jusu++ code; run only in trusted or sandb
 import argparse
 import json
 import socketserver
-import tempfile
 import subprocess
 import sys
 from pathlib import Path
@@ -37,16 +36,14 @@ class JSONTCPHandler(socketserver.StreamRequestHandler):
             cmd = req.get('cmd')
             if cmd == 'run_script' or cmd == 'run_script_path':
                 if cmd == 'run_script':
+                    # the script is sent over the child's stdin; no temp file
                     script = req.get('script', '')
                     if not script:
                         self.wfile.write(json.dumps({'ok': False, 'error': 'empty script'}).encode('utf-8') + b"\n")
                         continue
-                    tmpf = tempfile.NamedTemporaryFile(prefix='jusu_', suffix='.jusu', delete=False)
-                    tmpf.write(script.encode('utf-8'))
-                    tmpf.flush()
-                    tmpf.close()
-                    path = tmpf.name
+                    path = '-'
                 else:
+                    script = None
                     path = req.get('script_path')
                     if not path or not Path(path).exists():
                         self.wfile.write(json.dumps({'ok': False, 'error': 'script_path not found'}).encode('utf-8') + b"\n")
@@ -56,7 +53,11 @@ class JSONTCPHandler(socketserver.StreamRequestHandler):
                     if getattr(self.server, 'use_sandbox', False):
                         from runtime import sandbox
                         mem = getattr(self.server, 'memory_limit_mb', None)
-                        result = sandbox.run_file(path, timeout=req.get('timeout', 5), memory_limit_mb=mem, backend=req.get('backend', 'interp'))
+                        kwargs = dict(timeout=req.get('timeout', 5), memory_limit_mb=mem, backend=req.get('backend', 'interp'))
+                        if script is not None:
+                            result = sandbox.run_source(script, **kwargs)
+                        else:
+                            result = sandbox.run_file(path, **kwargs)
                         resp = {
                             'ok': True if result.get('returncode') == 0 and not result.get('timed_out') else False,
                             'stdout': result.get('stdout', ''),
@@ -66,7 +67,7 @@ class JSONTCPHandler(socketserver.StreamRequestHandler):
                             'killed': result.get('killed', False),
                         }
                     else:
-                        proc = subprocess.run([sys.executable, 'compiler/jusu.py', 'run', str(path)], capture_output=True, text=True, timeout=req.get('timeout', 5))
+                        proc = subprocess.run([sys.executable, 'compiler/jusu.py', 'run', str(path)], input=script, capture_output=True, text=True, timeout=req.get('timeout', 5))
                         resp = {'ok': True, 'stdout': proc.stdout, 'stderr': proc.stderr, 'returncode': proc.returncode}
                 except subprocess.TimeoutExpired:
                     resp = {'ok': False, 'error': 'timeout'}
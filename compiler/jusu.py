@@ -3,54 +3,202 @@
 Jusu++ Language Compiler and Interpreter
 Main Entry Point
 """
+import argparse
 import sys
 import os
 
 # Ensure project root is in sys.path so imports like runtime and compiler resolve
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-def main():
+VERSION = "Jusu++ Language v0.1.0"
+
+
+def build_parser():
+    """Argument parser for the `jusu` command line."""
+    from runtime.compiler import BACKENDS
+    parser = argparse.ArgumentParser(
+        prog='jusu', description='Run Jusu++ programs (no command starts the REPL).',
+        fromfile_prefix_chars='@', formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""examples:
+  jusu                                 start the REPL
+  jusu run hello.jusu                  run a program
+  jusu run --backend regvm --time a.jusu b.jusu
+                                       run two programs on the register VM with timings
+  jusu profile -o prog.folded prog.jusu
+                                       profile a program, stacks for flamegraph.pl
+  jusu build prog.jusu -o lib/prog     compile functions ahead of time""")
+    parser.add_argument('-v', '--version', action='store_true', help='show the version')
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    run = commands.add_parser(
+        'run', help='run Jusu++ programs', fromfile_prefix_chars='@',
+        description='Run one or more Jusu++ programs. Several files (or @list, a file '
+                    'with one path per line) run in one process, sharing JIT state; '
+                    "'-' reads a program from standard input.")
+    run.add_argument('files', nargs='+', metavar='file.jusu')
+    run.add_argument('--backend', choices=BACKENDS, default='interp',
+                     help='execution backend (default: interp)')
+    run.add_argument('--vm', dest='backend', action='store_const', const='vm',
+                     help='same as --backend vm')
+    run.add_argument('--time', action='store_true',
+                     help='print lex/parse/compile/execute timings per file')
+    run.add_argument('-q', '--quiet', action='store_true',
+                     help='print only the program output')
+    run.add_argument('--stats', metavar='path',
+                     help="count ops, calls, name lookups and stack depth; write JSON to path ('-': stdout)")
+    run.add_argument('--jit-stats', action='store_true',
+                     help='print per-function JIT statistics after the run')
+    run.add_argument('--no-jit', action='store_true', help='never compile functions to native code')
+    run.add_argument('--jit-threshold', type=int, metavar='N',
+                     help='calls before a function is compiled')
+    run.add_argument('--jit-disable', metavar='f,g', help='never compile the named functions')
+    run.add_argument('--jit-opt', metavar='N', help='LLVM optimization level 0-3 for native code')
+    run.add_argument('--native', metavar='lib.json', help='bind functions from a `jusu build` library')
+
+    profile = commands.add_parser(
+        'profile', help='run a program and report where its time goes',
+        description='Run a Jusu++ program under the profiler and print a flat profile '
+                    'of its functions and lines.')
+    profile.add_argument('file', metavar='file.jusu')
+    profile.add_argument('--backend', choices=BACKENDS, default='interp',
+                         help='execution backend (default: interp)')
+    profile.add_argument('--mode', choices=('sample', 'deterministic'), default='sample',
+                         help='sample the stack (default) or trace every call and statement (interp only)')
+    profile.add_argument('--interval', type=float, default=1.0, metavar='MS',
+                         help='sampling interval in milliseconds of CPU time (default: 1)')
+    profile.add_argument('--limit', type=int, default=20, metavar='N',
+                         help='rows per table (default: 20)')
+    profile.add_argument('-o', '--collapsed', metavar='path',
+                         help='write collapsed stacks for flamegraph tools to path')
+
+    build = commands.add_parser('build', help='compile functions to a shared library + manifest')
+    build.add_argument('file', metavar='file.jusu')
+    build.add_argument('-o', dest='output', metavar='path',
+                       help='output path without suffix (default: the file name)')
+    build.add_argument('--opt', dest='opt_level', metavar='N', help='LLVM optimization level 0-3')
+    build.add_argument('--cpu', metavar='name', help="target CPU ('generic' for a portable library)")
+    return parser
+
+
+def format_timings(timings):
+    """One line of per-phase times in milliseconds."""
+    from runtime.compiler import PHASES
+    phases = '  '.join(f"{phase} {timings[phase] * 1e3:.2f}" for phase in PHASES)
+    return f"{phases}  total {sum(timings.values()) * 1e3:.2f} ms"
+
+
+def _stats_path(path, filename, batch):
+    # one JSON file per program in a batch: <path stem>.<program stem>.json
+    if path is None or path == '-' or not batch:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{os.path.splitext(os.path.basename(filename))[0]}{ext or '.json'}"
+
+
+def run_command(args):
+    """`jusu run`: every file in one process; exit status 1 if any failed."""
+    from runtime import tiering
+    policy = tiering.TieringPolicy.from_env()
+    if args.no_jit:
+        policy.jit = False
+    if args.jit_threshold is not None:
+        policy.thresholds['jit'] = args.jit_threshold
+    if args.jit_disable:
+        for fn_name in args.jit_disable.split(','):
+            policy.disable(fn_name.strip())
+    if args.jit_opt is not None:
+        from runtime import jit
+        if jit._HAS_LLVM:
+            jit.set_engine(jit.JITEngine(opt_level=args.jit_opt))
+    tiering.set_policy(policy)
+
+    from runtime.compiler import compile_and_run, load_native_library
+    if args.native:
+        load_native_library(args.native)
+    batch = len(args.files) > 1
+    failed = []
+    total = {}
+    for filename in args.files:
+        timings = {} if args.time else None
+        try:
+            compile_and_run(filename, backend=args.backend, quiet=args.quiet, timings=timings,
+                            stats=_stats_path(args.stats, filename, batch))
+        except SystemExit:
+            # compile_and_run reported the error; a batch goes on with the next file
+            failed.append(filename)
+            if not batch:
+                raise
+        if timings:
+            print(f"[time] {filename}: {format_timings(timings)}" if batch else f"[time] {format_timings(timings)}")
+            for phase, seconds in timings.items():
+                total[phase] = total.get(phase, 0.0) + seconds
+    if batch and total:
+        print(f"[time] all {len(args.files)} files: {format_timings(total)}")
+    if args.jit_stats:
+        print(tiering.format_stats())
+    if batch and not args.quiet:
+        print(f"{len(args.files) - len(failed)} of {len(args.files)} programs succeeded")
+    if failed:
+        sys.exit(1)
+
+
+def profile_command(args):
+    """`jusu profile`: run a file under runtime.profiler and print the profile."""
+    from runtime.profiler import profile_source
+    try:
+        with open(args.file, 'r') as f:
+            source_code = f.read()
+        profiler = profile_source(source_code, backend=args.backend, mode=args.mode,
+                                  interval=args.interval / 1e3, filename=os.path.basename(args.file))
+    except FileNotFoundError:
+        print(f"Error: File '{args.file}' not found")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(profiler.format_flat(args.limit))
+    if args.collapsed:
+        with open(args.collapsed, 'w') as f:
+            f.write(profiler.collapsed())
+        print(f"\nCollapsed stacks written to {args.collapsed}")
+
+
+def build_command(args):
+    """`jusu build`: compile the functions of a file ahead of time."""
+    from runtime.compiler import build_native_library
+    options = {k: v for k, v in (('output', args.output), ('opt_level', args.opt_level),
+                                 ('cpu', args.cpu)) if v is not None}
+    try:
+        manifest = build_native_library(args.file, **options)
+    except Exception as e:
+        print(f"Build failed: {e}")
+        sys.exit(1)
+    print(f"Built {manifest['library']}: {', '.join(manifest['functions']) or 'no functions'}")
+    if manifest['skipped']:
+        print(f"Interpreted (not compilable): {', '.join(manifest['skipped'])}")
+
+
+def main(argv=None):
     """Main entry point for Jusu++"""
-    print("Jusu++ Language v0.1.0")
-    print("======================")
-    
-    if len(sys.argv) == 1:
+    args = build_parser().parse_args(argv)
+    if args.version:
+        print(VERSION)
+        return
+    if not getattr(args, 'quiet', False):
+        print(VERSION)
+        print("======================")
+
+    if args.command == 'run':
+        run_command(args)
+    elif args.command == 'profile':
+        profile_command(args)
+    elif args.command == 'build':
+        build_command(args)
+    else:
         # No arguments - start REPL
         from runtime.repl import start_repl
         start_repl()
-    elif sys.argv[1] == "run" and len(sys.argv) == 3:
-        # Run a file: jusu run [--vm] filename.jusu
-        # Usage: jusu run <file>      (interpreter)
-        #        jusu run --vm <file> (VM backend)
-        if sys.argv[2] == '--vm' and len(sys.argv) == 4:
-            filename = sys.argv[3]
-            backend = 'vm'
-        else:
-            filename = sys.argv[2]
-            backend = 'interp'
-        from runtime.compiler import compile_and_run
-        compile_and_run(filename, backend=backend)
-    elif sys.argv[1] == "--help" or sys.argv[1] == "-h":
-        show_help()
-    elif sys.argv[1] == "--version" or sys.argv[1] == "-v":
-        print("Jusu++ Language v0.1.0")
-    else:
-        print(f"Unknown command: {sys.argv[1]}")
-        show_help()
-
-def show_help():
-    """Show help message"""
-    print("""
-Usage:
-  jusu                     Start interactive REPL
-  jusu run <file.jusu>     Run a Jusu++ program
-  jusu --help              Show this help
-  jusu --version           Show version
-  
-Examples:
-  jusu                     # Start REPL
-  jusu run hello.jusu      # Run a program
-    """)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,31 +1,51 @@
 """Helper module executed in a subprocess to enforce child-side limits
 
-Usage: python -m runtime._sandbox_child --file <file> --backend <backend> [--mem MB]
+Usage: python -m runtime._sandbox_child --file <file|-> --backend <backend> [--mem MB] [--cpu S] [--stats-fd N]
+       python -m runtime._sandbox_child --serve [--mem MB]
+       python -m runtime._sandbox_child --zygote [--mem MB]
 
-This module sets RLIMIT_AS (address space) to limit memory (on Unix) then
-imports the runtime compiler and runs the target file using compile_and_run.
+This module sets RLIMIT_AS (address space) to limit memory and RLIMIT_CPU
+to limit CPU seconds (on Unix) then imports the runtime compiler and runs the
+target file using compile_and_run. `--file -` reads the program from stdin
+instead, so callers need no temp file. With --stats-fd the run is
+instrumented (runtime/instrument.py) and the counters are written to that
+file descriptor as JSON.
 Any unhandled exception will be printed and the process will exit with non-zero.
+
+With --serve the process is a worker of runtime.sandbox.SandboxPool: it
+applies the limits and imports the runtime once, then reads one JSON request
+per line from stdin ({"file": path} or {"source": text}, plus "backend",
+"cpu" and "counters") and answers each with one JSON line ({"returncode",
+"stdout", "stderr", "usage", "counters"}) on its original stdout.
+
+With --zygote the process is the fork server of runtime.sandbox.ForkServer:
+it imports the runtime once and, for each request
+({"file" or "source", "backend", "timeout", "cpu", "counters"}), forks a
+child that applies the limits and runs the program, so every run gets a fresh
+copy-on-write address space. The answer also carries "timed_out" and
+"killed", and "usage" is the child's own resource usage.
 """
 import sys
 import argparse
 import traceback
 
 
-def main():
-    p = argparse.ArgumentParser()
-    p.add_argument('--file', required=True)
-    p.add_argument('--backend', default='interp')
-    p.add_argument('--mem', type=int, default=0, help='Memory limit in MB (Unix only)')
-    args = p.parse_args()
-
+def apply_limits(mem, cpu=0):
+    """Memory limit (MB), CPU limit (seconds; Unix only) and, where available,
+    seccomp or a Job object."""
     # Try to apply memory limit (Unix only)
-    if args.mem and args.mem > 0:
+    if mem and mem > 0:
         try:
             import resource
-            soft = hard = args.mem * 1024 * 1024
+            soft = hard = mem * 1024 * 1024
             resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
         except Exception as e:
             print(f"[sandbox-child] warning: could not set memory limit: {e}", file=sys.stderr)
+    if cpu and cpu > 0:
+        try:
+            limit_cpu(cpu)
+        except Exception as e:
+            print(f"[sandbox-child] warning: could not set CPU limit: {e}", file=sys.stderr)
 
     # Optionally attempt to enable seccomp on Linux if python 'seccomp' is available.
     if sys.platform.startswith('linux'):
@@ -65,15 +85,260 @@ def main():
         except Exception:
             print('[sandbox-child] Windows Job object not enabled (pywin32 missing or unsupported)', file=sys.stderr)
 
+
+def limit_cpu(seconds, hard_kill=True):
+    """SIGXCPU after `seconds` more CPU time than this process has used so
+    far, to the nearest whole second (RLIMIT_CPU's unit). With hard_kill,
+    SIGKILL follows a second later; otherwise the hard limit is left alone
+    so the soft limit can be moved again."""
+    import resource
+    ru = resource.getrusage(resource.RUSAGE_SELF)
+    soft = max(1, round(ru.ru_utime + ru.ru_stime + seconds))
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    elif hard_kill:
+        hard = soft + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def usage(ru, since=None):
+    """Resource usage dict from a `resource.struct_rusage`; with `since`,
+    times and context switches are the difference (max RSS is still the
+    process peak)."""
+    max_rss = ru.ru_maxrss // 1024 if sys.platform == 'darwin' else ru.ru_maxrss  # kB
+    base = since or (0.0, 0.0, 0, 0)
+    return {
+        'user_time': ru.ru_utime - base[0],
+        'system_time': ru.ru_stime - base[1],
+        'max_rss_kb': max_rss,
+        'voluntary_switches': ru.ru_nvcsw - base[2],
+        'involuntary_switches': ru.ru_nivcsw - base[3],
+    }
+
+
+def run(path, backend):
+    """Run one file like `python -m runtime._sandbox_child --file`; returns the exit status."""
     try:
         from runtime.compiler import compile_and_run
-        compile_and_run(args.file, backend=args.backend)
-    except SystemExit:
-        # allow SystemExit to propagate
-        raise
+        compile_and_run(path, backend=backend)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
     except Exception:
         traceback.print_exc()
-        sys.exit(2)
+        return 2
+    return 0
+
+
+def run_counted(path, backend):
+    """run() with instrumentation; returns the exit status and the counters dict.
+
+    Runs without native code, like budgeted runs: calls inside JIT-compiled
+    code would not be counted.
+    """
+    from runtime import instrument, tiering
+    tiering.suspend_native()
+    instrument.enable()
+    try:
+        code = run(path, backend)
+    finally:
+        counters = instrument.disable()
+        tiering.resume_native()
+    return code, counters.to_dict()
+
+
+def _replies():
+    """Channel for answers: the original stdout. Anything else printed
+    outside a request (limit warnings, stray output) goes to stderr."""
+    import os
+    replies = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    os.dup2(2, 1)
+    return replies
+
+
+def _warm_up(replies):
+    # import the runtime once, ahead of the first request
+    import json
+    import runtime.compiler  # noqa: F401
+    from runtime import stdlib
+    stdlib.get_builtins()
+    # plugins may replace stdlib modules, so the first use of one scans them
+    stdlib._scan_plugins()
+    # imported on the first function declaration; no threads start here,
+    # so the zygote can still fork safely
+    import runtime.tiering  # noqa: F401
+    import runtime.jit  # noqa: F401
+    import runtime.instrument  # noqa: F401
+    replies.write(json.dumps({'ready': True}) + '\n')
+    replies.flush()
+
+
+def serve(mem):
+    import contextlib
+    import io
+    import json
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    replies = _replies()
+    apply_limits(mem)
+    _warm_up(replies)
+
+    requests = sys.stdin
+    for line in requests:
+        request = json.loads(line)
+        # programs never read the request channel; a source request is their stdin
+        sys.stdin = io.StringIO(request.get('source', ''))
+        path, backend = request.get('file', '-'), request.get('backend', 'interp')
+        if resource is not None:
+            if request.get('cpu'):
+                limit_cpu(request['cpu'], hard_kill=False)
+            ru = resource.getrusage(resource.RUSAGE_SELF)
+            before = (ru.ru_utime, ru.ru_stime, ru.ru_nvcsw, ru.ru_nivcsw)
+        out, err = io.StringIO(), io.StringIO()
+        counters = None
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            if request.get('counters'):
+                code, counters = run_counted(path, backend)
+            else:
+                code = run(path, backend)
+        used = None
+        if resource is not None:
+            # the worker's own usage during the run; max RSS is its peak so far
+            used = usage(resource.getrusage(resource.RUSAGE_SELF), before)
+            if request.get('cpu'):
+                hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+                resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        replies.write(json.dumps({'returncode': code, 'stdout': out.getvalue(), 'stderr': err.getvalue(),
+                                  'usage': used, 'counters': counters}) + '\n')
+        replies.flush()
+
+
+def _fork_run(request, mem, replies):
+    """Run one request in a forked child; returns the answer dict."""
+    import io
+    import json
+    import os
+    import selectors
+    import signal
+    import time
+
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    stats_r, stats_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # child: fresh copy of the warmed-up zygote, with its own CPU clock
+        code = 1
+        try:
+            replies.close()
+            os.close(out_r)
+            os.close(err_r)
+            os.close(stats_r)
+            null = os.open(os.devnull, os.O_RDONLY)
+            os.dup2(null, 0)
+            os.dup2(out_w, 1)
+            os.dup2(err_w, 2)
+            sys.stdin = io.StringIO(request.get('source', ''))
+            apply_limits(mem, request.get('cpu'))
+            path, backend = request.get('file', '-'), request.get('backend', 'interp')
+            if request.get('counters'):
+                code, counters = run_counted(path, backend)
+                with os.fdopen(stats_w, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(counters))
+            else:
+                code = run(path, backend)
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    os.close(out_w)
+    os.close(err_w)
+    os.close(stats_w)
+    chunks = {out_r: [], err_r: [], stats_r: []}
+    timeout = request.get('timeout')
+    deadline = None if timeout is None else time.monotonic() + timeout
+    timed_out = False
+    with selectors.DefaultSelector() as sel:
+        for fd in chunks:
+            sel.register(fd, selectors.EVENT_READ)
+        while sel.get_map():
+            wait = None if deadline is None else deadline - time.monotonic()
+            if wait is not None and wait <= 0:
+                if not timed_out:
+                    timed_out = True
+                    os.kill(pid, signal.SIGKILL)
+                # the pipes close once the killed child is gone
+                wait = None
+            for key, _ in sel.select(wait):
+                data = os.read(key.fd, 65536)
+                if data:
+                    chunks[key.fd].append(data)
+                else:
+                    sel.unregister(key.fd)
+                    os.close(key.fd)
+    _, status, ru = os.wait4(pid, 0)
+    stats = b''.join(chunks[stats_r])
+    return {
+        'returncode': None if timed_out else os.waitstatus_to_exitcode(status),
+        'stdout': b''.join(chunks[out_r]).decode('utf-8', 'replace'),
+        'stderr': b''.join(chunks[err_r]).decode('utf-8', 'replace'),
+        'timed_out': timed_out,
+        'killed': timed_out,
+        'usage': usage(ru),
+        'counters': json.loads(stats) if stats else None,
+    }
+
+
+def zygote(mem):
+    import json
+
+    replies = _replies()
+    _warm_up(replies)
+
+    for line in sys.stdin:
+        answer = _fork_run(json.loads(line), mem, replies)
+        replies.write(json.dumps(answer) + '\n')
+        replies.flush()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--file')
+    p.add_argument('--backend', default='interp')
+    p.add_argument('--mem', type=int, default=0, help='Memory limit in MB (Unix only)')
+    p.add_argument('--cpu', type=float, default=0, help='CPU time limit in seconds (Unix only)')
+    p.add_argument('--stats-fd', type=int, help='Write instrumentation counters as JSON to this fd')
+    p.add_argument('--serve', action='store_true', help='Run requests from stdin (SandboxPool worker)')
+    p.add_argument('--zygote', action='store_true', help='Fork a child per request from stdin (ForkServer)')
+    args = p.parse_args()
+
+    if args.serve:
+        serve(args.mem)
+        return
+    if args.zygote:
+        zygote(args.mem)
+        return
+    if args.file is None:
+        p.error('--file is required')
+
+    apply_limits(args.mem, args.cpu)
+    if args.stats_fd is None:
+        sys.exit(run(args.file, args.backend))
+    import json
+    import os
+    code, counters = run_counted(args.file, args.backend)
+    with os.fdopen(args.stats_fd, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(counters))
+    sys.exit(code)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,123 @@
+"""
+Execution budgets for running untrusted Jusu++ code in-process.
+
+A `Budget` limits a run to `steps` function calls (the language has no loops,
+so calls are the only way to execute code more often than it is written) and
+caps the length of strings and lists it builds at `max_size`. Exceeding
+either raises `BudgetExceeded`, which callers can catch like any other error.
+
+Backends only pay for budgets in budgeted runs: the Interpreter checks at
+function calls and string operations, while the VM and RegisterVM check
+`self.budget` in their dispatch loop to count a step at every call and route
+`+` and `*` through size checks. `range` and `list` builtins are wrapped for
+the length of the run. Native (JIT-compiled) code is not used in budgeted
+runs, since it does not count steps.
+
+    budget = Budget(steps=10000, max_size=100000)
+    run_source(src, 'regvm', budget=budget)
+"""
+import contextlib
+import math
+
+_SEQUENCES = (str, list, tuple)
+
+
+class BudgetExceeded(RuntimeError):
+    """A run used up its Budget; `kind` is 'steps' or 'size'."""
+
+    def __init__(self, kind, limit):
+        super().__init__(f"{kind} budget of {limit} exceeded")
+        self.kind = kind
+        self.limit = limit
+
+
+class Budget:
+    """Step and size limits for one run; None means unlimited."""
+
+    def __init__(self, steps=None, max_size=None):
+        self.steps = steps
+        self.max_size = max_size
+        self._left = math.inf if steps is None else steps
+        self._size = math.inf if max_size is None else max_size
+
+    @property
+    def used(self):
+        """Steps taken so far."""
+        return 0 if self.steps is None else self.steps - self._left
+
+    def step(self):
+        if self._left < 1:
+            raise BudgetExceeded('steps', self.steps)
+        self._left -= 1
+
+    def check_size(self, n):
+        if n > self._size:
+            raise BudgetExceeded('size', self.max_size)
+
+    def add(self, a, b):
+        """a + b, refusing sequences longer than max_size."""
+        if type(a) in _SEQUENCES and type(b) in _SEQUENCES:
+            self.check_size(len(a) + len(b))
+        return a + b
+
+    def mul(self, a, b):
+        """a * b, refusing repeated sequences longer than max_size."""
+        if type(a) in _SEQUENCES and type(b) is int:
+            self.check_size(len(a) * b)
+        elif type(b) in _SEQUENCES and type(a) is int:
+            self.check_size(len(b) * a)
+        return a * b
+
+    def wrap_builtins(self, names):
+        """Size-checked replacements for the `range` and `list` entries of `names`."""
+        wrapped = {}
+        if 'range' in names:
+            make_range = names['range']
+
+            def budget_range(*args):
+                self.check_size(len(range(*map(int, args))))
+                return make_range(*args)
+            wrapped['range'] = budget_range
+        if 'list' in names:
+            make_list = names['list']
+
+            def budget_list(*args):
+                # the VMs' list(iterable) could expand a huge range
+                if len(args) == 1 and hasattr(args[0], '__len__'):
+                    self.check_size(len(args[0]))
+                else:
+                    self.check_size(len(args))
+                return make_list(*args)
+            wrapped['list'] = budget_list
+        return wrapped
+
+
+@contextlib.contextmanager
+def _wrapped_builtins(vm):
+    # the VMs keep builtins in `vm.globals`; put the originals back afterwards
+    # unless the program rebound the name
+    wrapped = vm.budget.wrap_builtins(vm.globals)
+    saved = {name: vm.globals[name] for name in wrapped}
+    cache = getattr(vm, 'name_cache', {})
+    vm.globals.update(wrapped)
+    for name in wrapped:
+        cache.pop(name, None)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if vm.globals.get(name) is wrapped[name]:
+                vm.globals[name] = value
+                cache.pop(name, None)
+
+
+def run_vm(vm, instructions, consts, names, lines):
+    """VM.run within vm.budget."""
+    with _wrapped_builtins(vm):
+        return vm._run(instructions, consts, names, lines)
+
+
+def execute_regvm(vm, code, regs):
+    """RegisterVM._execute within vm.budget."""
+    with _wrapped_builtins(vm):
+        return vm._execute(code, regs)
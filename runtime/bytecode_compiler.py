@@ -37,6 +37,8 @@ class BytecodeCompiler:
         self.consts = []
         self.names = []
         self.instructions = []
+        # line table: source line of the statement each instruction came from
+        self.lines = []
 
     def _add_const(self, v):
         try:
@@ -60,9 +62,23 @@ class BytecodeCompiler:
             self.compile_stmt(stmt)
         # ensure top-level returns None
         self.instructions.append((RETURN_VALUE, None))
+        self._mark_lines(len(self.instructions) - 1, None)
         return self.instructions, self.consts, self.names
 
+    def _mark_lines(self, start, node):
+        # instructions from `start` not claimed by a nested statement get node's line
+        line = getattr(node, 'line', None)
+        self.lines.extend([None] * (len(self.instructions) - len(self.lines)))
+        for i in range(start, len(self.instructions)):
+            if self.lines[i] is None:
+                self.lines[i] = line
+
     def compile_stmt(self, node):
+        start = len(self.instructions)
+        self._compile_stmt(node)
+        self._mark_lines(start, node)
+
+    def _compile_stmt(self, node):
         # Helper to append instruction
         def emit(op, arg=None):
             self.instructions.append((op, arg))
@@ -80,7 +96,11 @@ class BytecodeCompiler:
             for s in node.body:
                 compiler.compile_stmt(s)
             compiler.instructions.append((RETURN_VALUE, None))
-            code_obj = ('code', compiler.instructions, compiler.consts, compiler.names, node.params)
+            compiler._mark_lines(len(compiler.instructions) - 1, None)
+            # the declaration is kept so the VM can JIT-compile hot functions,
+            # the line table for profiling (runtime/profiler.py)
+            code_obj = ('code', compiler.instructions, compiler.consts, compiler.names, node.params, node,
+                        compiler.lines)
             const_idx = self._add_const(code_obj)
             name_idx = self._add_name(node.name)
             emit(LOAD_CONST, const_idx)
@@ -135,8 +155,9 @@ class BytecodeCompiler:
             name_idx = self._add_name(node.name)
             self.instructions.append((LOAD_NAME, name_idx))
         elif t == 'BinaryExpression':
-            # Constant-fold numeric binary expressions
-            if node.left.type == 'NumberLiteral' and node.right.type == 'NumberLiteral':
+            # Constant-fold numeric binary expressions; x / 0 is left to raise at run time
+            if (node.left.type == 'NumberLiteral' and node.right.type == 'NumberLiteral'
+                    and not (node.operator == '/' and node.right.value == 0)):
                 left_val = node.left.value
                 right_val = node.right.value
                 op = node.operator
@@ -3,8 +3,10 @@ Jusu++ Compiler - Main compilation pipeline
 """
 import sys
 
+import json
 import sys
 import os
+import time
 
 # Make sure we can import from the project's compiler/ modules
 # Make sure we can import from the project's compiler/ modules
@@ -13,92 +15,119 @@ from compiler.lexer import Lexer
 from compiler.parser import Parser
 from runtime.interpreter import Interpreter
 from runtime import bytecode_compiler
+from runtime import instrument
 from runtime import vm as vm_module
 from runtime.interpreter import Interpreter
 from runtime.stdlib import get_builtins
 
-def compile_and_run(filename, backend='interp'):
-    """Compile and run a Jusu++ file. backend: 'interp' or 'vm'"""
+BACKENDS = ('interp', 'vm', 'regvm')
+# phases timed by run_source; 'compile' is bytecode/register compilation
+PHASES = ('lex', 'parse', 'compile', 'execute')
+
+
+def _vm_globals():
+    """Globals of a fresh VM or RegisterVM: the stdlib plus common builtins."""
     try:
+        names = get_builtins()
+    except Exception:
+        names = {}
+    # common python builtins to make bytecode programs runnable
+    names.update({
+        'print': print,
+        'str': str,
+        'int': int,
+        'float': float,
+        'len': len,
+        'range': range,
+        'sum': sum,
+        'max': max,
+        'min': min,
+        'abs': abs,
+        'list': list,
+        'dict': dict,
+    })
+    return names
+
+
+def run_source(source_code, backend='interp', timings=None, budget=None):
+    """Lex, parse, compile and execute Jusu++ source on `backend`.
+
+    Errors propagate. When `timings` is a dict, the seconds spent in each of
+    PHASES are stored in it. `budget` (runtime.budget.Budget) limits the run
+    and raises BudgetExceeded when used up.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    clock = time.perf_counter
+    t0 = clock()
+    tokens = Lexer(source_code).tokenize()
+    t1 = clock()
+    ast = Parser(tokens).parse()
+    t2 = clock()
+
+    if backend == 'interp':
+        t3 = clock()
+        interpreter = Interpreter()
+        interpreter.set_budget(budget)
+        interpreter.interpret(ast)
+    elif backend == 'vm':
+        # Compile to bytecode and run with VM
+        compiler = bytecode_compiler.BytecodeCompiler()
+        instrs, consts, names = compiler.compile_program(ast)
+        t3 = clock()
+        runner = vm_module.VM()
+        runner.budget = budget
+        runner.globals.update(_vm_globals())
+        runner.run(instrs, consts=consts, names=names, lines=compiler.lines)
+    else:
+        # Compile to register-code and execute in RegisterVM
+        from runtime.register_compiler import compile_to_register_code
+        from runtime.register_vm import RegisterVM
+
+        instrs, consts, names, reg_count = compile_to_register_code(ast, optimize=True)
+        t3 = clock()
+        runner = RegisterVM()
+        runner.budget = budget
+        runner.globals.update(_vm_globals())
+        runner.run(instrs, consts=consts, names=names, reg_count=reg_count)
+    t4 = clock()
+    if timings is not None:
+        timings.update(lex=t1 - t0, parse=t2 - t1, compile=t3 - t2, execute=t4 - t3)
+
+
+def compile_and_run(filename, backend='interp', native=None, quiet=False, timings=None, stats=None):
+    """Compile and run a Jusu++ file on `backend` (one of BACKENDS).
+
+    `native` is the manifest of a library built by `jusu build`; its functions
+    replace the interpreted ones with matching source. `quiet` drops the
+    `Running:` banner and the closing message; `timings` is passed to
+    `run_source`. With `stats`, a path or '-' for stdout, the run is
+    instrumented (runtime/instrument.py) and the counters are written there as
+    JSON at the end, also when the program fails. `filename` '-' reads the
+    program from standard input. Errors are printed and exit the process with
+    status 1.
+    """
+    counters = instrument.enable() if stats is not None else None
+    try:
+        if native is not None:
+            load_native_library(native)
         # Read the source file
-        with open(filename, 'r') as f:
-            source_code = f.read()
-        
-        print(f"Running: {filename}")
-        print(f"Running: {filename}  (backend={backend})")
-        print("-" * 40)
-        
-        # Lexical analysis
-        lexer = Lexer(source_code)
-        tokens = lexer.tokenize()
-        
-        # Parsing
-        parser = Parser(tokens)
-        ast = parser.parse()
-        
-        if backend == 'interp':
-            # Interpretation
-            interpreter = Interpreter()
-            interpreter.interpret(ast)
-        
-        elif backend == 'vm':
-            # Compile to bytecode and run with VM
-            instrs, consts, names = bytecode_compiler.compile_to_bytecode(ast)
-            runner = vm_module.VM()
-            # populate VM globals with standard library and common builtins
-            try:
-                builtins = get_builtins()
-                runner.globals.update(builtins)
-            except Exception:
-                pass
-            # common python builtins to make bytecode programs runnable
-            runner.globals.update({
-                'print': print,
-                'str': str,
-                'int': int,
-                'float': float,
-                'len': len,
-                'range': range,
-                'sum': sum,
-                'max': max,
-                'min': min,
-                'list': list,
-                'dict': dict,
-            })
-            runner.run(instrs, consts=consts, names=names)
-        elif backend == 'regvm':
-            # Compile to register-code and execute in RegisterVM
-            from runtime.register_compiler import compile_to_register_code
-            from runtime.register_vm import RegisterVM
-
-            instrs, consts, names, reg_count = compile_to_register_code(ast)
-            runner = RegisterVM()
-            try:
-                builtins = get_builtins()
-                runner.globals.update(builtins)
-            except Exception:
-                pass
-            runner.globals.update({
-                'print': print,
-                'str': str,
-                'int': int,
-                'float': float,
-                'len': len,
-                'range': range,
-                'sum': sum,
-                'max': max,
-                'min': min,
-                'list': list,
-                'dict': dict,
-            })
-            runner.run(instrs, consts=consts, names=names, reg_count=reg_count)
-        
+        if filename == '-':
+            source_code = sys.stdin.read()
         else:
-            raise ValueError(f"Unknown backend: {backend}")
-        
-        print("-" * 40)
-        print("Program finished successfully!")
-        
+            with open(filename, 'r') as f:
+                source_code = f.read()
+
+        if not quiet:
+            print(f"Running: {'<stdin>' if filename == '-' else filename}  (backend={backend})")
+            print("-" * 40)
+
+        run_source(source_code, backend, timings)
+
+        if not quiet:
+            print("-" * 40)
+            print("Program finished successfully!")
+
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found")
         sys.exit(1)
@@ -111,6 +140,78 @@ def compile_and_run(filename, backend='interp'):
     except Exception as e:
         print(f"Runtime Error: {e}")
         sys.exit(1)
+    finally:
+        if counters is not None:
+            instrument.disable()
+            counters.write_json(stats)
+
+
+class NativeLibrary:
+    """Native functions of a shared library built by `jusu build`.
+
+    The manifest lists, per function, its symbol, signature and the AST hashes
+    of the function and of the callees compiled into it. `lookup` binds a
+    function only while those match the running program, so an outdated
+    library falls back to interpretation instead of running stale code.
+    """
+
+    def __init__(self, manifest_path):
+        from runtime import ffi, jit
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('format') != jit.AOT_FORMAT:
+            raise ValueError(f"{manifest_path}: unsupported native library format {manifest.get('format')!r}")
+        self.path = manifest_path
+        self.manifest = manifest
+        self.functions = manifest['functions']
+        directory = os.path.dirname(os.path.abspath(manifest_path))
+        self.lib = ffi.load(os.path.join(directory, manifest['library']))
+
+    def lookup(self, fn_node, resolve, signature):
+        """Native callable for `fn_node` called with `signature`, or None."""
+        from runtime import jit
+        entry = self.functions.get(fn_node.name)
+        if entry is None or tuple(entry['params']) != tuple(signature):
+            return None
+        if jit.ast_hash(fn_node) != entry['ast']:
+            jit.log.info("'%s' in %s does not match the program", fn_node.name, self.path)
+            return None
+        deps = {}
+        for name, digest in entry['callees'].items():
+            node = resolve(name)
+            if node is None or jit.ast_hash(node) != digest:
+                return None
+            deps[name] = node
+        jit.log.info("bound '%s' from %s", fn_node.name, self.path)
+        error = self.lib.address(entry['error']) if 'error' in entry else 0
+        return jit.bind_native_function(fn_node, self.lib.address(entry['symbol']),
+                                        entry['params'], entry['ret'], deps, owner=self.lib,
+                                        error=error)
+
+
+def load_native_library(manifest_path):
+    """Load a `jusu build` library; all backends bind its functions when they are called."""
+    from runtime import tiering
+    library = NativeLibrary(manifest_path)
+    tiering.add_native_library(library)
+    return library
+
+
+def build_native_library(filename, output=None, opt_level=None, cpu=None):
+    """Compile the functions of a Jusu++ file ahead of time (`jusu build`).
+
+    Writes `<output>.so` and the manifest `<output>.json`; `output` defaults
+    to the file name without `.jusu`. Returns the manifest.
+    """
+    from runtime import jit
+    with open(filename, 'r') as f:
+        ast = compile_to_ast(f.read())
+    nodes = [node for node in ast if node.type == 'FunctionDeclaration']
+    if output is None:
+        output = os.path.splitext(filename)[0]
+    return jit.build_library(nodes, output, opt_level=opt_level, cpu=cpu,
+                             source=os.path.basename(filename))
+
 
 def compile_to_ast(source_code):
     """Compile source code to AST (for debugging)"""
@@ -10,6 +10,7 @@ Exports a simple module-like object with methods:
 - dot(a, b)
 - matmul(a, b)
 - shape(a)
+- map(fn, *arrays)  (native array loop for JIT-compiled functions)
 """
 
 try:
@@ -76,6 +77,11 @@ class DataScienceModule:
             return (len(a),)
         return ()
 
+    def map(self, fn, *arrays):
+        # elementwise fn over arrays; hot Jusu functions run one native loop
+        from runtime import jit
+        return jit.map_array(fn, *arrays)
+
     def __repr__(self):
         parts = [f"numpy={'yes' if HAS_NUMPY else 'no'}"]
         parts.append(f"pandas={'yes' if HAS_PANDAS else 'no'}")
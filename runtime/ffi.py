@@ -8,6 +8,7 @@ API:
 - load(path) -> Lib object
   - lib.get(name, restype='i64'|'f64'|'cstr', argtypes=[...]) -> callable
   - lib.func(name, restype='i64'|'f64'|'cstr', argtypes=[...]) -> callable
+  - lib.address(name) -> address of an exported symbol (int)
 
 Type tags: 'i64' -> 64-bit signed integer, 'f64' -> double, 'cstr' -> C string
 
@@ -75,6 +76,14 @@ class Lib:
     # convenience alias
     get = func
 
+    def address(self, name: str) -> int:
+        """Return the address of the named symbol."""
+        try:
+            f = getattr(self._lib, name)
+        except AttributeError:
+            raise FFIError(f"Symbol '{name}' not found in {self.path}")
+        return ctypes.cast(f, ctypes.c_void_p).value
+
 
 def load(path: str) -> Lib:
     """Load a shared library by path or conventional name.
@@ -0,0 +1,232 @@
+"""
+Opt-in instrumentation of Jusu++ runs.
+
+While an `Instrumentation` is active (`enable()`/`disable()` or
+`with collect() as counters:`), every backend records:
+
+- ops: executions per opcode (VM, RegisterVM) or per AST node type (Interpreter)
+- calls and time: calls per Jusu function and cumulative (inclusive) time
+  spent in it
+- names: name lookups of the VMs, with hits for those that took the fast path
+  (the VM's locals or name cache, a plain global in the RegisterVM); the
+  interpreter has no cache and counts them as 'Identifier' ops
+- max_depth: peak Jusu call depth; max_stack: peak operand stack (VM) or
+  register file size (RegisterVM)
+
+Backends check `active` once per run. The VM dispatch loops take a `probe`
+called after each instruction fetch, None (one test per instruction) unless
+the run is instrumented; the interpreter is followed with `sys.setprofile`.
+Native code is suspended while instrumentation is active
+(`tiering.suspend_native`), so every call runs in a backend and is counted,
+timed and included in max_depth. `to_dict()`/`to_json()` export the counters,
+and `compile_and_run(..., stats=path)` / `jusu run --stats` write them at the
+end of a run.
+"""
+import json
+import sys
+import time
+from collections import Counter
+
+from runtime import tiering
+
+# Instrumentation of the running program, or None
+active = None
+
+
+class Instrumentation:
+    """Counters for one or more runs."""
+
+    def __init__(self):
+        self.backends = set()
+        self.ops = Counter()
+        self.calls = Counter()
+        self.time = Counter()
+        self.name_lookups = 0
+        self.name_hits = 0
+        self.max_depth = 0
+        self.max_stack = 0
+
+    def to_dict(self):
+        return {
+            'backends': sorted(self.backends),
+            'ops': dict(self.ops.most_common()),
+            'instructions': sum(self.ops.values()),
+            'functions': {name: {'calls': self.calls[name], 'time': self.time.get(name, 0.0)}
+                          for name in sorted(self.calls)},
+            'names': {
+                'lookups': self.name_lookups,
+                'hits': self.name_hits,
+                'hit_rate': self.name_hits / self.name_lookups if self.name_lookups else None,
+            },
+            'max_depth': self.max_depth,
+            'max_stack': self.max_stack,
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def write_json(self, path):
+        """Write the counters to `path`, or to stdout for '-'."""
+        if path == '-':
+            print(self.to_json(indent=2))
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.to_json(indent=2))
+
+
+def enable():
+    """Start collecting into a fresh Instrumentation and return it."""
+    global active
+    if active is None:
+        tiering.suspend_native()
+    active = Instrumentation()
+    return active
+
+
+def disable():
+    """Stop collecting; returns the counters (or None)."""
+    global active
+    counters, active = active, None
+    if counters is not None:
+        tiering.resume_native()
+    return counters
+
+
+class collect:
+    """`with collect() as counters:` instruments the runs inside the block."""
+
+    def __enter__(self):
+        return enable()
+
+    def __exit__(self, *exc):
+        disable()
+
+
+class _Frames:
+    """Jusu call frames of a VM for call counts, time and depth."""
+
+    def __init__(self, counters):
+        self.counters = counters
+        self.frames = []
+        self.active = Counter()
+        self.pending = None
+
+    def call(self, name):
+        self.counters.calls[name] += 1
+        self.pending = name
+
+    def depth(self, depth):
+        # called per instruction with the VM's call depth
+        frames = self.frames
+        if depth > len(frames):
+            name = self.pending or '<function>'
+            frames.append((name, time.perf_counter()))
+            self.active[name] += 1
+            if depth > self.counters.max_depth:
+                self.counters.max_depth = depth
+        while depth < len(frames):
+            self.leave()
+
+    def leave(self):
+        name, start = self.frames.pop()
+        self.active[name] -= 1
+        if not self.active[name]:
+            # recursive frames count once
+            self.counters.time[name] += time.perf_counter() - start
+
+    def finish(self):
+        while self.frames:
+            self.leave()
+
+
+def run_vm(vm, counters, instructions, consts, names, lines):
+    """VM.run with counters (see VM.run)."""
+    from runtime import vm as vm_module
+    counters.backends.add('vm')
+    frames = _Frames(counters)
+    ops = counters.ops
+    opnames = vm_module.OPNAMES
+    LOAD_NAME, CALL_FUNCTION = vm_module.LOAD_NAME, vm_module.CALL_FUNCTION
+
+    def probe(op, arg):
+        ops[opnames.get(op, op)] += 1
+        frames.depth(len(vm.call_stack))
+        if len(vm.stack) > counters.max_stack:
+            counters.max_stack = len(vm.stack)
+        if op == LOAD_NAME:
+            name = vm.names[arg]
+            counters.name_lookups += 1
+            if (vm.locals is not None and name in vm.locals) or name in vm.name_cache:
+                counters.name_hits += 1
+        elif op == CALL_FUNCTION:
+            fn = vm.stack[-1]
+            if isinstance(fn, tuple) and len(fn) > 5 and fn[0] == 'code':
+                frames.call(getattr(fn[5], 'name', '<function>'))
+
+    try:
+        return vm._run(instructions, consts, names, lines, probe)
+    finally:
+        frames.finish()
+
+
+def execute_regvm(vm, counters, code, regs):
+    """RegisterVM._execute with counters."""
+    from runtime import register_vm
+    counters.backends.add('regvm')
+    frames = _Frames(counters)
+    ops = counters.ops
+    opnames = {**register_vm.OPNAMES, register_vm.HALT: 'HALT', register_vm.LOAD_DOTTED: 'LOAD_DOTTED'}
+    LOAD_NAME, LOAD_DOTTED, CALL = register_vm.LOAD_NAME, register_vm.LOAD_DOTTED, register_vm.CALL
+
+    def probe(op, b, regs):
+        ops[opnames.get(op, op)] += 1
+        frames.depth(len(vm.call_stack))
+        if len(regs) > counters.max_stack:
+            counters.max_stack = len(regs)
+        if op == LOAD_NAME:
+            counters.name_lookups += 1
+            if b in vm.globals:
+                counters.name_hits += 1
+        elif op == LOAD_DOTTED:
+            counters.name_lookups += 1
+        elif op == CALL:
+            fn = regs[b]
+            if type(fn) is tuple and len(fn) > 6 and fn[0] == 'regcode':
+                frames.call(getattr(fn[6], 'name', '<function>'))
+
+    try:
+        return vm._execute(code, regs, probe)
+    finally:
+        frames.finish()
+
+
+def run_interpreter(interp, counters, ast_nodes):
+    """Interpreter.interpret with counters, following execute/evaluate and
+    function calls with sys.setprofile."""
+    from runtime import interpreter
+    from runtime.profiler import _FUNCTION_CALL
+    counters.backends.add('interp')
+    execute = interpreter.Interpreter.execute.__code__
+    evaluate = interpreter.Interpreter.evaluate.__code__
+    frames = _Frames(counters)
+    ops = counters.ops
+
+    def tracer(frame, event, arg):
+        code = frame.f_code
+        if event == 'call':
+            if code is execute or code is evaluate:
+                ops[getattr(frame.f_locals.get('node'), 'type', None)] += 1
+            elif code is _FUNCTION_CALL:
+                frames.call(frame.f_locals['self'].node.name)
+                frames.depth(len(frames.frames) + 1)
+        elif event == 'return' and code is _FUNCTION_CALL:
+            frames.depth(len(frames.frames) - 1)
+
+    previous = sys.getprofile()
+    sys.setprofile(tracer)
+    try:
+        for node in ast_nodes:
+            interp.execute(node)
+    finally:
+        sys.setprofile(previous)
+        frames.finish()
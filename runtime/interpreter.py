@@ -1,6 +1,8 @@
 """
 Jusu++ Interpreter - Executes the AST
 """
+from runtime import instrument
+from runtime.tiering import JITDeopt
 
 class ReturnException(Exception):
     def __init__(self, value):
@@ -9,8 +11,10 @@ class ReturnException(Exception):
 class Interpreter:
     """Executes Jusu++ AST"""
 
-    def __init__(self):
+    def __init__(self, stdlib=True):
         self.variables = {}  # Store variable values
+        # runtime.budget.Budget of the run, or None
+        self.budget = None
         # Builtin functions
         self.builtins = {
             'str': lambda x: str(x),
@@ -20,14 +24,18 @@ class Interpreter:
             'print': lambda *args: print(*args),
             'range': lambda *args: list(range(*map(int, args))),
             'sum': lambda seq: sum(seq),
-            'max': lambda seq: max(seq),
-            'min': lambda seq: min(seq),
+            'max': lambda *args: max(*args),
+            'min': lambda *args: min(*args),
+            'abs': lambda x: abs(x),
             'list': lambda *args: list(args),
             'dict': lambda **kwargs: dict(**kwargs),
             'append': lambda seq, v: (seq.append(v), seq)[1],
         }
 
-        # Load stdlib if available (adds modules like math, json)
+        # Load stdlib if available (adds modules like math, json); function
+        # calls pass stdlib=False and copy the caller's variables instead
+        if not stdlib:
+            return
         try:
             from runtime import stdlib as _stdlib
             for name, val in _stdlib.get_builtins().items():
@@ -56,11 +64,37 @@ class Interpreter:
             # First check builtins
             if callee in self.builtins:
                 return self.builtins[callee]
-            if callee in self.variables and callable(self.variables[callee]):
+            if (callee in self.variables or self._load_plugin(callee)) and callable(self.variables[callee]):
                 return self.variables[callee]
         raise NameError(f"Function '{callee}' is not defined or not callable")
+
+    def _load_plugin(self, name):
+        """Bind plugin `name` on first use (see stdlib.load_plugin); True if found."""
+        try:
+            from runtime.stdlib import load_plugin
+            plugin = load_plugin(name)
+        except Exception:
+            plugin = None
+        if plugin is None:
+            return False
+        self.variables[name] = plugin
+        return True
+
+    def set_budget(self, budget):
+        """Run within a runtime.budget.Budget (None to lift it)."""
+        if self.budget is not None:
+            self.builtins.update(self._unbudgeted)
+        self.budget = budget
+        if budget is not None:
+            wrapped = budget.wrap_builtins(self.builtins)
+            self._unbudgeted = {name: self.builtins[name] for name in wrapped}
+            self.builtins.update(wrapped)
+
     def interpret(self, ast):
         """Execute a list of AST nodes"""
+        counters = instrument.active
+        if counters is not None:
+            return instrument.run_interpreter(self, counters, ast)
         for node in ast:
             self.execute(node)
 
@@ -85,39 +119,41 @@ class Interpreter:
             body = node.body
             # Store a callable wrapper that tracks hotness and may be JIT-compiled
             class JITFunction:
+                # Calls go to native code once runtime.tiering decides the
+                # function is hot for the argument types it is called with.
+
                 def __init__(self, outer, node):
+                    from runtime import tiering
                     self.outer = outer
                     self.node = node
-                    self.call_count = 0
-                    self.jit_wrapper = None
+                    self.profile = tiering.FunctionProfile(node, self.lookup)
 
-                def __call__(self, *args):
-                    # If JIT compiled, call native impl
-                    if self.jit_wrapper is not None:
-                        return self.jit_wrapper(*args)
+                def lookup(self, name):
+                    return getattr(self.outer.variables.get(name), 'node', None)
 
-                    # Otherwise call interpreter-based function
-                    self.call_count += 1
-                    # Attempt to JIT after threshold
-                    THRESHOLD = 8
-                    if self.call_count >= THRESHOLD and self.jit_wrapper is None:
-                        try:
-                            print(f"[JIT] Attempting to compile '{self.node.name}' (calls={self.call_count})")
-                            from runtime import jit
-                            compiled = jit.compile_simple_function(self.node)
-                            if compiled is not None:
-                                print(f"[JIT] '{self.node.name}' compiled successfully")
-                                self.jit_wrapper = compiled
-                            else:
-                                print(f"[JIT] '{self.node.name}' not eligible for JIT compilation")
-                        except Exception as e:
-                            # ignore JIT failures and continue
-                            print(f"[JIT] compilation raised: {e}")
-                            pass
+                def map(self, *arrays):
+                    # `f.map(xs)`: whole arrays at once once the function is hot
+                    from runtime import jit
+                    return jit.map_array(self, *arrays)
+
+                def __call__(self, *args):
+                    budget = self.outer.budget
+                    if budget is None:
+                        native = self.profile.native(args)
+                        if native is not None:
+                            try:
+                                return native(*args)
+                            except JITDeopt:
+                                # arguments the native code cannot represent
+                                pass
+                    else:
+                        # native code would not count steps
+                        budget.step()
 
-                    child = Interpreter()
+                    child = Interpreter(stdlib=False)
                     child.variables = self.outer.variables.copy()
                     child.builtins = self.outer.builtins
+                    child.budget = budget
                     for p, a in zip(self.node.params, args):
                         child.variables[p] = a
                     try:
@@ -127,7 +163,8 @@ class Interpreter:
                         return re.value
                     return None
 
-            self.variables[name] = JITFunction(self, node)
+            fn_obj = JITFunction(self, node)
+            self.variables[name] = fn_obj
 
         elif node_type == 'IfStatement':
             cond = self.evaluate(node.condition)
@@ -173,7 +210,7 @@ class Interpreter:
             if '.' in name:
                 parts = name.split('.')
                 base = parts[0]
-                if base in self.variables:
+                if base in self.variables or self._load_plugin(base):
                     obj = self.variables[base]
                     for attr in parts[1:]:
                         try:
@@ -188,7 +225,7 @@ class Interpreter:
                     return obj
                 else:
                     raise NameError(f"Name '{base}' is not defined" + self._node_loc(node))
-            if name in self.variables:
+            if name in self.variables or self._load_plugin(name):
                 return self.variables[name]
             else:
                 raise NameError(f"Variable '{name}' is not defined" + self._node_loc(node))
@@ -202,6 +239,8 @@ class Interpreter:
             if operator == '+':
                 # Strict rules: strings must be concatenated only when both operands are strings
                 if isinstance(left, str) and isinstance(right, str):
+                    if self.budget is not None:
+                        self.budget.check_size(len(left) + len(right))
                     return left + right
                 # Numeric addition
                 if isinstance(left, (int, float)) and isinstance(right, (int, float)):
@@ -216,8 +255,12 @@ class Interpreter:
                 if isinstance(left, (int, float)) and isinstance(right, (int, float)):
                     return left * right
                 if isinstance(left, str) and isinstance(right, int):
+                    if self.budget is not None:
+                        self.budget.check_size(len(left) * right)
                     return left * right
                 if isinstance(right, str) and isinstance(left, int):
+                    if self.budget is not None:
+                        self.budget.check_size(len(right) * left)
                     return right * left
                 raise TypeError(f"Cannot apply '*' to types {type(left).__name__} and {type(right).__name__}")
             elif operator == '/':
@@ -253,7 +296,7 @@ class Interpreter:
             if isinstance(callee, str) and '.' in callee:
                 parts = callee.split('.')
                 base = parts[0]
-                if base in self.variables:
+                if base in self.variables or self._load_plugin(base):
                     obj = self.variables[base]
                     for attr in parts[1:]:
                         # Prefer attribute access, fallback to dict-like
@@ -276,7 +319,7 @@ class Interpreter:
             if callee in self.builtins:
                 return self.builtins[callee](*args)
             # Check for user-defined callables (stored in variables)
-            if callee in self.variables and callable(self.variables[callee]):
+            if (callee in self.variables or self._load_plugin(callee)) and callable(self.variables[callee]):
                 return self.variables[callee](*args)
             raise NameError(f"Function '{callee}' is not defined" + self._node_loc(node))
         
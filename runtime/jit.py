@@ -1,10 +1,40 @@
 """
 Simple prototype JIT using llvmlite for *very* restricted numeric functions.
-- Compiles functions with integer parameters (one or more) and a single ReturnStatement
-  returning expressions made of Numbers, parameter identifiers, and binary ops (+ - * /, comparisons)
+- Builds functions into the shared SSA IR (`runtime/ssa.py`) and lowers the optimized
+  IR to LLVM: numeric parameters, local assignments, if/else (nested, with returns
+  on any path) and expressions made of Numbers, parameters/locals, binary ops
+  (+ - * /, comparisons) and calls to itself or other compiled Jusu functions;
+  small callees are inlined in SSA, math.sqrt/math.sin/math.pi/abs/min/max
+  become LLVM intrinsics and constants
+- Specializes functions per observed argument signature (i64, f64 or mixed); an
+  entry guard raises JITDeopt for arguments outside the signature, and so does
+  an int result beyond 64 bits; a division by zero and math functions outside
+  their domain raise as in the interpreter
+- Emits array entry points on demand (`compile_vector_function`, `map_array`,
+  `wrapper.map`) that loop over contiguous buffers in native code
+- Compiles hot functions on a background thread (`get_background_compiler`) so
+  callers keep interpreting instead of stalling on llvmlite
+- Runs LLVM's optimization pipeline at O0-O3 (JUSU_JIT_OPT, default O2) and
+  generates code for the host CPU; JUSU_JIT_DUMP=<dir> writes the IR before
+  and after optimization and the assembly of every module
 - Falls back gracefully when llvmlite isn't available or function is unsupported
 """
+import array
+import atexit
 import ctypes
+import hashlib
+import json
+import logging
+import math
+import os
+import queue
+import sys
+import threading
+import time
+
+from runtime import ssa
+# defined with the tiering policy so backends can catch it without importing llvmlite
+from runtime.tiering import JITDeopt
 
 try:
     from llvmlite import ir, binding
@@ -16,126 +46,865 @@ except Exception:
     _HAS_LLVM = False
 
 
+# progress and fallback messages; silent unless the application configures logging
+log = logging.getLogger('jusu.jit')
+
+
 class JITCompileError(RuntimeError):
     pass
 
 
-def _ensure_target():
-    target = binding.Target.from_default_triple()
-    target_machine = target.create_target_machine()
-    backing_mod = binding.parse_assembly("")
-    engine = binding.create_mcjit_compiler(backing_mod, target_machine)
-    return engine
+OPT_LEVELS = (0, 1, 2, 3)
+DEFAULT_OPT_LEVEL = 2
+
+# inliner thresholds clang uses for -O2 and -O3
+_INLINE_THRESHOLDS = {2: 225, 3: 275}
+
+
+def _opt_level(value):
+    """Parse an optimization level: 0-3, or 'O0'-'O3'."""
+    text = str(value).strip().upper()
+    if text.startswith('O'):
+        text = text[1:]
+    if not text.isdigit() or int(text) not in OPT_LEVELS:
+        raise ValueError(f"invalid JIT optimization level: {value!r} (expected 0-3)")
+    return int(text)
 
 
-def _compile_ir_to_callable(ir_module, fn_name, argcount, is_float=False):
-    """Compile IR Module to a native function and return a ctypes callable.
-    The returned callable takes `argcount` 64-bit values (ints or doubles) and
-    returns the corresponding 64-bit type.
+def _optimize_module(mod, target_machine, opt_level):
+    if opt_level == 0:
+        return
+    pmb = binding.create_pass_manager_builder()
+    pmb.opt_level = opt_level
+    pmb.loop_vectorize = opt_level >= 2
+    pmb.slp_vectorize = opt_level >= 2
+    if opt_level in _INLINE_THRESHOLDS:
+        pmb.inlining_threshold = _INLINE_THRESHOLDS[opt_level]
+    pm = binding.create_module_pass_manager()
+    target_machine.add_analysis_passes(pm)
+    pmb.populate(pm)
+    pm.run(mod)
+
+
+class JITEngine:
+    """One long-lived MCJIT engine and target machine shared by all compiled functions.
+
+    IR modules are added to the engine and functions are looked up by symbol name.
+    Every callable returned by `compile_simple_function` keeps a reference to the
+    engine that owns its code, so `reset_engine()` only drops the process-wide
+    handle: the old engine is released once the last of its functions is gone.
+
+    Code is generated for the host CPU and its features. Every module goes through
+    LLVM's standard pipeline for `opt_level` (0-3) before code generation. With
+    `dump_dir` set, each module is written there as `<n>_<name>.ll` (as lowered),
+    `<n>_<name>.opt.ll` (optimized) and `<n>_<name>.s` (assembly).
     """
+
+    def __init__(self, opt_level=None, dump_dir=None):
+        if opt_level is None:
+            opt_level = os.environ.get('JUSU_JIT_OPT', DEFAULT_OPT_LEVEL)
+        self.opt_level = _opt_level(opt_level)
+        self.dump_dir = dump_dir if dump_dir is not None else os.environ.get('JUSU_JIT_DUMP') or None
+        self.cpu = binding.get_host_cpu_name()
+        self.features = binding.get_host_cpu_features().flatten()
+        target = binding.Target.from_default_triple()
+        self.target_machine = target.create_target_machine(
+            cpu=self.cpu, features=self.features, opt=self.opt_level)
+        self.triple = self.target_machine.triple
+        self.data_layout = str(self.target_machine.target_data)
+        backing_mod = binding.parse_assembly("")
+        self.engine = binding.create_mcjit_compiler(backing_mod, self.target_machine)
+        self.modules = []
+        # object code loaded from the code cache, by cache key
+        self.objects = {}
+        self.lock = threading.RLock()
+        # CPython call trampolines by (param types, return type)
+        self.trampolines = {}
+        self._symbol_counter = 0
+        self._dump_counter = 0
+
+    def unique_symbol(self, name):
+        """Return a symbol name for `name` that is not yet used in this engine."""
+        with self.lock:
+            self._symbol_counter += 1
+            return f"jusu_{name}_{self._symbol_counter}"
+
+    def optimize(self, mod):
+        """Run the module pass pipeline for `opt_level` over a parsed module."""
+        _optimize_module(mod, self.target_machine, self.opt_level)
+
+    def _dump(self, name, suffix, text):
+        path = os.path.join(self.dump_dir, f"{self._dump_counter:04d}_{name}{suffix}")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def _prepare(self, ir_module):
+        # parse, verify and optimize an llvmlite IR module for this target
+        ir_module.triple = self.triple
+        ir_module.data_layout = self.data_layout
+        text = str(ir_module)
+        mod = binding.parse_assembly(text)
+        mod.name = ir_module.name
+        mod.verify()
+        self.optimize(mod)
+        if self.dump_dir:
+            os.makedirs(self.dump_dir, exist_ok=True)
+            self._dump_counter += 1
+            self._dump(ir_module.name, '.ll', text)
+            self._dump(ir_module.name, '.opt.ll', str(mod))
+            self._dump(ir_module.name, '.s', self.target_machine.emit_assembly(mod))
+        return mod
+
+    def add_module(self, ir_module):
+        """Verify, optimize and add an llvmlite IR module, finalizing its code."""
+        with self.lock:
+            mod = self._prepare(ir_module)
+            self.engine.add_module(mod)
+            self.engine.finalize_object()
+            self.modules.append(mod)
+        return mod
+
+    def get_function_address(self, symbol):
+        with self.lock:
+            return self.engine.get_function_address(symbol)
+
+    def get_global_address(self, symbol):
+        """Address of the global variable `symbol`, or 0 if no module defines it."""
+        with self.lock:
+            return self.engine.get_global_value_address(symbol)
+
+    def emit_object(self, ir_module):
+        """Compile an llvmlite IR module to relocatable object code for this target."""
+        with self.lock:
+            return self.target_machine.emit_object(self._prepare(ir_module))
+
+    def load_object(self, key, data):
+        """Add object code (e.g. from the code cache) once per `key`."""
+        with self.lock:
+            if key in self.objects:
+                return
+            obj = binding.ObjectFileRef.from_data(data)
+            self.engine.add_object_file(obj)
+            self.engine.finalize_object()
+            self.objects[key] = obj
+
+    def close(self):
+        with self.lock:
+            if not self.engine.closed:
+                self.engine.close()
+            self.modules = []
+            self.objects = {}
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Return the process-wide JITEngine, creating it on first use."""
+    global _engine
     if not _HAS_LLVM:
         raise JITCompileError("llvmlite not available")
+    with _engine_lock:
+        if _engine is None:
+            _engine = JITEngine()
+        return _engine
+
+
+def reset_engine():
+    """Drop the shared engine; the next compilation creates a fresh one."""
+    set_engine(None)
+
+
+def set_engine(engine):
+    """Install a JITEngine (e.g. one with another `opt_level`) as the shared engine."""
+    global _engine
+    with _engine_lock:
+        _engine = engine
+
+
+# Bump when the lowering or the cache layout changes so stale entries are ignored
+_CACHE_FORMAT = 8
+
+
+def _canonical_ast(node):
+    """JSON-friendly form of an AST without source locations."""
+    if isinstance(node, (list, tuple)):
+        return [_canonical_ast(x) for x in node]
+    if hasattr(node, 'type') and hasattr(node, '__dict__'):
+        out = {'type': node.type}
+        for key, value in sorted(vars(node).items()):
+            if key not in ('type', 'line', 'column'):
+                out[key] = _canonical_ast(value)
+        return out
+    if isinstance(node, float):
+        return repr(node)
+    return node
+
+
+def ast_hash(fn_node):
+    """Stable hash of a FunctionDeclaration, ignoring source positions."""
+    text = json.dumps(_canonical_ast(fn_node), sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def cache_key(fn_node, param_types, engine, group=None, vector=False):
+    """Code cache key: function AST, numeric mode, optimization level and target
+    triple/CPU features.
+
+    The ASTs of the functions in its call group are included as well, so an entry
+    is only reused while every callee compiled into it is unchanged. `vector`
+    selects the entry with the array entry point (see `compile_vector_function`).
+    """
+    import llvmlite
+    material = {
+        'format': _CACHE_FORMAT,
+        'ast': ast_hash(fn_node),
+        'callees': sorted([node.name, ast_hash(node)] for node in (group or [])[1:]),
+        'params': list(param_types),
+        'triple': engine.triple,
+        'cpu': engine.cpu,
+        'features': engine.features,
+        'opt': engine.opt_level,
+        'vector': vector,
+        'llvmlite': llvmlite.__version__,
+    }
+    text = json.dumps(material, sort_keys=True)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class JITCodeCache:
+    """On-disk cache of JIT object code.
+
+    Each entry is `<key>.o` (object code) plus `<key>.json` (symbol and
+    signature). Entries are evicted least-recently-used first once the total
+    size exceeds `max_bytes`; loading an entry refreshes its timestamp.
+    """
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + '.o', base + '.json'
+
+    def load(self, key):
+        """Return (meta, object bytes) for `key`, or None on a miss."""
+        obj_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            with open(obj_path, 'rb') as f:
+                data = f.read()
+            os.utime(obj_path)
+            os.utime(meta_path)
+        except FileNotFoundError:
+            with self.lock:
+                self.misses += 1
+            return None
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+                self.errors += 1
+            return None
+        with self.lock:
+            self.hits += 1
+        return meta, data
+
+    def store(self, key, meta, data):
+        obj_path, meta_path = self._paths(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # write then rename so concurrent readers never see partial entries
+            for path, payload, mode in ((obj_path, data, 'wb'),
+                                        (meta_path, json.dumps(meta), 'w')):
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, mode) as f:
+                    f.write(payload)
+                os.replace(tmp, path)
+        except OSError:
+            with self.lock:
+                self.errors += 1
+            return
+        with self.lock:
+            self.stores += 1
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith('.o'):
+                continue
+            key = name[:-2]
+            obj_path, meta_path = self._paths(key)
+            try:
+                st = os.stat(obj_path)
+                size = st.st_size + (os.path.getsize(meta_path) if os.path.exists(meta_path) else 0)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, key, size))
+        return entries
+
+    def evict(self):
+        """Remove least-recently-used entries until the cache fits `max_bytes`."""
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, key, size in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            total -= size
+            with self.lock:
+                self.evictions += 1
+
+    def clear(self):
+        for _, key, _ in self._entries():
+            for path in self._paths(key):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            'directory': self.directory,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'errors': self.errors,
+            'entries': len(entries),
+            'bytes': sum(size for _, _, size in entries),
+            'max_bytes': self.max_bytes,
+        }
+
+
+_UNSET = object()
+_code_cache = _UNSET
+
+
+def _default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'jusu', 'jit')
+
+
+def get_code_cache():
+    """Return the process-wide JITCodeCache, or None when caching is disabled.
+
+    Configured from the environment on first use: JUSU_JIT_CACHE=0 disables it,
+    JUSU_JIT_CACHE_DIR sets the directory and JUSU_JIT_CACHE_MAX_MB the size limit.
+    """
+    global _code_cache
+    if _code_cache is _UNSET:
+        if os.environ.get('JUSU_JIT_CACHE', '1') == '0':
+            _code_cache = None
+        else:
+            directory = os.environ.get('JUSU_JIT_CACHE_DIR') or _default_cache_dir()
+            max_mb = float(os.environ.get('JUSU_JIT_CACHE_MAX_MB', '64'))
+            _code_cache = JITCodeCache(directory, int(max_mb * 1024 * 1024))
+    return _code_cache
+
+
+def set_code_cache(cache):
+    """Install a JITCodeCache (or None to disable caching) for this process."""
+    global _code_cache
+    _code_cache = cache
+
+
+class BackgroundCompiler:
+    """Compiles hot functions on a worker thread while callers keep interpreting.
+
+    `submit(key, job, callback)` queues `job()` (which returns a native callable
+    or None) and the worker passes its result to `callback`. The queue is
+    bounded: submissions beyond `max_pending` are dropped and the caller may
+    submit again later. A key that is already queued or compiling is not
+    queued twice.
+    """
+
+    def __init__(self, max_pending=32):
+        self.max_pending = max_pending
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.compile_time_total = 0.0
+        self.compile_time_max = 0.0
+        self.compile_time_last = 0.0
+        self._thread = None
+        self._stopping = False
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='jusu-jit-compiler', daemon=True)
+            self._thread.start()
+
+    def submit(self, key, job, callback):
+        """Queue a compile job; returns False if it was dropped or is already queued."""
+        with self.lock:
+            if self._stopping or key in self.pending:
+                return False
+            try:
+                self.queue.put_nowait((key, job, callback))
+            except queue.Full:
+                self.dropped += 1
+                return False
+            self.pending.add(key)
+            self.submitted += 1
+            self._ensure_worker()
+        return True
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            key, job, callback = item
+            start = time.perf_counter()
+            try:
+                result = job()
+            except Exception as e:
+                log.warning("background compilation raised: %s", e)
+                result = None
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.pending.discard(key)
+                if result is None:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                self.compile_time_total += elapsed
+                self.compile_time_max = max(self.compile_time_max, elapsed)
+                self.compile_time_last = elapsed
+            try:
+                callback(result)
+            except Exception as e:
+                # keep the worker alive for the jobs after this one
+                log.warning("background compilation callback raised: %s", e)
+            finally:
+                self.queue.task_done()
+
+    def drain(self, timeout=None):
+        """Wait until every queued job has finished; returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout=5.0):
+        """Stop accepting jobs and let the worker finish what it has.
+
+        Waits at most `timeout` seconds; a worker still busy after that is a
+        daemon thread and does not hold up interpreter exit.
+        """
+        with self.lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            thread = self._thread
+        if thread is not None:
+            deadline = time.monotonic() + timeout
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                return
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def metrics(self):
+        with self.lock:
+            finished = self.completed + self.failed
+            return {
+                'queue_length': self.queue.qsize(),
+                'pending': len(self.pending),
+                'max_pending': self.max_pending,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'compile_time_total': self.compile_time_total,
+                'compile_time_mean': self.compile_time_total / finished if finished else 0.0,
+                'compile_time_max': self.compile_time_max,
+                'compile_time_last': self.compile_time_last,
+            }
+
+
+_background = _UNSET
+
+
+def get_background_compiler():
+    """Return the process-wide BackgroundCompiler, or None for synchronous compilation.
+
+    Configured from the environment on first use: JUSU_JIT_BACKGROUND=0 compiles
+    inside the call that made a function hot, JUSU_JIT_QUEUE_SIZE bounds the queue.
+    """
+    global _background
+    if _background is _UNSET:
+        if os.environ.get('JUSU_JIT_BACKGROUND', '1') == '0' or not _HAS_LLVM:
+            _background = None
+        else:
+            _background = BackgroundCompiler(int(os.environ.get('JUSU_JIT_QUEUE_SIZE', '32')))
+            # don't let the worker run LLVM code while the interpreter shuts down
+            atexit.register(_background.shutdown)
+    return _background
 
-    llvm_ir = str(ir_module)
-    mod = binding.parse_assembly(llvm_ir)
-    mod.verify()
 
-    target = binding.Target.from_default_triple()
-    tm = target.create_target_machine()
-    engine = binding.create_mcjit_compiler(mod, tm)
-    engine.finalize_object()
-    addr = engine.get_function_address(fn_name)
+def set_background_compiler(compiler):
+    """Install a BackgroundCompiler (or None for synchronous compilation)."""
+    global _background
+    _background = compiler
+
+
+def _compile_ir_to_callable(ir_module, fn_name, argtypes, restype, engine=None):
+    """Add an IR module to the shared engine and return a ctypes callable for `fn_name`.
+    `argtypes` and `restype` are ctypes types matching the LLVM signature.
+    """
+    engine = engine or get_engine()
+    engine.add_module(ir_module)
+    return _bind_symbol(engine, fn_name, argtypes, restype)
+
+
+def _bind_symbol(engine, symbol, argtypes, restype):
+    addr = engine.get_function_address(symbol)
     if addr == 0:
         raise JITCompileError("Failed to get function address")
-
     # Build CFUNCTYPE signature dynamically
-    if is_float:
-        ctypes_args = [ctypes.c_double] * argcount
-        ret_type = ctypes.c_double
-    else:
-        ctypes_args = [ctypes.c_longlong] * argcount
-        ret_type = ctypes.c_longlong
-
-    cfunc_type = ctypes.CFUNCTYPE(ret_type, *ctypes_args)
+    cfunc_type = ctypes.CFUNCTYPE(restype, *argtypes)
     cfunc = cfunc_type(addr)
+    # keep the engine (and therefore the machine code) alive with the callable
+    cfunc._jit_engine = engine
     return cfunc
 
 
-def _expr_to_ir(node, builder, func_args, module, is_float=False):
-    """Recursively compile limited AST expression nodes to LLVM IR values.
-    node: AST node (we expect BinaryExpression, NumberLiteral, Identifier)
-    builder: llvmlite.ir.IRBuilder
-    func_args: dict mapping parameter name -> llvmlite.ir.Argument
-    module: llvmlite.ir.Module used for types/constants
-    is_float: whether we should emit floating-point IR (double)
+_CTYPES = {
+    'int': ctypes.c_longlong,
+    'float': ctypes.c_double,
+    'bool': ctypes.c_bool,
+}
+
+# Native code cannot raise. A function that may fail gets an i8 global,
+# `<symbol>_error`, which it sets to one of the codes below before every native
+# frame returns; entry points clear it and raise the interpreter's error, or
+# JITDeopt for an int result beyond 64 bits so that callers interpret the call
+# instead. The flag is shared by all threads calling the function.
+_ZERO_DIV, _OVERFLOW, _DOMAIN = 1, 2, 3
+_ERRORS = {
+    _ZERO_DIV: (ZeroDivisionError, "Division by zero"),
+    _OVERFLOW: (JITDeopt, "int result out of range for native code"),
+    _DOMAIN: (ValueError, "math domain error"),
+}
+
+
+def _error_symbol(symbol):
+    return f"{symbol}_error"
+
+
+def _error_flag(address):
+    """The flag at `address` (0: the function cannot fail) as a c_int8, or None."""
+    return ctypes.c_int8.from_address(address) if address else None
+
+
+def _native_error(flag):
+    """Clear the set `flag` and return the exception it stands for."""
+    code = flag.value
+    flag.value = 0
+    exc, message = _ERRORS[code]
+    return exc(message)
+
+
+def _llvm_type(t):
+    if t == 'int':
+        return ir.IntType(64)
+    if t == 'float':
+        return ir.DoubleType()
+    if t == 'bool':
+        return ir.IntType(1)
+    raise JITCompileError(f"type {t} not supported in JIT")
+
+
+def _coerce(builder, value, from_t, to_t):
+    if from_t == to_t:
+        return value
+    if to_t == 'float':
+        if from_t == 'int':
+            return builder.sitofp(value, ir.DoubleType())
+        return builder.uitofp(value, ir.DoubleType())
+    if to_t == 'int' and from_t == 'bool':
+        return builder.zext(value, ir.IntType(64))
+    if to_t == 'bool':
+        if from_t == 'float':
+            return builder.fcmp_unordered('!=', value, ir.Constant(ir.DoubleType(), 0.0))
+        return builder.icmp_signed('!=', value, ir.Constant(ir.IntType(64), 0))
+    raise JITCompileError(f"cannot convert {from_t} to {to_t} in JIT")
+
+
+def _checked(builder, result, fail):
+    # value of an {i64, i1} `*.with.overflow` result; overflow branches to `fail`
+    ok = builder.append_basic_block('no_overflow')
+    builder.cbranch(builder.extract_value(result, 1), fail(_OVERFLOW), ok)
+    builder.position_at_end(ok)
+    return builder.extract_value(result, 0)
+
+
+# int operators and their overflow-checking IRBuilder methods
+_INT_OVERFLOW = {'+': 'sadd_with_overflow', '-': 'ssub_with_overflow', '*': 'smul_with_overflow'}
+
+
+def _binop_to_ir(builder, v, left, right, fail=None):
+    """Emit one typed SSA binop; operands are widened to a common numeric type.
+
+    Where Python would raise or give an int beyond 64 bits, the code branches
+    to the basic block `fail(code)` instead (see `_ERRORS`): '/' when the
+    divisor is zero, int '+', '-' and '*' when they overflow.
     """
-    t = node.type
-    # Number literal: choose int or double constant depending on mode
-    if t == 'NumberLiteral':
-        if is_float:
-            return ir.Constant(ir.DoubleType(), float(node.value))
-        return ir.Constant(ir.IntType(64), int(node.value))
-    if t == 'Identifier':
-        # resolve parameter reference
-        if node.name in func_args:
-            return func_args[node.name]
-        raise JITCompileError(f"Unknown identifier '{node.name}' in JIT-compiled function")
-    if t == 'BinaryExpression':
-        left = _expr_to_ir(node.left, builder, func_args, module, is_float)
-        right = _expr_to_ir(node.right, builder, func_args, module, is_float)
-        op = node.operator
-        if is_float:
-            if op == '+':
-                return builder.fadd(left, right)
-            elif op == '-':
-                return builder.fsub(left, right)
-            elif op == '*':
-                return builder.fmul(left, right)
-            elif op == '/':
-                return builder.fdiv(left, right)
-            elif op in ('<', '>', '<=', '>=', '==', '!='):
-                cmp = builder.fcmp_ordered(op, left, right)
-                # Convert boolean i1 to double 1.0/0.0
-                one = ir.Constant(ir.DoubleType(), 1.0)
-                zero = ir.Constant(ir.DoubleType(), 0.0)
-                return builder.select(cmp, one, zero)
-            else:
-                raise JITCompileError(f"Operator {op} not supported in JIT (float)")
+    lt, rt = v.args[0].type, v.args[1].type
+    op = v.operator
+    operand_t = 'float' if op == '/' or 'float' in (lt, rt) else 'int'
+    left = _coerce(builder, left, lt, operand_t)
+    right = _coerce(builder, right, rt, operand_t)
+    if operand_t == 'float':
+        if op == '+':
+            return builder.fadd(left, right)
+        elif op == '-':
+            return builder.fsub(left, right)
+        elif op == '*':
+            return builder.fmul(left, right)
+        elif op == '/':
+            if fail is None:
+                raise JITCompileError("division without an error flag")
+            ok = builder.append_basic_block('div')
+            builder.cbranch(builder.fcmp_ordered('==', right, ir.Constant(ir.DoubleType(), 0.0)),
+                            fail(_ZERO_DIV), ok)
+            builder.position_at_end(ok)
+            return builder.fdiv(left, right)
+        elif op == '!=':
+            # unordered so that NaN != NaN, as in Python
+            return builder.fcmp_unordered(op, left, right)
+        elif op in ('<', '>', '<=', '>=', '=='):
+            return builder.fcmp_ordered(op, left, right)
+    else:
+        if op in _INT_OVERFLOW:
+            if fail is None:
+                raise JITCompileError("int arithmetic without an error flag")
+            return _checked(builder, getattr(builder, _INT_OVERFLOW[op])(left, right), fail)
+        elif op in ('<', '>', '<=', '>=', '==', '!='):
+            return builder.icmp_signed(op, left, right)
+    raise JITCompileError(f"Operator {op} not supported in JIT")
+
+
+def _const_to_ir(v):
+    if v.type not in ssa.NUMERIC_TYPES:
+        raise JITCompileError(f"constant {v.value!r} not supported in JIT")
+    if v.type == 'float':
+        return ir.Constant(ir.DoubleType(), float(v.value))
+    return ir.Constant(_llvm_type(v.type), int(v.value))
+
+
+def _builtin_to_ir(builder, module, v, args, fail=None):
+    """Lower a call to one of `ssa.MATH_FUNCTIONS`, typed by `ssa.builtin_call_type`.
+
+    math.sqrt and math.sin become LLVM intrinsics. Arguments outside their
+    domain (negative for sqrt, infinite for sin) branch to `fail(_DOMAIN)`,
+    where Python raises ValueError; abs of the smallest int overflows.
+    """
+    types = [a.type for a in v.args]
+    if fail is None and _can_fail(v):
+        raise JITCompileError(f"call to '{v.callee}' without an error flag")
+    if v.callee in ('math.sqrt', 'math.sin'):
+        x = _coerce(builder, args[0], types[0], 'float')
+        if v.callee == 'math.sqrt':
+            bad = builder.fcmp_ordered('<', x, ir.Constant(ir.DoubleType(), 0.0))
+        else:
+            magnitude = builder.call(module.declare_intrinsic('llvm.fabs', [ir.DoubleType()]), [x])
+            bad = builder.fcmp_ordered('==', magnitude, ir.Constant(ir.DoubleType(), math.inf))
+        ok = builder.append_basic_block('in_domain')
+        builder.cbranch(bad, fail(_DOMAIN), ok)
+        builder.position_at_end(ok)
+        intrinsic = module.declare_intrinsic('llvm.' + v.callee.split('.')[1], [ir.DoubleType()])
+        return builder.call(intrinsic, [x])
+    if v.callee == 'abs':
+        x = _coerce(builder, args[0], types[0], v.type)
+        if v.type == 'float':
+            return builder.call(module.declare_intrinsic('llvm.fabs', [ir.DoubleType()]), [x])
+        if v.type == 'int':
+            negated = _checked(builder, builder.ssub_with_overflow(ir.Constant(x.type, 0), x), fail)
+        else:
+            negated = builder.neg(x)
+        return builder.select(builder.icmp_signed('<', x, ir.Constant(x.type, 0)), negated, x)
+    # min/max as in Python: a later argument replaces the running result only
+    # if it compares strictly smaller (larger), so ties keep the first
+    op = '<' if v.callee == 'min' else '>'
+    result = _coerce(builder, args[0], types[0], v.type)
+    for arg, t in zip(args[1:], types[1:]):
+        x = _coerce(builder, arg, t, v.type)
+        if v.type == 'float':
+            better = builder.fcmp_ordered(op, x, result)
+        elif v.type == 'bool':
+            better = builder.icmp_unsigned(op, x, result)
         else:
-            if op == '+':
-                return builder.add(left, right)
-            elif op == '-':
-                return builder.sub(left, right)
-            elif op == '*':
-                return builder.mul(left, right)
-            elif op == '/':
-                # signed division
-                return builder.sdiv(left, right)
-            elif op == '<':
-                cmp = builder.icmp_signed('<', left, right)
-                return builder.zext(cmp, ir.IntType(64))
-            elif op == '>':
-                cmp = builder.icmp_signed('>', left, right)
-                return builder.zext(cmp, ir.IntType(64))
-            elif op == '<=':
-                cmp = builder.icmp_signed('<=', left, right)
-                return builder.zext(cmp, ir.IntType(64))
-            elif op == '>=':
-                cmp = builder.icmp_signed('>=', left, right)
-                return builder.zext(cmp, ir.IntType(64))
-            elif op == '==':
-                cmp = builder.icmp_signed('==', left, right)
-                return builder.zext(cmp, ir.IntType(64))
-            elif op == '!=':
-                cmp = builder.icmp_signed('!=', left, right)
-                return builder.zext(cmp, ir.IntType(64))
+            better = builder.icmp_signed(op, x, result)
+        result = builder.select(better, x, result)
+    return result
+
+
+def _can_fail(v):
+    # whether the typed SSA value `v` may set the error flag
+    if v.op == 'binop':
+        if v.operator == '/':
+            return True
+        return v.operator in _INT_OVERFLOW and 'float' not in (a.type for a in v.args)
+    if v.op == 'call':
+        return v.callee in ('math.sqrt', 'math.sin') or (v.callee == 'abs' and v.type == 'int')
+    return False
+
+
+def _may_fail(fn):
+    return any(_can_fail(v) for v in fn.values())
+
+
+def _declare_error_flag(module, symbol):
+    flag = ir.GlobalVariable(module, ir.IntType(8), name=_error_symbol(symbol))
+    flag.initializer = ir.Constant(ir.IntType(8), 0)
+    return flag
+
+
+def _lower_ssa_to_llvm(fn, module, param_types, symbol=None, callees=None, llfn=None, error=None):
+    """Lower a typed SSAFunction into `module`; returns (ir.Function, return type).
+
+    Every SSA block becomes an LLVM basic block and SSA phis become LLVM phis.
+    Conditional branches test an i1: comparisons are used directly, numbers are
+    compared against zero. All returns are converted to the unified return type.
+
+    `callees` maps function names to (ir.Function, param types, return type);
+    calls to those names become direct native calls, calls to numeric stdlib
+    functions become intrinsics (`_builtin_to_ir`), any other call is rejected.
+    `llfn` is a previously declared ir.Function to emit the body into.
+
+    `error` is an i8 global that a failing operation sets to its code (see
+    `_ERRORS`) before the function returns early; after a native call the
+    caller returns as well once it is set, so the entry point can raise. A
+    function that may fail without one gets `<symbol>_error`.
+    """
+    callees = callees or {}
+    ssa.infer_types(fn, param_types, {name: c[2] for name, c in callees.items()}, builtins=True)
+    ret_t = fn.return_type()
+    if ret_t not in ssa.NUMERIC_TYPES:
+        raise JITCompileError(f"return type {ret_t} not supported in JIT")
+    if llfn is None:
+        func_ty = ir.FunctionType(_llvm_type(ret_t), [_llvm_type(t) for t in param_types])
+        llfn = ir.Function(module, func_ty, name=symbol or fn.name)
+    elif llfn.function_type.return_type != _llvm_type(ret_t):
+        raise JITCompileError(f"return type of '{fn.name}' changed during lowering")
+    if error is None and _may_fail(fn):
+        error = _declare_error_flag(module, llfn.name)
+    values = {}
+    for p, arg in zip(fn.params, llfn.args):
+        arg.name = p.name
+        values[id(p)] = arg
+    blocks = {b: llfn.append_basic_block(b.name) for b in fn.blocks}
+    raise_blocks = {}
+
+    def raise_block(code):
+        # block storing `code` in the flag (0: already set by a callee) and returning
+        if code not in raise_blocks:
+            block = raise_blocks[code] = llfn.append_basic_block(f'error{code}')
+            raising = ir.IRBuilder(block)
+            if code:
+                raising.store(ir.Constant(ir.IntType(8), code), error)
+            raising.ret(ir.Constant(_llvm_type(ret_t), 0))
+        return raise_blocks[code]
+
+    fail = raise_block if error is not None else None
+    builder = ir.IRBuilder()
+    phis = []
+    # guards split SSA blocks; phis take their values from the last piece
+    ends = {}
+    for b in fn.blocks:
+        builder.position_at_end(blocks[b])
+        for v in b.instrs:
+            if v.op == 'call' and v.callee not in callees and v.type not in ssa.NUMERIC_TYPES:
+                raise JITCompileError(f"call to '{v.callee}' not supported in JIT")
+            if v.type not in ssa.NUMERIC_TYPES:
+                if v.op == 'global':
+                    raise JITCompileError(f"Unknown identifier '{v.name}' in JIT-compiled function")
+                if v.op == 'binop':
+                    raise JITCompileError(f"operands of {v.operator} are not numeric")
+                if v.op == 'const':
+                    raise JITCompileError(f"constant {v.value!r} not supported in JIT")
+            if v.op == 'const':
+                values[id(v)] = _const_to_ir(v)
+            elif v.op == 'binop':
+                values[id(v)] = _binop_to_ir(builder, v, values[id(v.args[0])], values[id(v.args[1])], fail)
+            elif v.op == 'call' and v.callee not in callees:
+                values[id(v)] = _builtin_to_ir(builder, module, v, [values[id(a)] for a in v.args], fail)
+            elif v.op == 'call':
+                target, target_params, _ = callees[v.callee]
+                if len(v.args) != len(target_params):
+                    raise JITCompileError(f"{v.callee} expects {len(target_params)} arguments, got {len(v.args)}")
+                args = [_coerce(builder, values[id(a)], a.type, t) for a, t in zip(v.args, target_params)]
+                values[id(v)] = builder.call(target, args)
+                if error is not None:
+                    ok = builder.append_basic_block('returned')
+                    raised = builder.icmp_unsigned('!=', builder.load(error), ir.Constant(ir.IntType(8), 0))
+                    builder.cbranch(raised, fail(0), ok)
+                    builder.position_at_end(ok)
+            elif v.op == 'phi':
+                # incoming values may be defined in later blocks; filled in below
+                values[id(v)] = builder.phi(_llvm_type(v.type))
+                phis.append(v)
             else:
-                raise JITCompileError(f"Operator {op} not supported in JIT")
-    raise JITCompileError(f"Expr type {t} not supported for JIT")
+                raise JITCompileError(f"{v.op} not supported in JIT")
+        ends[b] = builder.block
+        t = b.term
+        if t.op == 'ret':
+            if not t.args:
+                raise JITCompileError("function without a return value not supported in JIT")
+            rv = t.args[0]
+            builder.ret(_coerce(builder, values[id(rv)], rv.type, ret_t))
+        elif t.op == 'br':
+            builder.branch(blocks[t.targets[0]])
+        else:
+            cond = t.args[0]
+            flag = _coerce(builder, values[id(cond)], cond.type, 'bool')
+            builder.cbranch(flag, blocks[t.targets[0]], blocks[t.targets[1]])
+
+    for v in phis:
+        for arg, pred in zip(v.args, v.blocks):
+            llval = values[id(arg)]
+            if arg.type != v.type:
+                # convert at the end of the predecessor, before its branch
+                builder.position_before(ends[pred].terminator)
+                llval = _coerce(builder, llval, arg.type, v.type)
+            values[id(v)].add_incoming(llval, ends[pred])
+    return llfn, ret_t
+
 
 def _detect_float_mode(node):
     """Simple heuristic: returns True if the AST contains float literals or a '/' operator.
-    This picks floating-point IR for the whole function when numeric floats or division are used.
+    This picks floating-point IR for the whole function when numeric floats or division
+    are used and no argument types have been observed.
     """
     if node is None:
         return False
@@ -146,6 +915,10 @@ def _detect_float_mode(node):
             return float(node.value) != int(float(node.value))
         except Exception:
             return False
+    if t == 'Identifier' and node.name in ssa.MATH_CONSTANTS:
+        return True
+    if t == 'CallExpression' and node.callee in ('math.sqrt', 'math.sin'):
+        return True
     if t == 'BinaryExpression':
         if node.operator == '/':
             return True
@@ -158,7 +931,8 @@ def _detect_float_mode(node):
                 return True
         return False
     # Recurse into other composite nodes
-    for attr in ('left', 'right', 'arguments', 'value', 'expression', 'body', 'elements', 'pairs'):
+    for attr in ('left', 'right', 'arguments', 'value', 'expression', 'body', 'elements', 'pairs',
+                 'condition', 'then_branch', 'else_branch'):
         val = getattr(node, attr, None)
         if isinstance(val, list):
             for it in val:
@@ -170,83 +944,1020 @@ def _detect_float_mode(node):
     return False
 
 
-def compile_simple_function(fn_node):
-    """Try to compile a FunctionDeclaration AST node to a native callable.
-    Returns a Python callable taking ints/doubles and returning ints/doubles, or None if unsupported.
-    Supports functions with any number of numeric parameters.
+def _called_names(node):
+    """Names of all functions called anywhere in an AST."""
+    names = set()
+    if isinstance(node, list):
+        for item in node:
+            names |= _called_names(item)
+        return names
+    if not hasattr(node, 'type'):
+        return names
+    if node.type == 'CallExpression':
+        names.add(node.callee)
+    for key, value in vars(node).items():
+        if key != 'type' and (isinstance(value, list) or hasattr(value, 'type')):
+            names |= _called_names(value)
+    return names
+
+
+# largest number of functions compiled together for one call graph
+MAX_GROUP_SIZE = 16
+
+
+def call_group(fn_node, resolve=None):
+    """Return `fn_node` followed by every Jusu function it reaches through calls.
+
+    `resolve(name)` maps a called name to its FunctionDeclaration, or None for
+    builtins and unknown names. A call to the function's own name is always
+    treated as recursion. The group is compiled into one module so mutually
+    recursive functions can call each other directly.
     """
-    if not _HAS_LLVM:
+    group = {fn_node.name: fn_node}
+    work = [fn_node]
+    while work:
+        node = work.pop()
+        for name in sorted(_called_names(node.body)):
+            if name in group or resolve is None:
+                continue
+            callee = resolve(name)
+            if getattr(callee, 'type', None) != 'FunctionDeclaration' or len(group) >= MAX_GROUP_SIZE:
+                continue
+            group[name] = callee
+            work.append(callee)
+    return list(group.values())
+
+
+def _group_deps(group):
+    """{name: node} for functions of the group that compiled code calls directly."""
+    called = set()
+    for node in group:
+        called |= _called_names(node.body)
+    return {node.name: node for node in group if node.name in called}
+
+
+def _build_ssa(node):
+    # SSA form of a declaration with stdlib constants (math.pi) folded in
+    fn = ssa.build_function(node)
+    for b in fn.blocks:
+        for i, v in enumerate(b.instrs):
+            if v.op == 'global' and v.name in ssa.MATH_CONSTANTS:
+                const = ssa.Value('const', value=ssa.MATH_CONSTANTS[v.name])
+                const.block = b
+                b.instrs[i] = const
+                fn.replace_all_uses(v, const)
+    return fn
+
+
+def _lower_function(fn_node, module, symbol, group=None, param_types=None):
+    """Build `fn_node` into `module` under `symbol`.
+
+    `param_types` is the signature to specialize for; without it the float-mode
+    heuristic picks one. `group` (see `call_group`) lists the functions compiled
+    alongside it; they get internal symbols derived from `symbol` and parameter
+    types inferred from their call sites. Returns (param_types, return type) or
+    None if the function is not eligible.
+    """
+    group = group or [fn_node]
+    if param_types is None:
+        param_types = _param_types(fn_node)
+    param_types = list(param_types)
+    log.debug("lowering %s(%s) for (%s)", fn_node.name, ', '.join(fn_node.params), ', '.join(param_types))
+    nodes = {node.name: node for node in group}
+
+    def inline_lookup(name):
+        # small functions of the group are inlined into their call sites
+        if name not in nodes:
+            return None
+        try:
+            return _build_ssa(nodes[name])
+        except ssa.SSAUnsupported:
+            return None
+
+    fns = {}
+    for node in group:
+        try:
+            fn = _build_ssa(node)
+        except ssa.SSAUnsupported as e:
+            log.info("'%s' not supported: %s", fn_node.name, e)
+            return None
+        ssa.optimize(fn, inline_lookup, param_types=param_types if node is fn_node else None)
+        fns[node.name] = fn
+    # callees inlined at every call site need no code of their own
+    live, work = {fn_node.name}, [fn_node.name]
+    while work:
+        for v in fns[work.pop()].values():
+            if v.op == 'call' and v.callee in fns and v.callee not in live:
+                live.add(v.callee)
+                work.append(v.callee)
+    fns = {name: fn for name, fn in fns.items() if name in live}
+
+    # Parameter types of callees and return types of (mutually) recursive
+    # functions start from the narrowest numeric type and are widened by call
+    # sites and returns until they agree.
+    sig = {name: ['bool'] * len(fn.params) for name, fn in fns.items()}
+    sig[fn_node.name] = param_types
+    ret_types = dict.fromkeys(fns, 'bool')
+    changed = True
+    while changed:
+        changed = False
+        for name, fn in fns.items():
+            ssa.infer_types(fn, sig[name], ret_types, builtins=True)
+            t = fn.return_type()
+            if t != ret_types[name]:
+                ret_types[name] = t
+                changed = True
+            for v in fn.values():
+                if v.op != 'call' or v.callee not in fns or v.callee == fn_node.name:
+                    continue
+                old = sig[v.callee]
+                if len(v.args) != len(old):
+                    continue
+                new = [ssa.unify_types([t, a.type]) for t, a in zip(old, v.args)]
+                if new != old:
+                    sig[v.callee] = new
+                    changed = True
+
+    # one flag for the whole group: its functions only call each other
+    error = None
+    if any(_may_fail(fn) for fn in fns.values()):
+        error = _declare_error_flag(module, symbol)
+    callees = {}
+    for name in fns:
+        types = [ret_types[name]] + sig[name]
+        if any(t not in ssa.NUMERIC_TYPES for t in types):
+            continue
+        func_ty = ir.FunctionType(_llvm_type(ret_types[name]), [_llvm_type(t) for t in sig[name]])
+        llfn = ir.Function(module, func_ty, name=symbol if name == fn_node.name else f"{symbol}__{name}")
+        if name != fn_node.name:
+            llfn.linkage = 'internal'
+        callees[name] = (llfn, sig[name], ret_types[name])
+    try:
+        if fn_node.name not in callees:
+            raise JITCompileError(f"return type {ret_types[fn_node.name]} not supported in JIT")
+        for name, fn in fns.items():
+            if name in callees:
+                _lower_ssa_to_llvm(fn, module, sig[name], callees=callees, llfn=callees[name][0],
+                                   error=error)
+    except JITCompileError as e:
+        log.info("'%s' not supported: %s", fn_node.name, e)
+        for llfn, _, _ in callees.values():
+            module.globals.pop(llfn.name, None)
+        if error is not None:
+            module.globals.pop(error.name, None)
         return None
+    return param_types, ret_types[fn_node.name]
 
-    params = fn_node.params
-    print(f"[JIT] compile_simple_function: name={fn_node.name}, params={params}")
-    # Simple body: expect a ReturnStatement with an expression
-    body = fn_node.body
-    if not body:
-        print("[JIT] no body")
+
+# Python argument types each native parameter type accepts without changing the
+# result: ints widen exactly to doubles, floats are never truncated
+_ACCEPTS = {
+    'int': (int,),
+    'float': (float, int),
+    'bool': (bool,),
+}
+
+_SIGNATURE_TYPES = {int: 'int', float: 'float', bool: 'bool'}
+
+
+def signature(args):
+    """Type signature of call arguments, e.g. ('int', 'float'), or None if any
+    argument is not a number."""
+    sig = []
+    for a in args:
+        t = _SIGNATURE_TYPES.get(type(a))
+        if t is None:
+            return None
+        sig.append(t)
+    return tuple(sig)
+
+
+# entry guard per parameter type, as a Python expression over argument `a`;
+# ctypes would silently truncate ints beyond 64 bits
+_GUARDS = {
+    'int': "(type({a}) is int and -0x8000000000000000 <= {a} <= 0x7fffffffffffffff)",
+    'float': "(type({a}) is float or type({a}) is int)",
+    'bool': "type({a}) is bool",
+}
+
+# per-signature wrapper factories, generated once
+_wrapper_factories = {}
+
+
+def _wrapper_factory(param_types, checked=False):
+    """Return make(cfunc, deopt, error) building a wrapper with the entry guard inlined.
+
+    The wrapper takes exactly one positional argument per parameter, so arity
+    is checked by Python, and tests argument types without loops or tuples.
+    `checked` wrappers raise after the call when the native code set its
+    `error` flag (see `_native_error`).
+    """
+    key = (tuple(param_types), checked)
+    factory = _wrapper_factories.get(key)
+    if factory is None:
+        args = ', '.join(f"a{i}" for i in range(len(key[0])))
+        guard = ' and '.join(_GUARDS[t].format(a=f"a{i}") for i, t in enumerate(key[0])) or 'True'
+        if checked:
+            check = ("        if error.value:\n"
+                     "            raise native_error(error)\n")
+        else:
+            check = ""
+        # ctypes raises ArgumentError for ints too large for a double
+        src = (f"def make(cfunc, deopt, error):\n"
+               f"    def wrapper({args}):\n"
+               f"        if not ({guard}):\n"
+               f"            raise deopt({args})\n"
+               f"        try:\n"
+               f"            result = cfunc({args})\n"
+               f"        except ArgumentError:\n"
+               f"            raise deopt({args}) from None\n"
+               f"{check}"
+               f"        return result\n"
+               f"    return wrapper\n")
+        namespace = {'ArgumentError': ctypes.ArgumentError, 'native_error': _native_error}
+        exec(src, namespace)
+        factory = _wrapper_factories[key] = namespace['make']
+    return factory
+
+
+def _make_wrapper(fn_node, cfunc, param_types, deps=None, error=None):
+    def deopt(*args):
+        # entry guard failed: the native code is only valid for its signature
+        bad = next((a for a, t in zip(args, param_types) if type(a) not in _ACCEPTS[t]), None)
+        if bad is None:
+            return JITDeopt(f"{fn_node.name}: argument out of range for "
+                            f"({', '.join(param_types)}) specialization")
+        return JITDeopt(f"{fn_node.name}: {type(bad).__name__} argument for "
+                        f"({', '.join(param_types)}) specialization")
+
+    wrapper = _wrapper_factory(param_types, error is not None)(cfunc, deopt, error)
+    wrapper.__name__ = wrapper.__qualname__ = fn_node.name
+    wrapper.signature = tuple(param_types)
+    # functions the native code calls directly, by name; callers holding the
+    # wrapper must stop using it once one of these names is rebound
+    wrapper.jit_deps = deps or {}
+    wrapper.map = _lazy_map(fn_node, wrapper.jit_deps, param_types)
+    # fastest entry point: a CPython builtin calling the native code directly
+    # (see `_native_entry`), valid while the wrapper is alive
+    wrapper.call = _native_entry(cfunc, param_types, error) or wrapper
+
+    log.debug("compiled '%s' with %d args (%s)", fn_node.name, len(param_types), ', '.join(param_types))
+
+    return wrapper
+
+
+# CPython entry points. A trampoline, compiled once per signature, is a
+# METH_FASTCALL C function: it checks the argument count and types, unboxes the
+# arguments with the C API, calls the native code whose address is the
+# builtin's `self` and boxes the result. Each compiled function gets its own
+# builtin sharing the trampoline of its signature. JUSU_JIT_TRAMPOLINES=0
+# disables them; calls then go through the generated Python wrapper and ctypes.
+_METH_FASTCALL = 0x80
+
+_PY_API = ('PyErr_SetString', 'PyErr_Occurred', 'PyErr_Clear', 'PyLong_AsLongLong', 'PyFloat_AsDouble',
+           'PyLong_AsVoidPtr', 'PyLong_FromLongLong', 'PyFloat_FromDouble', 'PyBool_FromLong')
+
+
+class _PyMethodDef(ctypes.Structure):
+    _fields_ = [('ml_name', ctypes.c_char_p), ('ml_meth', ctypes.c_void_p),
+                ('ml_flags', ctypes.c_int), ('ml_doc', ctypes.c_char_p)]
+
+
+_trampolines_ok = None
+
+
+def _trampolines_available():
+    # trampolines read `ob_type` right after the reference count, the object
+    # layout of regular (not free-threaded) CPython builds
+    global _trampolines_ok
+    if _trampolines_ok is None:
+        try:
+            _trampolines_ok = (
+                os.environ.get('JUSU_JIT_TRAMPOLINES', '1') != '0'
+                and all(ctypes.c_void_p.from_address(id(o) + ctypes.sizeof(ctypes.c_ssize_t)).value
+                        == id(type(o)) for o in (1, 1.0, True)))
+            if _trampolines_ok:
+                for name in _PY_API:
+                    binding.add_symbol(name, ctypes.cast(getattr(ctypes.pythonapi, name), ctypes.c_void_p).value)
+                ctypes.pythonapi.PyCFunction_NewEx.restype = ctypes.py_object
+                ctypes.pythonapi.PyCFunction_NewEx.argtypes = [ctypes.c_void_p, ctypes.py_object, ctypes.c_void_p]
+        except Exception as e:
+            log.info("native call trampolines unavailable: %s", e)
+            _trampolines_ok = False
+    return _trampolines_ok
+
+
+def _object_ptr(builder, obj):
+    # address of a Python object that lives as long as the process (types, exceptions)
+    return builder.inttoptr(ir.Constant(ir.IntType(64), id(obj)), ir.IntType(8).as_pointer())
+
+
+def _cstring(module, name, text):
+    data = bytearray(text.encode('utf-8') + b'\0')
+    g = ir.GlobalVariable(module, ir.ArrayType(ir.IntType(8), len(data)), name=name)
+    g.global_constant = True
+    g.linkage = 'internal'
+    g.initializer = ir.Constant(g.type.pointee, data)
+    return g
+
+
+def _lower_trampoline(module, name, param_types, ret_t, checked=False):
+    # `checked` trampolines get a pair (native code, error flag) as `self` and
+    # raise the exception of the code the call left in the flag
+    i8p = ir.IntType(8).as_pointer()
+    i64 = ir.IntType(64)
+    c_long = ir.IntType(8 * ctypes.sizeof(ctypes.c_long))
+
+    def api(symbol, ret, args):
+        return ir.Function(module, ir.FunctionType(ret, args), name=symbol)
+
+    set_string = api('PyErr_SetString', ir.VoidType(), [i8p, i8p])
+    occurred = api('PyErr_Occurred', i8p, [])
+    clear = api('PyErr_Clear', ir.VoidType(), [])
+    as_int = api('PyLong_AsLongLong', i64, [i8p])
+    as_float = api('PyFloat_AsDouble', ir.DoubleType(), [i8p])
+    as_ptr = api('PyLong_AsVoidPtr', i8p, [i8p])
+    box = {
+        'int': api('PyLong_FromLongLong', i8p, [i64]),
+        'float': api('PyFloat_FromDouble', i8p, [ir.DoubleType()]),
+        'bool': api('PyBool_FromLong', i8p, [c_long]),
+    }
+    arity_msg = _cstring(module, f"{name}_arity", f"expected {len(param_types)} arguments")
+    deopt_msg = _cstring(module, f"{name}_deopt",
+                         f"arguments do not match ({', '.join(param_types)}) specialization")
+
+    fn = ir.Function(module, ir.FunctionType(i8p, [i8p, i8p.as_pointer(), i64]), name=name)
+    self_obj, args, nargs = fn.args
+    entry = fn.append_basic_block('entry')
+    arity = fn.append_basic_block('arity')
+    deopt = fn.append_basic_block('deopt')
+    fail = fn.append_basic_block('fail')
+    builder = ir.IRBuilder(entry)
+    null = ir.Constant(i8p, None)
+
+    check = fn.append_basic_block('check')
+    builder.cbranch(builder.icmp_signed('==', nargs, ir.Constant(i64, len(param_types))), check, arity)
+    builder.position_at_end(arity)
+    builder.call(set_string, [_object_ptr(builder, TypeError), builder.bitcast(arity_msg, i8p)])
+    builder.ret(null)
+    builder.position_at_end(deopt)
+    builder.call(set_string, [_object_ptr(builder, JITDeopt), builder.bitcast(deopt_msg, i8p)])
+    builder.ret(null)
+    # unboxing failed (OverflowError for an int beyond 64 bits): let the
+    # caller run the function some other way
+    builder.position_at_end(fail)
+    builder.call(clear, [])
+    builder.branch(deopt)
+
+    # type guards
+    builder.position_at_end(check)
+    objs = []
+    for i, t in enumerate(param_types):
+        obj = builder.load(builder.gep(args, [ir.Constant(i64, i)]))
+        tp = builder.load(builder.gep(builder.bitcast(obj, i8p.as_pointer()), [ir.Constant(i64, 1)]))
+        expected = bool if t == 'bool' else (float if t == 'float' else int)
+        ok = builder.icmp_unsigned('==', tp, _object_ptr(builder, expected))
+        if t == 'float':
+            ok = builder.or_(ok, builder.icmp_unsigned('==', tp, _object_ptr(builder, int)))
+        nxt = fn.append_basic_block(f'arg{i}')
+        builder.cbranch(ok, nxt, deopt)
+        builder.position_at_end(nxt)
+        objs.append(obj)
+
+    # unbox; -1 may signal an error
+    values = []
+    maybe_error = ir.Constant(ir.IntType(1), 0)
+    for obj, t in zip(objs, param_types):
+        if t == 'bool':
+            values.append(builder.icmp_unsigned('==', obj, _object_ptr(builder, True)))
+            continue
+        if t == 'int':
+            v = builder.call(as_int, [obj])
+            maybe_error = builder.or_(maybe_error, builder.icmp_signed('==', v, ir.Constant(i64, -1)))
+        else:
+            v = builder.call(as_float, [obj])
+            maybe_error = builder.or_(maybe_error, builder.fcmp_ordered('==', v, ir.Constant(ir.DoubleType(), -1.0)))
+        values.append(v)
+    errcheck = fn.append_basic_block('errcheck')
+    call = fn.append_basic_block('call')
+    builder.cbranch(maybe_error, errcheck, call)
+    builder.position_at_end(errcheck)
+    builder.cbranch(builder.icmp_unsigned('!=', builder.call(occurred, []), null), fail, call)
+
+    builder.position_at_end(call)
+    native_ty = ir.FunctionType(_llvm_type(ret_t), [_llvm_type(t) for t in param_types])
+    address = builder.call(as_ptr, [self_obj])
+    if checked:
+        pair = builder.bitcast(address, i8p.as_pointer())
+        target = builder.bitcast(builder.load(pair), native_ty.as_pointer())
+        error = builder.load(builder.gep(pair, [ir.Constant(i64, 1)]))
+    else:
+        target = builder.bitcast(address, native_ty.as_pointer())
+    result = builder.call(target, values)
+    if checked:
+        i8 = ir.IntType(8)
+        raised = fn.append_basic_block('error')
+        ok = fn.append_basic_block('box')
+        code = builder.load(error)
+        builder.cbranch(builder.icmp_unsigned('!=', code, ir.Constant(i8, 0)), raised, ok)
+        builder.position_at_end(raised)
+        builder.store(ir.Constant(i8, 0), error)
+        switch = builder.switch(code, deopt)
+        for value, (exc, message) in _ERRORS.items():
+            block = fn.append_basic_block(f'error{value}')
+            switch.add_case(ir.Constant(i8, value), block)
+            builder.position_at_end(block)
+            msg = _cstring(module, f"{name}_error{value}", message)
+            builder.call(set_string, [_object_ptr(builder, exc), builder.bitcast(msg, i8p)])
+            builder.ret(null)
+        builder.position_at_end(ok)
+    if ret_t == 'bool':
+        result = builder.zext(result, c_long)
+    builder.ret(builder.call(box[ret_t], [result]))
+    return fn
+
+
+def _native_entry(cfunc, param_types, error=None):
+    """CPython builtin calling `cfunc`'s native code through a trampoline, or None.
+
+    With an `error` flag (see `_error_flag`) the builtin raises the exception
+    of the code the native code leaves in it.
+    """
+    engine = getattr(cfunc, '_jit_engine', None)
+    if engine is None or not _trampolines_available():
         return None
-    ret_node = None
-    for s in body:
-        print(f"[JIT] body stmt: {s.type}")
-        if s.type == 'ReturnStatement':
-            ret_node = s
-            break
-    if ret_node is None or ret_node.value is None:
-        print("[JIT] no return statement or empty return")
+    ret_t = {v: k for k, v in _CTYPES.items()}[cfunc._restype_]
+    key = (tuple(param_types), ret_t, error is not None)
+    try:
+        with engine.lock:
+            method = engine.trampolines.get(key)
+            if method is None:
+                name = f"jusu_trampoline_{len(engine.trampolines)}"
+                module = ir.Module(name=name)
+                _lower_trampoline(module, name, param_types, ret_t, checked=error is not None)
+                engine.add_module(module)
+                method = _PyMethodDef(b'jusu_native', engine.get_function_address(name),
+                                      _METH_FASTCALL, None)
+                engine.trampolines[key] = method
+        address = ctypes.cast(cfunc, ctypes.c_void_p).value
+        if error is not None:
+            # lives as long as cfunc, like the native code it points to
+            cfunc._jit_entry = (ctypes.c_void_p * 2)(address, ctypes.addressof(error))
+            address = ctypes.addressof(cfunc._jit_entry)
+        return ctypes.pythonapi.PyCFunction_NewEx(ctypes.addressof(method), address, None)
+    except Exception as e:
+        log.warning("no native call trampoline for (%s): %s", ', '.join(param_types), e)
         return None
 
-    # Decide numeric mode (float vs int)
-    is_float = _detect_float_mode(fn_node)
-    print(f"[JIT] float mode={is_float}")
 
-    # Construct LLVM IR
+def _param_types(fn_node):
+    # Default signature when no argument types were observed: float vs int mode
+    t = 'float' if _detect_float_mode(fn_node) else 'int'
+    return [t] * len(fn_node.params)
+
+
+def _bind_entry(engine, fn_node, symbol, param_types, ret_t, group, vector=False):
+    # native wrapper for a compiled symbol: scalar, or the `_vec` array entry point
+    error = _error_flag(engine.get_global_address(_error_symbol(symbol)))
+    if vector:
+        argtypes = [ctypes.c_void_p] * (len(param_types) + 1) + [ctypes.c_longlong]
+        cfunc = _bind_symbol(engine, f"{symbol}_vec", argtypes, None)
+        return _make_vector_wrapper(fn_node, cfunc, param_types, ret_t, _group_deps(group), error)
+    cfunc = _bind_symbol(engine, symbol, [_CTYPES[t] for t in param_types], _CTYPES[ret_t])
+    return _make_wrapper(fn_node, cfunc, param_types, _group_deps(group), error)
+
+
+def _load_from_cache(engine, cache, fn_node, key, group, vector=False):
+    hit = cache.load(key)
+    if hit is None:
+        return None
+    meta, data = hit
+    try:
+        engine.load_object(key, data)
+        wrapper = _bind_entry(engine, fn_node, meta['symbol'], meta['params'], meta['ret'], group, vector)
+    except Exception as e:
+        log.warning("code cache entry for '%s' unusable: %s", fn_node.name, e)
+        return None
+    log.info("loaded '%s' from code cache", fn_node.name)
+    return wrapper
+
+
+def _compile_cached(engine, cache, fn_node, resolve, param_types, vector=False):
+    """Compile one function through the code cache: load on a hit, store on a miss."""
+    group = call_group(fn_node, resolve)
+    key = cache_key(fn_node, param_types, engine, group, vector)
+    wrapper = _load_from_cache(engine, cache, fn_node, key, group, vector)
+    if wrapper is not None:
+        return wrapper
+
+    symbol = f"jusu_{fn_node.name}_{key[:16]}"
     module = ir.Module(name=f"jit_{fn_node.name}")
-    param_ty = ir.DoubleType() if is_float else ir.IntType(64)
-    func_ty = ir.FunctionType(param_ty, [param_ty] * len(params))
-    fn = ir.Function(module, func_ty, name=fn_node.name)
-    block = fn.append_basic_block('entry')
-    builder = ir.IRBuilder(block)
-
-    # Map parameter names to IR arguments
-    func_args = {}
-    for i, pname in enumerate(params):
-        arg = fn.args[i]
-        arg.name = pname
-        func_args[pname] = arg
+    spec = _lower_function(fn_node, module, symbol, group, param_types)
+    if spec is None:
+        return None
+    param_types, ret_t = spec
+    try:
+        if vector:
+            _lower_vector_entry(module, symbol, param_types, ret_t)
+        data = engine.emit_object(module)
+        engine.load_object(key, data)
+        wrapper = _bind_entry(engine, fn_node, symbol, param_types, ret_t, group, vector)
+    except Exception as e:
+        log.warning("module failed to compile: %s", e)
+        return None
+    cache.store(key, {'symbol': symbol, 'params': param_types, 'ret': ret_t}, data)
+    return wrapper
+
+
+def _compile_batch_cached(engine, cache, fn_nodes, resolve, types_for):
+    """compile_functions through the code cache: the batch is one module and
+    one entry, keyed on the cache keys of all its functions.
 
+    Batch entries are separate from per-function ones, so
+    `load_cached_function` does not find functions compiled in a batch.
+    """
+    members = []
+    for fn_node in fn_nodes:
+        group = call_group(fn_node, resolve)
+        param_types = types_for(fn_node)
+        members.append((fn_node, group, param_types, cache_key(fn_node, param_types, engine, group)))
+    material = {'format': _CACHE_FORMAT, 'batch': sorted(key for _, _, _, key in members)}
+    key = hashlib.sha256(json.dumps(material).encode('utf-8')).hexdigest()
+
+    hit = cache.load(key)
+    if hit is not None:
+        meta, data = hit
+        try:
+            engine.load_object(key, data)
+            compiled = {}
+            for fn_node, group, _, _ in members:
+                entry = meta['functions'].get(fn_node.name)
+                if entry is not None:
+                    compiled[fn_node.name] = _bind_entry(engine, fn_node, entry['symbol'], entry['params'],
+                                                         entry['ret'], group)
+            log.info("loaded batch of %d functions from code cache", len(compiled))
+            return compiled
+        except Exception as e:
+            log.warning("code cache entry for batch unusable: %s", e)
+
+    # symbols are unique per batch, so the same function can also be loaded
+    # from its own entry or another batch
+    module = ir.Module(name=f"jit_batch_{key[:16]}")
+    specs = []
+    for fn_node, group, param_types, _ in members:
+        symbol = f"jusu_{fn_node.name}_{key[:16]}"
+        spec = _lower_function(fn_node, module, symbol, group, param_types)
+        if spec is not None:
+            specs.append((fn_node, symbol, group) + spec)
+    if not specs:
+        return {}
     try:
-        ret_val = _expr_to_ir(ret_node.value, builder, func_args, module, is_float=is_float)
-    except JITCompileError as e:
-        print(f"[JIT] expression not supported: {e}")
+        data = engine.emit_object(module)
+        engine.load_object(key, data)
+    except Exception as e:
+        log.warning("module failed to compile: %s", e)
+        return {}
+    compiled, functions = {}, {}
+    for fn_node, symbol, group, param_types, ret_t in specs:
+        try:
+            compiled[fn_node.name] = _bind_entry(engine, fn_node, symbol, param_types, ret_t, group)
+        except JITCompileError:
+            continue
+        functions[fn_node.name] = {'symbol': symbol, 'params': param_types, 'ret': ret_t}
+    cache.store(key, {'functions': functions}, data)
+    return compiled
+
+
+def load_cached_function(fn_node, resolve=None, signature=None):
+    """Return a native callable for `fn_node` if the code cache has it, else None.
+
+    Never compiles; tried when a function gets hot, before compiling it, so a
+    new process skips the compilation. `resolve` is as for `call_group`,
+    `signature` as for `compile_simple_function`.
+    """
+    if not _HAS_LLVM:
+        return None
+    cache = get_code_cache()
+    if cache is None:
         return None
+    engine = get_engine()
+    group = call_group(fn_node, resolve)
+    param_types = list(signature) if signature is not None else _param_types(fn_node)
+    return _load_from_cache(engine, cache, fn_node, cache_key(fn_node, param_types, engine, group), group)
+
+
+def compile_simple_function(fn_node, resolve=None, signature=None):
+    """Try to compile a FunctionDeclaration AST node to a native callable.
+    Returns a Python callable taking ints/doubles and returning ints/doubles/bools,
+    or None if unsupported. The function is built into the shared SSA IR
+    (`runtime/ssa.py`), optimized there, lowered to LLVM IR and added to the
+    process-wide engine.
 
-    # Ensure result is correct return type
-    if is_float:
-        if not isinstance(ret_val.type, ir.DoubleType):
-            # convert integer result to double
-            ret_val = builder.sitofp(ret_val, ir.DoubleType())
+    `signature` is a tuple of parameter types ('int', 'float', 'bool') to
+    specialize for, normally observed argument types (see `signature()`). The
+    callable raises JITDeopt when called with arguments its signature does not
+    accept; callers then run the function some other way.
+
+    Self-recursive calls, and calls to functions `resolve(name)` maps to a
+    FunctionDeclaration, are compiled as direct native calls (see `call_group`).
+    The callable's `jit_deps` lists the names it binds that way.
+    """
+    signatures = None if signature is None else {fn_node.name: signature}
+    compiled = compile_functions([fn_node], resolve, signatures)
+    return compiled.get(fn_node.name)
+
+
+def compile_functions(fn_nodes, resolve=None, signatures=None):
+    """Compile several FunctionDeclarations as one batch.
+
+    All eligible functions are lowered into a single IR module that is added to
+    the shared engine at once; with the code cache enabled, the module's
+    object code is cached as one entry for the whole batch. Returns {name: callable} for the functions that
+    compiled; ineligible ones are left out. Without `resolve`, functions of
+    the batch can call each other. `signatures` optionally maps names to the
+    signature to specialize for.
+    """
+    if not _HAS_LLVM:
+        return {}
+    if resolve is None:
+        resolve = {node.name: node for node in fn_nodes}.get
+    signatures = signatures or {}
+
+    def types_for(fn_node):
+        sig = signatures.get(fn_node.name)
+        return list(sig) if sig is not None else _param_types(fn_node)
+
+    engine = get_engine()
+    cache = get_code_cache()
+    if cache is not None:
+        if len(fn_nodes) == 1:
+            wrapper = _compile_cached(engine, cache, fn_nodes[0], resolve, types_for(fn_nodes[0]))
+            return {} if wrapper is None else {fn_nodes[0].name: wrapper}
+        return _compile_batch_cached(engine, cache, fn_nodes, resolve, types_for)
+
+    module = ir.Module(name=f"jit_batch_{len(engine.modules)}")
+    specs = []
+    for fn_node in fn_nodes:
+        symbol = engine.unique_symbol(fn_node.name)
+        group = call_group(fn_node, resolve)
+        spec = _lower_function(fn_node, module, symbol, group, types_for(fn_node))
+        if spec is not None:
+            specs.append((fn_node, symbol, group) + spec)
+    if not specs:
+        return {}
+
+    try:
+        engine.add_module(module)
+    except Exception as e:
+        log.warning("module failed to compile: %s", e)
+        return {}
+
+    compiled = {}
+    for fn_node, symbol, group, param_types, ret_t in specs:
+        try:
+            compiled[fn_node.name] = _bind_entry(engine, fn_node, symbol, param_types, ret_t, group)
+        except JITCompileError:
+            continue
+    return compiled
+
+
+# Ahead-of-time builds (`jusu build`): every eligible function of a program is
+# compiled into one position-independent object and linked into a shared
+# library, described by a JSON manifest. `runtime.compiler.load_native_library`
+# binds the functions at startup.
+AOT_FORMAT = 4
+
+
+def _shared_library_suffix():
+    if sys.platform == 'win32':
+        return '.dll'
+    if sys.platform == 'darwin':
+        return '.dylib'
+    return '.so'
+
+
+def build_library(fn_nodes, output, signatures=None, opt_level=None, cpu=None, source=None):
+    """Compile `fn_nodes` to `<output>.so` (.dylib/.dll) plus `<output>.json`.
+
+    Each function is specialized for `signatures[name]`, by default 'float'
+    for every parameter since Jusu number literals are floats. Functions the
+    JIT cannot compile are listed under 'skipped' and keep being interpreted.
+    `cpu` defaults to the host CPU ('generic' builds a portable library). The
+    object is linked with `$CC` (default `cc`). Returns the manifest.
+    """
+    import subprocess
+    import tempfile
+    if not _HAS_LLVM:
+        raise JITCompileError("llvmlite not available")
+    signatures = signatures or {}
+    opt_level = _opt_level(DEFAULT_OPT_LEVEL if opt_level is None else opt_level)
+    if cpu is None:
+        cpu, features = binding.get_host_cpu_name(), binding.get_host_cpu_features().flatten()
     else:
-        if not isinstance(ret_val.type, ir.IntType) or ret_val.type.width != 64:
-            ret_val = builder.sext(ret_val, ir.IntType(64))
+        features = ''
+    target_machine = binding.Target.from_default_triple().create_target_machine(
+        cpu=cpu, features=features, opt=opt_level, reloc='pic', codemodel='default')
+
+    # later declarations replace earlier ones, as when the program runs
+    nodes = {node.name: node for node in fn_nodes}
+    module = ir.Module(name='jusu_aot')
+    functions, skipped = {}, []
+    for name, node in nodes.items():
+        sig = list(signatures.get(name) or ['float'] * len(node.params))
+        symbol = f"jusu_aot_{name}"
+        group = call_group(node, nodes.get)
+        spec = _lower_function(node, module, symbol, group, sig)
+        if spec is None:
+            skipped.append(name)
+            continue
+        functions[name] = {
+            'symbol': symbol,
+            'params': spec[0],
+            'ret': spec[1],
+            'ast': ast_hash(node),
+            'callees': {callee.name: ast_hash(callee) for callee in group[1:]},
+        }
+        if _error_symbol(symbol) in module.globals:
+            functions[name]['error'] = _error_symbol(symbol)
+
+    module.triple = target_machine.triple
+    module.data_layout = str(target_machine.target_data)
+    mod = binding.parse_assembly(str(module))
+    mod.verify()
+    _optimize_module(mod, target_machine, opt_level)
+
+    library = output + _shared_library_suffix()
+    with tempfile.TemporaryDirectory() as tmp:
+        obj = os.path.join(tmp, 'jusu_aot.o')
+        with open(obj, 'wb') as f:
+            f.write(target_machine.emit_object(mod))
+        cc = os.environ.get('CC', 'cc')
+        try:
+            libm = [] if sys.platform in ('win32', 'darwin') else ['-lm']
+            subprocess.run([cc, '-shared', '-o', library, obj] + libm, check=True,
+                           capture_output=True, text=True)
+        except (OSError, subprocess.CalledProcessError) as e:
+            detail = getattr(e, 'stderr', None) or e
+            raise JITCompileError(f"linking {library} with {cc} failed: {detail}")
+
+    manifest = {
+        'format': AOT_FORMAT,
+        'source': source,
+        'library': os.path.basename(library),
+        'triple': target_machine.triple,
+        'cpu': cpu,
+        'opt_level': opt_level,
+        'functions': functions,
+        'skipped': skipped,
+    }
+    with open(output + '.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    log.info("built %s: %d functions, %d skipped", library, len(functions), len(skipped))
+    return manifest
+
 
-    builder.ret(ret_val)
+def bind_native_function(fn_node, address, param_types, ret_t, deps=None, owner=None, error=0):
+    """Wrap native code at `address` (e.g. from an AOT library) like a JIT function.
 
+    `owner` (the loaded library) is kept alive with the wrapper. `error` is
+    the address of the function's error flag, 0 if it has none.
+    """
+    cfunc = ctypes.CFUNCTYPE(_CTYPES[ret_t], *[_CTYPES[t] for t in param_types])(address)
+    cfunc._jit_owner = owner
+    if _HAS_LLVM:
+        # hosts the call trampoline
+        cfunc._jit_engine = get_engine()
+    return _make_wrapper(fn_node, cfunc, list(param_types), deps, _error_flag(error))
+
+
+# Vector entry points: `<symbol>_vec(in_0, ..., in_k, out, n)` applies the scalar
+# function to n elements of contiguous buffers. Elements are stored as i64,
+# double or i8 (bool) with these array.array typecodes.
+_VECTOR_TYPECODES = {'int': 'q', 'float': 'd', 'bool': 'b'}
+
+# buffer formats (struct / array.array / numpy codes) by element type
+_BUFFER_TYPES = {
+    'b': 'int', 'B': 'int', 'h': 'int', 'H': 'int', 'i': 'int', 'I': 'int',
+    'l': 'int', 'L': 'int', 'q': 'int', 'Q': 'int', 'n': 'int', 'N': 'int',
+    'f': 'float', 'd': 'float', '?': 'bool',
+}
+
+
+def _element_type(t):
+    return ir.IntType(8) if t == 'bool' else _llvm_type(t)
+
+
+def _lower_vector_entry(module, symbol, param_types, ret_t):
+    """Emit `<symbol>_vec`, a loop calling `symbol` over whole buffers.
+
+    The scalar function is inlined into the loop at O2 and above, where LLVM's
+    loop vectorizer can then process several elements per iteration. Buffers
+    are marked noalias: callers always pass a freshly allocated output.
+    """
+    scalar = module.globals[symbol]
+    i64 = ir.IntType(64)
+    ptr_types = [_element_type(t).as_pointer() for t in list(param_types) + [ret_t]]
+    fn = ir.Function(module, ir.FunctionType(ir.VoidType(), ptr_types + [i64]), name=f"{symbol}_vec")
+    *inputs, out, n = fn.args
+    for arg in inputs + [out]:
+        arg.add_attribute('noalias')
+        arg.add_attribute('nocapture')
+    entry = fn.append_basic_block('entry')
+    loop = fn.append_basic_block('loop')
+    done = fn.append_basic_block('done')
+
+    builder = ir.IRBuilder(entry)
+    builder.cbranch(builder.icmp_signed('>', n, ir.Constant(i64, 0)), loop, done)
+    builder.position_at_end(loop)
+    i = builder.phi(i64, name='i')
+    i.add_incoming(ir.Constant(i64, 0), entry)
+    args = []
+    for ptr, t in zip(inputs, param_types):
+        value = builder.load(builder.gep(ptr, [i]))
+        args.append(builder.trunc(value, ir.IntType(1)) if t == 'bool' else value)
+    result = builder.call(scalar, args)
+    if ret_t == 'bool':
+        result = builder.zext(result, ir.IntType(8))
+    builder.store(result, builder.gep(out, [i]))
+    nxt = builder.add(i, ir.Constant(i64, 1))
+    i.add_incoming(nxt, loop)
+    builder.cbranch(builder.icmp_signed('<', nxt, n), loop, done)
+    builder.position_at_end(done)
+    builder.ret_void()
+    return fn
+
+
+def _is_scalar(value):
+    return type(value) in _SIGNATURE_TYPES
+
+
+def _is_numpy(value):
+    return type(value).__module__ == 'numpy'
+
+
+def _map_length(arrays):
+    # common length of the array arguments; scalars are broadcast
+    lengths = {len(a) for a in arrays if not _is_scalar(a)}
+    if not lengths:
+        raise TypeError("map needs at least one array argument")
+    if len(lengths) > 1:
+        raise ValueError(f"map arguments have different lengths: {sorted(lengths)}")
+    return lengths.pop()
+
+
+def array_signature(arrays):
+    """Element type signature of `map` arguments, or None if one is not numeric.
+
+    Buffers (array.array, numpy arrays) are typed by their format; lists and
+    tuples are 'int' or 'bool' if every element is, 'float' if they mix ints
+    and floats.
+    """
+    sig = []
+    for a in arrays:
+        if _is_scalar(a):
+            sig.append(_SIGNATURE_TYPES[type(a)])
+            continue
+        try:
+            fmt = memoryview(a).format
+        except TypeError:
+            types = {type(x) for x in a}
+            if types == {int} or types == {bool}:
+                sig.append(_SIGNATURE_TYPES[types.pop()])
+            elif types and types <= {int, float}:
+                sig.append('float')
+            else:
+                return None
+            continue
+        t = _BUFFER_TYPES.get(fmt.lstrip('@=<'))
+        if t is None:
+            return None
+        sig.append(t)
+    return tuple(sig)
+
+
+def _as_buffer(fn_node, value, t, n):
+    """Return a contiguous buffer of `n` elements of type `t` holding `value`."""
+    code = _VECTOR_TYPECODES[t]
+    if _is_scalar(value):
+        items = [value]
+    else:
+        try:
+            view = memoryview(value)
+        except TypeError:
+            items = value
+        else:
+            if (view.ndim == 1 and view.c_contiguous and not view.readonly
+                    and view.itemsize == array.array(code).itemsize
+                    and _BUFFER_TYPES.get(view.format.lstrip('@=<')) == t):
+                return value
+            items = view.tolist()
+    accepts = _ACCEPTS[t]
+    if not all(type(x) in accepts for x in items):
+        raise JITDeopt(f"{fn_node.name}: array elements do not match ({t}) specialization")
+    try:
+        buf = array.array(code, items)
+    except OverflowError:
+        raise JITDeopt(f"{fn_node.name}: array elements out of range for ({t}) specialization") from None
+    return buf * n if _is_scalar(value) else buf
+
+
+def _make_vector_wrapper(fn_node, cfunc, param_types, ret_t, deps=None, error=None):
+    params = fn_node.params
+    code = _VECTOR_TYPECODES[ret_t]
+
+    def vector(*arrays):
+        if len(arrays) != len(params):
+            raise TypeError(f"{fn_node.name} expects {len(params)} arguments, got {len(arrays)}")
+        n = _map_length(arrays)
+        buffers = [_as_buffer(fn_node, a, t, n) for a, t in zip(arrays, param_types)]
+        out = array.array(code, bytes(array.array(code).itemsize * n))
+        if n:
+            addresses = [ctypes.addressof(ctypes.c_char.from_buffer(b)) for b in buffers + [out]]
+            cfunc(*addresses, n)
+            if error is not None and error.value:
+                raise _native_error(error)
+        # results come back in the kind of container that was passed in
+        if any(_is_numpy(a) for a in arrays):
+            numpy = sys.modules['numpy']
+            return numpy.frombuffer(out, dtype='?' if ret_t == 'bool' else code)
+        if any(not _is_scalar(a) and not isinstance(a, (list, tuple)) for a in arrays):
+            return out
+        return [bool(x) for x in out] if ret_t == 'bool' else out.tolist()
+
+    vector.signature = tuple(param_types)
+    vector.jit_deps = deps or {}
+    return vector
+
+
+def _lazy_map(fn_node, deps, param_types):
+    # `map` of a native wrapper: builds the vector entry point on first use
+    resolve = {fn_node.name: fn_node, **deps}.get
+    compiled = []
+
+    def map_(*arrays):
+        if not compiled:
+            vector = compile_vector_function(fn_node, resolve, param_types)
+            if vector is None:
+                raise JITCompileError(f"no vector entry point for '{fn_node.name}'")
+            compiled.append(vector)
+        return compiled[0](*arrays)
+
+    return map_
+
+
+def compile_vector_function(fn_node, resolve=None, signature=None):
+    """Compile the array entry point of `fn_node`; returns a callable or None.
+
+    The callable takes one array (list, tuple, array.array or numpy array) or
+    scalar per parameter, applies the function to every element in native code
+    and returns a list for list/tuple arguments, an array.array for buffers and
+    a numpy array for numpy arguments. Arguments whose elements do not match
+    `signature` raise JITDeopt. `resolve` and `signature` are as for
+    `compile_simple_function`.
+    """
+    if not _HAS_LLVM:
+        return None
+    engine = get_engine()
+    param_types = list(signature) if signature is not None else _param_types(fn_node)
+    cache = get_code_cache()
+    if cache is not None:
+        return _compile_cached(engine, cache, fn_node, resolve, param_types, vector=True)
+
+    group = call_group(fn_node, resolve)
+    symbol = engine.unique_symbol(fn_node.name)
+    module = ir.Module(name=f"jit_{fn_node.name}_vec")
+    spec = _lower_function(fn_node, module, symbol, group, param_types)
+    if spec is None:
+        return None
+    param_types, ret_t = spec
     try:
-        cfunc = _compile_ir_to_callable(module, fn_node.name, len(params), is_float=is_float)
-    except Exception:
+        _lower_vector_entry(module, symbol, param_types, ret_t)
+        engine.add_module(module)
+        return _bind_entry(engine, fn_node, symbol, param_types, ret_t, group, vector=True)
+    except Exception as e:
+        log.warning("module failed to compile: %s", e)
         return None
 
-    def wrapper(*args):
-        if len(args) != len(params):
-            raise TypeError(f"{fn_node.name} expects {len(params)} arguments, got {len(args)}")
-        if is_float:
-            return float(cfunc(*[float(a) for a in args]))
-        return int(cfunc(*[int(a) for a in args]))
 
-    # Debug: indicate successful JIT compilation
+def map_array(fn, *arrays):
+    """Apply `fn` to every element of `arrays` (scalars are broadcast).
+
+    Native wrappers and Jusu functions whose profile (see `runtime.tiering`)
+    finds the map hot run through a vector entry point; anything else, and
+    elements the native code does not accept, is called once per element and
+    returns a list.
+    """
+    n = _map_length(arrays)
+    profile = getattr(fn, 'profile', None)
     try:
-        print(f"[JIT] compiled function '{fn_node.name}' with {len(params)} args (float={is_float})")
-    except Exception:
+        if profile is not None:
+            sig = array_signature(arrays)
+            vector = profile.vector(sig, n) if sig is not None else None
+            if vector is not None:
+                return vector(*arrays)
+        elif callable(getattr(fn, 'map', None)) and hasattr(fn, 'jit_deps'):
+            return fn.map(*arrays)
+    except JITDeopt:
         pass
-
-    return wrapper
+    columns = [[a] * n if _is_scalar(a) else a for a in arrays]
+    return [fn(*args) for args in zip(*columns)]
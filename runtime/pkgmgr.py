@@ -28,35 +28,41 @@ def register_builtin(name: str, obj: Any):
     _registered[name] = obj
 
 
+def plugin_entry_points() -> Dict[str, Any]:
+    """Entry points of the `jusu.plugins` group by name, not yet loaded."""
+    try:
+        # Python 3.10+: entry_points returns Selection
+        from importlib.metadata import entry_points
+        eps = entry_points()
+        group = eps.select(group='jusu.plugins') if hasattr(eps, 'select') else eps.get('jusu.plugins', [])
+    except Exception:
+        # Fallback older behavior
+        from importlib.metadata import entry_points
+        group = entry_points().get('jusu.plugins', [])
+    return {ep.name: ep for ep in group}
+
+
+def load_entry_point(ep) -> Any:
+    """Object a plugin entry point provides: the result of calling a loader
+    factory, or the loaded module itself."""
+    loader = ep.load()
+    return loader() if callable(loader) else loader
+
+
 def discover_plugins() -> Dict[str, Any]:
     """Discover plugins via entry points and include programmatic registrations.
 
     Returns a mapping name -> object suitable for insertion into builtins.
+    Loads every plugin; the runtime uses `stdlib.load_plugin` to load them on
+    first use instead.
     """
     plugins: Dict[str, Any] = dict(_registered)
 
     # Try to load entry points if importlib.metadata is available
     try:
-        try:
-            # Python 3.10+: entry_points returns Selection
-            from importlib.metadata import entry_points
-            eps = entry_points()
-            group = eps.select(group='jusu.plugins') if hasattr(eps, 'select') else eps.get('jusu.plugins', [])
-        except Exception:
-            # Fallback older behavior
-            from importlib.metadata import entry_points
-            group = entry_points().get('jusu.plugins', [])
-
-        for ep in group:
+        for name, ep in plugin_entry_points().items():
             try:
-                name = ep.name
-                loader = ep.load()
-                # loader can be a callable factory or a module object
-                if callable(loader):
-                    obj = loader()
-                else:
-                    obj = loader
-                plugins[name] = obj
+                plugins[name] = load_entry_point(ep)
             except Exception:
                 # Skip faulty plugins to keep discovery robust
                 continue
@@ -0,0 +1,308 @@
+"""
+Profiler for Jusu++ programs.
+
+Attributes run time to Jusu functions and source lines rather than to the
+Python functions of the runtime:
+
+- 'sample' (default): a SIGPROF timer (a thread on platforms without
+  `signal.setitimer`) takes a sample every `interval` seconds of CPU time and
+  reads the Jusu call stack off the Python stack: `Interpreter.execute` frames
+  give the statement and its `line`, interpreted function calls the function,
+  and VM frames their call stack, with the stack VM's line table
+  (`BytecodeCompiler.lines`) mapping the program counter to a line. Register VM
+  frames are attributed to their function only. Native (JIT-compiled) code
+  counts towards the calling Jusu function.
+- 'deterministic': `sys.setprofile` follows every statement and function call
+  of the interpreter and measures time between them; exact, with call counts,
+  but much slower and only for the 'interp' backend. Native code is suspended
+  while it runs (`tiering.suspend_native`), since calls made inside native
+  code would not be seen.
+
+`Profiler.format_flat()` prints a flat profile per function and per line;
+`Profiler.collapsed()` returns stacks in the collapsed format read by
+flamegraph.pl, speedscope and similar tools. `jusu profile` runs a file
+under the profiler.
+"""
+import signal
+import sys
+import threading
+import time
+import types
+from collections import Counter
+
+from runtime import interpreter as _interpreter
+from runtime import register_vm as _register_vm
+from runtime import tiering
+from runtime import vm as _vm
+
+MODES = ('sample', 'deterministic')
+DEFAULT_INTERVAL = 0.001
+# frame name of top-level code
+MODULE = '<module>'
+
+
+def _nested_code(code, name):
+    # code object of a function defined (at any depth) inside `code`
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            if const.co_name == name:
+                return const
+            found = _nested_code(const, name)
+            if found is not None:
+                return found
+    return None
+
+
+_EXECUTE = _interpreter.Interpreter.execute.__code__
+# JITFunction.__call__, the call of an interpreted Jusu function
+_FUNCTION_CALL = _nested_code(_EXECUTE, '__call__')
+_VM_RUN = _vm.VM.run.__code__
+_REGVM_EXECUTE = _register_vm.RegisterVM._execute.__code__
+
+
+def _vm_stack(vm):
+    # (function, line) per VM frame, outermost first
+    frames = [(f['function'], f['lines'], f['pc']) for f in list(vm.call_stack)]
+    frames.append((vm.function, vm.lines, vm.pc))
+    stack = []
+    for fn, lines, pc in frames:
+        node = fn[5] if fn is not None and len(fn) > 5 else None
+        name = MODULE if fn is None else getattr(node, 'name', '<function>')
+        # pc already points past the instruction being executed
+        stack.append((name, lines[pc - 1] if 0 < pc <= len(lines) else None))
+    return stack
+
+
+def _regvm_stack(vm, code):
+    functions = {id(decoded): fn for fn, decoded in list(vm._decoded.values())}
+    stack = []
+    for c in [entry[0] for entry in list(vm.call_stack)] + [code]:
+        fn = functions.get(id(c))
+        node = fn[6] if fn is not None and len(fn) > 6 else None
+        if fn is None:
+            stack.append((MODULE, None))
+        else:
+            stack.append((getattr(node, 'name', '<function>'), getattr(node, 'line', None)))
+    return stack
+
+
+def jusu_stack(frame):
+    """Jusu call stack for the Python stack ending at `frame`: a list of
+    (function, line) pairs, outermost first; empty outside Jusu code."""
+    stack = []  # innermost first
+    line = None
+    while frame is not None:
+        code = frame.f_code
+        if code is _EXECUTE:
+            if line is None:
+                line = getattr(frame.f_locals.get('node'), 'line', None)
+        elif code is _FUNCTION_CALL:
+            node = frame.f_locals['self'].node
+            stack.append((node.name, line if line is not None else node.line))
+            line = None
+        elif code is _VM_RUN:
+            stack.extend(reversed(_vm_stack(frame.f_locals['self'])))
+        elif code is _REGVM_EXECUTE:
+            f_locals = frame.f_locals
+            stack.extend(reversed(_regvm_stack(f_locals['self'], f_locals['code'])))
+        frame = frame.f_back
+    if line is not None:
+        stack.append((MODULE, line))
+    stack.reverse()
+    return stack
+
+
+class Profiler:
+    """Collects Jusu stacks while started (`start`/`stop` or `with`).
+
+    `stacks` maps tuples of (function, line) frames, outermost first, to a
+    weight: samples in 'sample' mode, seconds in 'deterministic' mode.
+    `filename` labels lines in reports.
+    """
+
+    def __init__(self, mode='sample', interval=DEFAULT_INTERVAL, filename=None):
+        if mode not in MODES:
+            raise ValueError(f"unknown profiler mode {mode!r}, expected one of {', '.join(MODES)}")
+        if interval <= 0:
+            raise ValueError("sampling interval must be positive")
+        self.mode = mode
+        self.interval = interval
+        self.filename = filename
+        self.stacks = Counter()
+        # calls per function ('deterministic' mode)
+        self.calls = Counter()
+        self.elapsed = 0.0
+        self._started = None
+        self._thread = None
+        self._stop_event = None
+        self._previous_handler = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        if self._started is not None:
+            raise RuntimeError("profiler already started")
+        self._started = time.perf_counter()
+        if self.mode == 'deterministic':
+            self._frames = [[MODULE, None]]
+            self._saved_lines = []
+            self._last = self._started
+            tiering.suspend_native()
+            sys.setprofile(self._event)
+        elif hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        else:
+            target = threading.get_ident()
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._sample_thread, args=(target,),
+                                            name='jusu-profiler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._started is None:
+            return
+        if self.mode == 'deterministic':
+            sys.setprofile(None)
+            tiering.resume_native()
+            self._charge()
+        elif self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        self.elapsed += time.perf_counter() - self._started
+        self._started = None
+
+    # sampling
+
+    def _sample(self, frame):
+        stack = jusu_stack(frame)
+        if stack:
+            self.stacks[tuple(stack)] += 1
+
+    def _on_signal(self, signum, frame):
+        self._sample(frame)
+
+    def _sample_thread(self, target):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                self._sample(frame)
+
+    # deterministic
+
+    def _charge(self):
+        # time since the last event goes to the current stack
+        now = time.perf_counter()
+        if len(self._frames) > 1 or self._frames[0][1] is not None:
+            self.stacks[tuple(tuple(f) for f in self._frames)] += now - self._last
+        self._last = now
+
+    def _event(self, frame, event, arg):
+        if event not in ('call', 'return'):
+            return
+        code = frame.f_code
+        if code is _EXECUTE:
+            self._charge()
+            top = self._frames[-1]
+            if event == 'call':
+                self._saved_lines.append(top[1])
+                top[1] = getattr(frame.f_locals.get('node'), 'line', None)
+            elif self._saved_lines:
+                top[1] = self._saved_lines.pop()
+        elif code is _FUNCTION_CALL:
+            self._charge()
+            if event == 'call':
+                node = frame.f_locals['self'].node
+                self._frames.append([node.name, node.line])
+                self._saved_lines.append(None)
+                self.calls[node.name] += 1
+            elif len(self._frames) > 1:
+                self._frames.pop()
+                self._saved_lines.pop()
+
+    # reports
+
+    def seconds(self, weight):
+        """Time represented by a weight of `stacks`."""
+        return weight * self.interval if self.mode == 'sample' else weight
+
+    @property
+    def total(self):
+        return sum(self.stacks.values())
+
+    def functions(self):
+        """{function: (self weight, total weight)}; total counts recursive frames once."""
+        own, total = Counter(), Counter()
+        for stack, weight in self.stacks.items():
+            own[stack[-1][0]] += weight
+            for name in {name for name, _ in stack}:
+                total[name] += weight
+        return {name: (own[name], total[name]) for name in total}
+
+    def lines(self):
+        """{(function, line): self weight}."""
+        lines = Counter()
+        for stack, weight in self.stacks.items():
+            lines[stack[-1]] += weight
+        return lines
+
+    def _where(self, line):
+        return f"{self.filename}:{line}" if self.filename else f"line {line}"
+
+    def _label(self, frame):
+        name, line = frame
+        return name if line is None else f"{name} ({self._where(line)})"
+
+    def collapsed(self):
+        """Stacks in collapsed format, one `frame;frame;... weight` line each;
+        weights are samples, or microseconds in 'deterministic' mode."""
+        rows = []
+        for stack, weight in self.stacks.items():
+            weight = weight if self.mode == 'sample' else round(weight * 1e6)
+            if weight:
+                rows.append(f"{';'.join(self._label(f) for f in stack)} {weight}")
+        return ''.join(row + '\n' for row in sorted(rows))
+
+    def format_flat(self, limit=20):
+        """Flat profile: functions by self time, then the hottest lines."""
+        total = self.total or 1
+        if self.mode == 'sample':
+            header = f"Jusu profile: {self.total} samples every {self.interval * 1e3:g} ms"
+        else:
+            header = f"Jusu profile: deterministic, {self.seconds(self.total):.3f} s in Jusu code"
+        out = [header, '',
+               f"{'self %':>7} {'self s':>8} {'total %':>8} {'total s':>8} {'calls':>7}  function"]
+        functions = sorted(self.functions().items(), key=lambda kv: (-kv[1][0], -kv[1][1], kv[0]))
+        for name, (own, cumulative) in functions[:limit]:
+            calls = self.calls.get(name, '') if self.mode == 'deterministic' else ''
+            out.append(f"{own / total:>7.1%} {self.seconds(own):>8.3f} {cumulative / total:>8.1%} "
+                       f"{self.seconds(cumulative):>8.3f} {calls:>7}  {name}")
+        out += ['', f"{'self %':>7} {'self s':>8}  line"]
+        lines = sorted(self.lines().items(), key=lambda kv: -kv[1])
+        for (name, line), own in lines[:limit]:
+            where = self._where(line) if line is not None else '-'
+            out.append(f"{own / total:>7.1%} {self.seconds(own):>8.3f}  {where}  {name}")
+        return '\n'.join(out)
+
+
+def profile_source(source_code, backend='interp', mode='sample', interval=DEFAULT_INTERVAL, filename=None):
+    """Run Jusu++ source under a Profiler and return the profiler.
+
+    Errors of the program propagate after the profiler is stopped.
+    """
+    if mode == 'deterministic' and backend != 'interp':
+        raise ValueError("deterministic profiling needs the 'interp' backend; use mode='sample'")
+    from runtime.compiler import run_source
+    profiler = Profiler(mode, interval, filename)
+    with profiler:
+        run_source(source_code, backend)
+    return profiler
@@ -1,9 +1,46 @@
 """
 A small register-based compiler for a subset of Jusu++ used for benchmarking.
-Produces a simple register IR: tuples like ('LOADC', dst, const_idx), ('LOAD_NAME', dst, name_idx),
-('STORE_NAME', name_idx, src_reg), ('ADD', dst, r1, r2), ('CALL', dst, fn_reg, [arg_regs]), ('RETURN', src_reg)
+Produces a simple register IR with integer opcodes: tuples like (LOADC, dst, const_idx),
+(LOAD_NAME, dst, name_idx), (STORE_NAME, name_idx, src_reg), (ADD, dst, r1, r2),
+(CALL, dst, fn_reg, [arg_regs]), (RETURN, src_reg), (JUMP, target), (JUMP_IF_FALSE, cond_reg, target).
+MOVE (dst, src) assigns function locals and SSA phis; the passes in `runtime.register_opt` add more.
+Use `runtime.register_vm.disassemble` to get a readable listing.
 """
 from compiler.parser import ASTNode
+from runtime import ssa
+
+from runtime.register_vm import (
+    LOADC, LOAD_NAME, STORE_NAME, ADD, SUB, MUL, DIV, LT, GT, LE, GE, EQ, NE,
+    CALL, RETURN, JUMP, JUMP_IF_FALSE, MOVE,
+)
+
+_BINARY_OPCODES = {
+    '+': ADD,
+    '-': SUB,
+    '*': MUL,
+    '/': DIV,
+    '<': LT,
+    '>': GT,
+    '<=': LE,
+    '>=': GE,
+    '==': EQ,
+    '!=': NE,
+}
+
+
+def _assigned_names(body):
+    """Names bound by assignments and declarations in `body`, nested ifs included."""
+    names = []
+    for s in body:
+        if s.type in ('Assignment', 'FunctionDeclaration'):
+            if s.name not in names:
+                names.append(s.name)
+        elif s.type == 'IfStatement':
+            for name in _assigned_names(s.then_branch + (s.else_branch or [])):
+                if name not in names:
+                    names.append(name)
+    return names
+
 
 class RegisterCompiler:
     def __init__(self):
@@ -14,12 +51,12 @@ class RegisterCompiler:
         self.reg_count = 0
 
     def _add_const(self, v):
-        try:
-            idx = self.consts.index(v)
-        except ValueError:
-            idx = len(self.consts)
-            self.consts.append(v)
-        return idx
+        # match on type as well so 1.0, 1 and True get separate slots
+        for idx, c in enumerate(self.consts):
+            if type(c) is type(v) and c == v:
+                return idx
+        self.consts.append(v)
+        return len(self.consts) - 1
 
     def _add_name(self, name):
         try:
@@ -35,68 +72,127 @@ class RegisterCompiler:
         self.reg_count = max(self.reg_count, self.next_reg)
         return r
 
+    def _collect_inline_candidates(self, ast):
+        """Top-level functions declared once and never reassigned may be inlined."""
+        decls = {}
+        assigned = set()
+        for stmt in ast:
+            if stmt.type == 'FunctionDeclaration':
+                decls.setdefault(stmt.name, []).append(stmt)
+            elif stmt.type == 'Assignment':
+                assigned.add(stmt.name)
+        self.inline_candidates = {name: nodes[0] for name, nodes in decls.items()
+                                  if len(nodes) == 1 and name not in assigned}
+        self._inline_cache = {}
+
+    def _lookup_inline(self, name):
+        if name not in self._inline_cache:
+            node = getattr(self, 'inline_candidates', {}).get(name)
+            fn = None
+            if node is not None:
+                try:
+                    fn = ssa.constant_propagation(ssa.build_function(node))
+                except ssa.SSAUnsupported:
+                    fn = None
+            self._inline_cache[name] = fn
+        return self._inline_cache[name]
+
+    def _compile_function_ssa(self, node):
+        """Compile a function through the shared SSA IR; None if unsupported."""
+        try:
+            fn = ssa.build_function(node)
+        except ssa.SSAUnsupported:
+            return None
+        lookup = self._lookup_inline if hasattr(self, 'inline_candidates') else None
+        ssa.optimize(fn, lookup=lookup)
+        return lower_ssa_function(fn)
+
+    def _compile_function_direct(self, node):
+        # compile function into a reg-code object
+        compiler = RegisterCompiler()
+        compiler.param_map = {}
+        # Reserve registers for parameters (params will map to the first N regs)
+        for p in node.params:
+            compiler.param_map[p] = compiler.new_reg()
+        # names assigned in the body are locals too; like the interpreter's copy of
+        # the caller's variables, they start out as the global of the same name
+        for name in _assigned_names(node.body):
+            if name not in compiler.param_map:
+                r = compiler.new_reg()
+                compiler.param_map[name] = r
+                compiler.instructions.append((LOAD_NAME, r, compiler._add_name(name)))
+        # compile body with parameter map present
+        for s in node.body:
+            compiler.compile_stmt(s)
+        # functions should return via explicit RETURN statements; ensure at least a return of None
+        compiler.instructions.append((RETURN, None))
+        return ('regcode', compiler.instructions, compiler.consts, compiler.names, len(node.params), compiler.reg_count)
+
     def compile_program(self, ast):
+        self._collect_inline_candidates(ast)
         # compile top-level statements
         for stmt in ast:
             self.compile_stmt(stmt)
         # top-level return not needed
         return self.instructions, self.consts, self.names, self.reg_count
 
+    def _store(self, name, r):
+        if name in getattr(self, 'param_map', ()):
+            self.instructions.append((MOVE, self.param_map[name], r))
+        else:
+            self.instructions.append((STORE_NAME, self._add_name(name), r))
+
     def compile_stmt(self, node):
         t = node.type
         if t == 'Assignment':
             r = self.compile_expr(node.value)
-            name_idx = self._add_name(node.name)
-            self.instructions.append(('STORE_NAME', name_idx, r))
+            self._store(node.name, r)
         elif t == 'FunctionDeclaration':
-            # compile function into a reg-code object
-            compiler = RegisterCompiler()
-            # Reserve registers for parameters (params will map to the first N regs)
-            for i, p in enumerate(node.params):
-                r = compiler.new_reg()
-                if not hasattr(compiler, 'param_map'):
-                    compiler.param_map = {}
-                compiler.param_map[p] = r
-            # compile body with parameter map present
-            for s in node.body:
-                compiler.compile_stmt(s)
-            # functions should return via explicit RETURN statements; ensure at least a return of None
-            compiler.instructions.append(('RETURN', None))
-            code_obj = ('regcode', compiler.instructions, compiler.consts, compiler.names, len(node.params), compiler.reg_count)
+            code_obj = self._compile_function_ssa(node)
+            if code_obj is None:
+                code_obj = self._compile_function_direct(node)
+            # the declaration is kept so the VM can JIT-compile hot functions
+            code_obj = code_obj + (node,)
             const_idx = self._add_const(code_obj)
-            name_idx = self._add_name(node.name)
             dst = self.new_reg()
-            self.instructions.append(('LOADC', dst, const_idx))
-            self.instructions.append(('STORE_NAME', name_idx, dst))
+            self.instructions.append((LOADC, dst, const_idx))
+            self._store(node.name, dst)
+
         elif t == 'ReturnStatement':
             if node.value is None:
                 # load None into a register and return it
                 dst = self.new_reg()
                 const_idx = self._add_const(None)
-                self.instructions.append(('LOADC', dst, const_idx))
-                self.instructions.append(('RETURN', dst))
+                self.instructions.append((LOADC, dst, const_idx))
+                self.instructions.append((RETURN, dst))
             else:
                 r = self.compile_expr(node.value)
-                self.instructions.append(('RETURN', r))
+                self.instructions.append((RETURN, r))
         elif t == 'ExpressionStatement':
             self.compile_expr(node.expression)
         elif t == 'SayStatement':
             r = self.compile_expr(node.expression)
             print_reg = self.new_reg()
             name_idx = self._add_name('print')
-            self.instructions.append(('LOAD_NAME', print_reg, name_idx))
-            self.instructions.append(('CALL', None, print_reg, [r]))
+            self.instructions.append((LOAD_NAME, print_reg, name_idx))
+            self.instructions.append((CALL, None, print_reg, [r]))
         elif t == 'IfStatement':
-            # Minimal support: compile condition, then branch, optional else with simple jumps
             cond_reg = self.compile_expr(node.condition)
-            then_start = len(self.instructions)
+            # placeholder for jump-if-false, patched once the branch length is known
+            jif_pos = len(self.instructions)
+            self.instructions.append((JUMP_IF_FALSE, cond_reg, None))
             for s in node.then_branch:
                 self.compile_stmt(s)
             if node.else_branch:
-                else_start = len(self.instructions)
+                # jump over else
+                jmp_pos = len(self.instructions)
+                self.instructions.append((JUMP, None))
+                self.instructions[jif_pos] = (JUMP_IF_FALSE, cond_reg, len(self.instructions))
                 for s in node.else_branch:
                     self.compile_stmt(s)
-            # This simple compiler does not implement jumps for now; translate only simple ifs
+                self.instructions[jmp_pos] = (JUMP, len(self.instructions))
+            else:
+                self.instructions[jif_pos] = (JUMP_IF_FALSE, cond_reg, len(self.instructions))
         else:
             raise NotImplementedError(f"Reg compile: stmt {t} not implemented")
 
@@ -106,7 +202,7 @@ class RegisterCompiler:
             val = self._materialize_literal(node)
             idx = self._add_const(val)
             dst = self.new_reg()
-            self.instructions.append(('LOADC', dst, idx))
+            self.instructions.append((LOADC, dst, idx))
             return dst
         elif t == 'Identifier':
             # If compiling inside a function and identifier is a parameter/local, return its register
@@ -114,41 +210,23 @@ class RegisterCompiler:
                 return self.param_map[node.name]
             name_idx = self._add_name(node.name)
             dst = self.new_reg()
-            self.instructions.append(('LOAD_NAME', dst, name_idx))
+            self.instructions.append((LOAD_NAME, dst, name_idx))
             return dst
         elif t == 'BinaryExpression':
             r1 = self.compile_expr(node.left)
             r2 = self.compile_expr(node.right)
             dst = self.new_reg()
             op = node.operator
-            if op == '+':
-                self.instructions.append(('ADD', dst, r1, r2))
-            elif op == '-':
-                self.instructions.append(('SUB', dst, r1, r2))
-            elif op == '*':
-                self.instructions.append(('MUL', dst, r1, r2))
-            elif op == '/':
-                self.instructions.append(('DIV', dst, r1, r2))
-            elif op == '<':
-                self.instructions.append(('LT', dst, r1, r2))
-            elif op == '>':
-                self.instructions.append(('GT', dst, r1, r2))
-            elif op == '<=':
-                self.instructions.append(('LE', dst, r1, r2))
-            elif op == '>=':
-                self.instructions.append(('GE', dst, r1, r2))
-            elif op == '==':
-                self.instructions.append(('EQ', dst, r1, r2))
-            elif op == '!=':
-                self.instructions.append(('NE', dst, r1, r2))
-            else:
+            opcode = _BINARY_OPCODES.get(op)
+            if opcode is None:
                 raise NotImplementedError(f"Reg compile: binary op {op} not supported")
+            self.instructions.append((opcode, dst, r1, r2))
             return dst
         elif t == 'CallExpression':
             arg_regs = [self.compile_expr(a) for a in node.arguments]
             fn_reg = self.compile_expr(ASTNode('Identifier', name=node.callee))
             dst = self.new_reg()
-            self.instructions.append(('CALL', dst, fn_reg, arg_regs))
+            self.instructions.append((CALL, dst, fn_reg, arg_regs))
             return dst
         else:
             raise NotImplementedError(f"Reg compile: expr {t} not implemented")
@@ -170,7 +248,71 @@ class RegisterCompiler:
         return None
 
 
-def compile_to_register_code(ast):
+def lower_ssa_function(fn):
+    """Lower an SSAFunction to a ('regcode', ...) object.
+
+    Parameters occupy the first registers and every other value gets its own
+    register; phis become MOVEs at the end of each predecessor.
+    """
+    ssa.split_critical_edges(fn)
+    c = RegisterCompiler()
+    regs = {}
+    for p in fn.params:
+        regs[id(p)] = c.new_reg()
+    for v in fn.values():
+        if not getattr(v, 'discard', False):
+            regs[id(v)] = c.new_reg()
+
+    emit = c.instructions.append
+    labels = {}
+    fixups = []
+    for i, b in enumerate(fn.blocks):
+        labels[b] = len(c.instructions)
+        for v in b.instrs:
+            dst = regs.get(id(v))
+            if v.op == 'phi':
+                continue
+            if v.op == 'const':
+                emit((LOADC, dst, c._add_const(v.value)))
+            elif v.op == 'global':
+                emit((LOAD_NAME, dst, c._add_name(v.name)))
+            elif v.op == 'binop':
+                emit((_BINARY_OPCODES[v.operator], dst, regs[id(v.args[0])], regs[id(v.args[1])]))
+            elif v.op == 'call':
+                fn_reg = c.new_reg()
+                emit((LOAD_NAME, fn_reg, c._add_name(v.callee)))
+                emit((CALL, dst, fn_reg, [regs[id(a)] for a in v.args]))
+            else:
+                raise NotImplementedError(f"Reg lower: SSA op {v.op} not implemented")
+        t = b.term
+        for s in b.successors():
+            for v in s.instrs:
+                if v.op == 'phi':
+                    emit((MOVE, regs[id(v)], regs[id(v.args[v.blocks.index(b)])]))
+        next_block = fn.blocks[i + 1] if i + 1 < len(fn.blocks) else None
+        if t.op == 'ret':
+            emit((RETURN, regs[id(t.args[0])] if t.args else None))
+        elif t.op == 'br':
+            if t.targets[0] is not next_block:
+                fixups.append((len(c.instructions), t.targets[0]))
+                emit((JUMP, None))
+        else:
+            fixups.append((len(c.instructions), t.targets[1]))
+            emit((JUMP_IF_FALSE, regs[id(t.args[0])], None))
+            if t.targets[0] is not next_block:
+                fixups.append((len(c.instructions), t.targets[0]))
+                emit((JUMP, None))
+    for pos, target in fixups:
+        ins = c.instructions[pos]
+        c.instructions[pos] = ins[:-1] + (labels[target],)
+    return ('regcode', c.instructions, c.consts, c.names, len(fn.params), c.reg_count)
+
+
+def compile_to_register_code(ast, optimize=False, dump=None):
+    """Compile an AST to register code; `optimize` runs the `register_opt` pipeline."""
     c = RegisterCompiler()
     instrs, consts, names, reg_count = c.compile_program(ast)
+    if optimize:
+        from runtime.register_opt import optimize_program
+        instrs, consts, names, reg_count = optimize_program(instrs, consts, names, reg_count, dump=dump)
     return instrs, consts, names, reg_count
@@ -0,0 +1,234 @@
+"""
+Optimization passes over the register IR produced by `register_compiler`.
+
+Each pass rewrites one code unit (the top-level program or a function body) in
+place. The pipeline is:
+
+- hoist_constants: scalar constants loaded more than once get a single register
+  loaded at unit entry; the original loads become MOVEs
+- cse_module_attrs: repeated LOAD_NAME of attributes of stdlib modules
+  (e.g. `math.pi`) is hoisted to unit entry the same way
+- copy_propagation: uses of a MOVE destination are rewritten to its source
+- dead_code_elimination: side-effect free instructions whose result is never
+  read are dropped
+
+The compiler assigns every register exactly once, which is what makes hoisting
+and copy propagation safe without a dataflow analysis. Pass `dump` to
+`optimize_program` to receive IR listings before and after every pass.
+"""
+from runtime.register_vm import (
+    LOADC, LOAD_NAME, STORE_NAME, CALL, RETURN, JUMP, JUMP_IF_FALSE, MOVE,
+    BINARY_OPS, disassemble,
+)
+
+# Bases whose attributes are treated as immutable (see runtime/stdlib.py)
+IMMUTABLE_MODULES = ('math', 'json', 'time', 'random')
+
+_PURE_OPS = (LOADC, LOAD_NAME, MOVE)
+_SCALAR_TYPES = (type(None), bool, int, float, str)
+
+
+class RegUnit:
+    """A mutable view of one register code unit."""
+
+    def __init__(self, instrs, consts, names, reg_count, param_count=0):
+        self.instrs = list(instrs)
+        self.consts = list(consts)
+        self.names = list(names)
+        self.reg_count = reg_count
+        self.param_count = param_count
+
+    def new_reg(self):
+        r = self.reg_count
+        self.reg_count += 1
+        return r
+
+    def listing(self):
+        return disassemble(self.instrs, self.consts, self.names, recursive=False)
+
+
+def defs_and_uses(ins):
+    """Return (defined registers, used registers) for one instruction."""
+    op = ins[0]
+    if op in (LOADC, LOAD_NAME):
+        return (ins[1],), ()
+    if op == MOVE:
+        return (ins[1],), (ins[2],)
+    if op in BINARY_OPS:
+        return (ins[1],), (ins[2], ins[3])
+    if op == STORE_NAME:
+        return (), (ins[2],)
+    if op == CALL:
+        defs = () if ins[1] is None else (ins[1],)
+        return defs, (ins[2],) + tuple(ins[3])
+    if op == RETURN:
+        return (), (() if ins[1] is None else (ins[1],))
+    if op == JUMP_IF_FALSE:
+        return (), (ins[1],)
+    return (), ()
+
+
+def _replace_uses(ins, mapping):
+    """Return `ins` with used registers renamed through `mapping`."""
+    op = ins[0]
+    m = mapping.get
+    if op == MOVE:
+        return (MOVE, ins[1], m(ins[2], ins[2]))
+    if op in BINARY_OPS:
+        return (op, ins[1], m(ins[2], ins[2]), m(ins[3], ins[3]))
+    if op == STORE_NAME:
+        return (STORE_NAME, ins[1], m(ins[2], ins[2]))
+    if op == CALL:
+        return (CALL, ins[1], m(ins[2], ins[2]), [m(r, r) for r in ins[3]])
+    if op == RETURN and ins[1] is not None:
+        return (RETURN, m(ins[1], ins[1]))
+    if op == JUMP_IF_FALSE:
+        return (JUMP_IF_FALSE, m(ins[1], ins[1]), ins[2])
+    return ins
+
+
+def _retarget(ins, fn):
+    op = ins[0]
+    if op == JUMP:
+        return (JUMP, fn(ins[1]))
+    if op == JUMP_IF_FALSE:
+        return (JUMP_IF_FALSE, ins[1], fn(ins[2]))
+    return ins
+
+
+def _prepend(unit, prologue):
+    """Insert `prologue` at unit entry, shifting jump targets."""
+    if not prologue:
+        return
+    n = len(prologue)
+    unit.instrs = prologue + [_retarget(ins, lambda t: t + n) for ins in unit.instrs]
+
+
+def _compact(unit, keep):
+    """Drop instructions whose `keep` flag is false, remapping jump targets."""
+    new_index = []
+    count = 0
+    for k in keep:
+        new_index.append(count)
+        if k:
+            count += 1
+    new_index.append(count)
+    unit.instrs = [_retarget(ins, lambda t: new_index[t])
+                   for ins, k in zip(unit.instrs, keep) if k]
+
+
+def hoist_constants(unit, ctx):
+    loads = {}
+    for ins in unit.instrs:
+        if ins[0] == LOADC and isinstance(unit.consts[ins[2]], _SCALAR_TYPES):
+            loads[ins[2]] = loads.get(ins[2], 0) + 1
+    hoisted = {}
+    prologue = []
+    for cidx, n in loads.items():
+        if n > 1:
+            r = unit.new_reg()
+            hoisted[cidx] = r
+            prologue.append((LOADC, r, cidx))
+    unit.instrs = [(MOVE, ins[1], hoisted[ins[2]]) if ins[0] == LOADC and ins[2] in hoisted else ins
+                   for ins in unit.instrs]
+    _prepend(unit, prologue)
+
+
+def cse_module_attrs(unit, ctx):
+    stored = ctx.get('stored_names', set())
+    loads = {}
+    for ins in unit.instrs:
+        if ins[0] == LOAD_NAME:
+            name = unit.names[ins[2]]
+            base = name.split('.', 1)[0]
+            if '.' in name and base in IMMUTABLE_MODULES and base not in stored:
+                loads[ins[2]] = loads.get(ins[2], 0) + 1
+    hoisted = {}
+    prologue = []
+    for nidx, n in loads.items():
+        if n > 1:
+            r = unit.new_reg()
+            hoisted[nidx] = r
+            prologue.append((LOAD_NAME, r, nidx))
+    unit.instrs = [(MOVE, ins[1], hoisted[ins[2]]) if ins[0] == LOAD_NAME and ins[2] in hoisted else ins
+                   for ins in unit.instrs]
+    _prepend(unit, prologue)
+
+
+def copy_propagation(unit, ctx):
+    def_count = {}
+    for ins in unit.instrs:
+        for d in defs_and_uses(ins)[0]:
+            def_count[d] = def_count.get(d, 0) + 1
+    mapping = {}
+    for ins in unit.instrs:
+        if ins[0] == MOVE:
+            dst, src = ins[1], ins[2]
+            if def_count.get(dst) == 1 and def_count.get(src, 0) <= 1:
+                mapping[dst] = mapping.get(src, src)
+    if not mapping:
+        return
+    unit.instrs = [_replace_uses(ins, mapping) for ins in unit.instrs]
+
+
+def dead_code_elimination(unit, ctx):
+    while True:
+        used = set()
+        for ins in unit.instrs:
+            used.update(defs_and_uses(ins)[1])
+        keep = [not (ins[0] in _PURE_OPS and ins[1] not in used) for ins in unit.instrs]
+        if all(keep):
+            return
+        _compact(unit, keep)
+
+
+PASSES = [
+    ('hoist_constants', hoist_constants),
+    ('cse_module_attrs', cse_module_attrs),
+    ('copy_propagation', copy_propagation),
+    ('dead_code_elimination', dead_code_elimination),
+]
+
+
+def _stored_names(instrs, names, consts):
+    stored = set()
+    for ins in instrs:
+        if ins[0] == STORE_NAME:
+            stored.add(names[ins[1]].split('.', 1)[0])
+    for c in consts:
+        if isinstance(c, tuple) and c and c[0] == 'regcode':
+            stored |= _stored_names(c[1], c[3], c[2])
+    return stored
+
+
+def _optimize_unit(unit, ctx, dump, title):
+    for i, c in enumerate(unit.consts):
+        if isinstance(c, tuple) and c and c[0] == 'regcode':
+            fn = RegUnit(c[1], c[2], c[3], c[5], c[4])
+            _optimize_unit(fn, ctx, dump, f"{title}/const#{i}")
+            unit.consts[i] = ('regcode', fn.instrs, fn.consts, fn.names, fn.param_count, fn.reg_count) + c[6:]
+    for name, fn in PASSES:
+        if dump is not None:
+            dump(f"{title}: before {name}", unit.listing())
+        fn(unit, ctx)
+        if dump is not None:
+            dump(f"{title}: after {name}", unit.listing())
+
+
+def print_dump(title, lines):
+    """A `dump` callback that prints listings to stdout."""
+    print(f"=== {title}")
+    for line in lines:
+        print(line)
+
+
+def optimize_program(instrs, consts, names, reg_count, dump=None):
+    """Run the pass pipeline over a program and all function code objects.
+
+    `dump`, if given, is called as dump(title, lines) before and after every pass.
+    Returns (instrs, consts, names, reg_count) like `compile_to_register_code`.
+    """
+    ctx = {'stored_names': _stored_names(instrs, names, consts)}
+    unit = RegUnit(instrs, consts, names, reg_count)
+    _optimize_unit(unit, ctx, dump, '<module>')
+    return unit.instrs, unit.consts, unit.names, unit.reg_count
@@ -1,7 +1,159 @@
 """
 A minimal register-based VM for the subset compiled by `register_compiler`.
 This is an experimental prototype to measure performance for arithmetic and name lookups.
+
+Register instructions use integer opcodes. Before execution each code object is
+pre-decoded once into a flat tuple of fixed-width `(op, a, b, c)` instructions with
+constant and name operands already resolved, so the dispatch loop only does integer
+comparisons and a single tuple unpack per instruction. `disassemble()` renders the
+undecoded form for tools such as `tools/inspect_reg.py`.
 """
+from runtime import instrument
+from runtime.tiering import JITDeopt
+
+# Register opcodes, also used by runtime/register_compiler.py and runtime/register_opt.py
+LOADC = 1
+LOAD_NAME = 2
+STORE_NAME = 3
+ADD = 4
+SUB = 5
+MUL = 6
+DIV = 7
+LT = 8
+GT = 9
+LE = 10
+GE = 11
+EQ = 12
+NE = 13
+CALL = 14
+RETURN = 15
+JUMP = 16
+JUMP_IF_FALSE = 17
+MOVE = 18
+
+# Opcodes that only exist in pre-decoded code
+HALT = 0
+LOAD_DOTTED = 100
+
+OPNAMES = {
+    LOADC: 'LOADC',
+    LOAD_NAME: 'LOAD_NAME',
+    STORE_NAME: 'STORE_NAME',
+    ADD: 'ADD',
+    SUB: 'SUB',
+    MUL: 'MUL',
+    DIV: 'DIV',
+    LT: 'LT',
+    GT: 'GT',
+    LE: 'LE',
+    GE: 'GE',
+    EQ: 'EQ',
+    NE: 'NE',
+    CALL: 'CALL',
+    RETURN: 'RETURN',
+    JUMP: 'JUMP',
+    JUMP_IF_FALSE: 'JUMP_IF_FALSE',
+    MOVE: 'MOVE',
+}
+
+BINARY_OPS = (ADD, SUB, MUL, DIV, LT, GT, LE, GE, EQ, NE)
+
+
+def _fmt_reg(r):
+    return 'None' if r is None else f"r{r}"
+
+
+def disassemble(instructions, consts=None, names=None, recursive=True, indent=''):
+    """Return human-readable lines for register instructions.
+
+    Function code objects found in `consts` are disassembled below their parent
+    when `recursive` is true.
+    """
+    consts = consts or []
+    names = names or []
+    lines = []
+    nested = []
+    for pc, ins in enumerate(instructions):
+        op = ins[0]
+        opname = OPNAMES.get(op, f"<{op}>")
+        if op == LOADC:
+            _, dst, cidx = ins
+            val = consts[cidx] if cidx < len(consts) else '?'
+            if isinstance(val, tuple) and val and val[0] == 'regcode':
+                shown = f"<regcode params={val[4]} regs={val[5]}>"
+                nested.append((cidx, val))
+            else:
+                shown = repr(val)
+            operands = f"r{dst}, #{cidx} ({shown})"
+        elif op == LOAD_NAME:
+            _, dst, nidx = ins
+            operands = f"r{dst}, {names[nidx] if nidx < len(names) else '?'}"
+        elif op == STORE_NAME:
+            _, nidx, src = ins
+            operands = f"{names[nidx] if nidx < len(names) else '?'}, r{src}"
+        elif op in BINARY_OPS:
+            _, dst, r1, r2 = ins
+            operands = f"r{dst}, r{r1}, r{r2}"
+        elif op == CALL:
+            _, dst, fn_reg, arg_regs = ins
+            args = ', '.join(f"r{r}" for r in arg_regs)
+            operands = f"{_fmt_reg(dst)}, r{fn_reg}, ({args})"
+        elif op == RETURN:
+            operands = _fmt_reg(ins[1])
+        elif op == JUMP:
+            operands = f"->{ins[1]}"
+        elif op == JUMP_IF_FALSE:
+            operands = f"r{ins[1]}, ->{ins[2]}"
+        elif op == MOVE:
+            operands = f"r{ins[1]}, r{ins[2]}"
+        else:
+            operands = ', '.join(repr(x) for x in ins[1:])
+        lines.append(f"{indent}{pc:4d}  {opname:<14}{operands}")
+    if recursive:
+        for cidx, code in nested:
+            _, fn_instrs, fn_consts, fn_names, param_count, reg_count = code[:6]
+            lines.append(f"{indent}  -- const #{cidx}: regcode params={param_count} regs={reg_count}")
+            lines.extend(disassemble(fn_instrs, fn_consts, fn_names, recursive, indent + '    '))
+    return lines
+
+
+def decode(instructions, consts, names):
+    """Pre-decode register instructions into fixed-width `(op, a, b, c)` tuples.
+
+    Constant and name operands are resolved to their values, dotted names are split
+    once, and a trailing HALT is appended so the dispatch loop needs no bounds check.
+    """
+    code = []
+    for ins in instructions:
+        op = ins[0]
+        if op == LOADC:
+            code.append((LOADC, ins[1], consts[ins[2]], None))
+        elif op == LOAD_NAME:
+            name = names[ins[2]]
+            if '.' in name:
+                parts = name.split('.')
+                code.append((LOAD_DOTTED, ins[1], parts[0], tuple(parts[1:])))
+            else:
+                code.append((LOAD_NAME, ins[1], name, None))
+        elif op == STORE_NAME:
+            code.append((STORE_NAME, ins[2], names[ins[1]], None))
+        elif op in BINARY_OPS:
+            code.append(tuple(ins))
+        elif op == CALL:
+            code.append((CALL, ins[1], ins[2], tuple(ins[3])))
+        elif op == RETURN:
+            code.append((RETURN, ins[1], None, None))
+        elif op == JUMP:
+            code.append((JUMP, ins[1], None, None))
+        elif op == JUMP_IF_FALSE:
+            code.append((JUMP_IF_FALSE, ins[1], ins[2], None))
+        elif op == MOVE:
+            code.append((MOVE, ins[1], ins[2], None))
+        else:
+            raise NotImplementedError(f"RegVM: opcode {OPNAMES.get(op, op)} not implemented")
+    code.append((HALT, None, None, None))
+    return tuple(code)
+
 
 class RegisterVM:
     def __init__(self):
@@ -11,134 +163,187 @@ class RegisterVM:
         self.regs = []
         self.pc = 0
         self.globals = {}
+        # runtime.budget.Budget of the run, or None
+        self.budget = None
         # reuse frames to avoid allocations
         self.call_stack = []
+        # pre-decoded function bodies: id(regcode) -> (regcode, decoded)
+        self._decoded = {}
+        # JIT call profiles: id(regcode) -> (regcode, FunctionProfile)
+        self.profiles = {}
+
+    def _lookup_function(self, name):
+        value = self.globals.get(name)
+        if type(value) is tuple and len(value) > 6 and value[0] == 'regcode':
+            return value[6]
+        return None
+
+    def _native(self, fn, args):
+        """Native entry point for a call of `fn` with `args`, or None (always
+        while native code is suspended, see tiering.suspend_native)."""
+        entry = self.profiles.get(id(fn))
+        if entry is None or entry[0] is not fn:
+            from runtime import tiering
+            entry = (fn, tiering.FunctionProfile(fn[6], self._lookup_function, backend='regvm'))
+            self.profiles[id(fn)] = entry
+        return entry[1].native(args)
+
+    def _decode_function(self, fn):
+        entry = self._decoded.get(id(fn))
+        if entry is not None and entry[0] is fn:
+            return entry[1]
+        code = decode(fn[1], fn[2], fn[3])
+        self._decoded[id(fn)] = (fn, code)
+        return code
+
+    def _global(self, name):
+        # plugins (stdlib.load_plugin) are bound the first time a name misses
+        if name in self.globals:
+            return self.globals[name]
+        from runtime.stdlib import load_plugin
+        value = load_plugin(name)
+        if value is not None:
+            self.globals[name] = value
+        return value
+
+    def _load_dotted(self, base, attrs):
+        # simple dotted resolution
+        obj = self._global(base)
+        for p in attrs:
+            try:
+                if hasattr(obj, p):
+                    obj = getattr(obj, p)
+                else:
+                    obj = obj[p]
+            except Exception:
+                return None
+        return obj
 
     def run(self, instructions, consts=None, names=None, reg_count=32):
         self.instructions = instructions
         self.consts = consts or []
         self.names = names or []
         self.pc = 0
+        code = decode(instructions, self.consts, self.names)
         # allocate register file
-        self.regs = [None] * max(reg_count, 32)
-
-        while self.pc < len(self.instructions):
-            ins = self.instructions[self.pc]
-            self.pc += 1
-            op = ins[0]
-            if op == 'LOADC':
-                _, dst, cidx = ins
-                self.regs[dst] = self.consts[cidx]
-            elif op == 'LOAD_NAME':
-                _, dst, nidx = ins
-                name = self.names[nidx]
-                # simple dotted resolution
-                if '.' in name:
-                    parts = name.split('.')
-                    obj = self.globals.get(parts[0])
-                    for p in parts[1:]:
-                        try:
-                            if hasattr(obj, p):
-                                obj = getattr(obj, p)
-                            else:
-                                obj = obj[p]
-                        except Exception:
-                            obj = None
-                            break
-                    self.regs[dst] = obj
+        regs = [None] * max(reg_count, 32)
+        self.regs = regs
+        if self.budget is not None:
+            from runtime import budget
+            return budget.execute_regvm(self, code, regs)
+        counters = instrument.active
+        if counters is not None:
+            return instrument.execute_regvm(self, counters, code, regs)
+        return self._execute(code, regs)
+
+    def _execute(self, code, regs, probe=None):
+        # `probe(op, b, regs)` sees every instruction after its fetch (runtime/instrument.py);
+        # with a budget, calls take steps and + and * check sizes (runtime/budget.py)
+        budget = self.budget
+        globals_ = self.globals
+        call_stack = self.call_stack
+        load_dotted = self._load_dotted
+        pc = 0
+        while True:
+            op, a, b, c = code[pc]
+            pc += 1
+            if probe is not None:
+                probe(op, b, regs)
+            if op == LOADC:
+                regs[a] = b
+            elif op == ADD:
+                if budget is None:
+                    regs[a] = regs[b] + regs[c]
                 else:
-                    self.regs[dst] = self.globals.get(name)
-            elif op == 'STORE_NAME':
-                _, nidx, src = ins
-                name = self.names[nidx]
-                self.globals[name] = self.regs[src]
-            elif op == 'ADD':
-                _, dst, r1, r2 = ins
-                self.regs[dst] = self.regs[r1] + self.regs[r2]
-            elif op == 'SUB':
-                _, dst, r1, r2 = ins
-                self.regs[dst] = self.regs[r1] - self.regs[r2]
-            elif op == 'MUL':
-                _, dst, r1, r2 = ins
-                self.regs[dst] = self.regs[r1] * self.regs[r2]
-            elif op == 'DIV':
-                _, dst, r1, r2 = ins
-                self.regs[dst] = self.regs[r1] / self.regs[r2]
-            elif op == 'LT':
-                _, dst, r1, r2 = ins
-                self.regs[dst] = self.regs[r1] < self.regs[r2]
-            elif op == 'GT':
-                _, dst, r1, r2 = ins
-                self.regs[dst] = self.regs[r1] > self.regs[r2]
-            elif op == 'LE':
-                _, dst, r1, r2 = ins
-                self.regs[dst] = self.regs[r1] <= self.regs[r2]
-            elif op == 'GE':
-                _, dst, r1, r2 = ins
-                self.regs[dst] = self.regs[r1] >= self.regs[r2]
-            elif op == 'EQ':
-                _, dst, r1, r2 = ins
-                self.regs[dst] = self.regs[r1] == self.regs[r2]
-            elif op == 'NE':
-                _, dst, r1, r2 = ins
-                self.regs[dst] = self.regs[r1] != self.regs[r2]
-            elif op == 'CALL':
-                _, dst, fn_reg, arg_regs = ins
-                fn = self.regs[fn_reg]
-                args = [self.regs[r] for r in arg_regs]
-                if isinstance(fn, tuple) and fn and fn[0] == 'regcode':
-                    # push current frame
-                    # push current frame including where the caller expects the return value (dst)
-                    frame = {
-                        'instructions': self.instructions,
-                        'consts': self.consts,
-                        'names': self.names,
-                        'pc': self.pc,
-                        'regs': self.regs,
-                        'return_reg': dst,
-                    }
-                    self.call_stack.append(frame)
-                    _, fn_instrs, fn_consts, fn_names, param_count, fn_reg_count = fn
-                    self.instructions = fn_instrs
-                    self.consts = fn_consts
-                    self.names = fn_names
-                    self.pc = 0
-                    # create new regs sized to fn_reg_count
-                    self.regs = [None] * fn_reg_count
+                    regs[a] = budget.add(regs[b], regs[c])
+            elif op == SUB:
+                regs[a] = regs[b] - regs[c]
+            elif op == MUL:
+                if budget is None:
+                    regs[a] = regs[b] * regs[c]
+                else:
+                    regs[a] = budget.mul(regs[b], regs[c])
+            elif op == LOAD_NAME:
+                value = globals_.get(b)
+                if value is None and b not in globals_:
+                    value = self._global(b)
+                regs[a] = value
+            elif op == MOVE:
+                regs[a] = regs[b]
+            elif op == CALL:
+                if budget is not None:
+                    budget.step()
+                fn = regs[b]
+                if type(fn) is tuple and fn and fn[0] == 'regcode':
+                    if len(fn) > 6 and budget is None:
+                        # ('regcode', ..., node): hot functions run natively;
+                        # native code would not count steps
+                        args = [regs[r] for r in c]
+                        native = self._native(fn, args)
+                        if native is not None:
+                            try:
+                                res = native(*args)
+                            except JITDeopt:
+                                # arguments the native code cannot represent
+                                pass
+                            else:
+                                if a is not None:
+                                    regs[a] = res
+                                continue
+                    # push caller frame including where it expects the return value (a)
+                    call_stack.append((code, pc, regs, a))
+                    param_count = fn[4]
+                    new_regs = [None] * fn[5]
                     # copy args into first N registers
-                    for i, a in enumerate(args[:param_count]):
-                        self.regs[i] = a
+                    for i, r in enumerate(c[:param_count]):
+                        new_regs[i] = regs[r]
+                    code = self._decode_function(fn)
+                    regs = new_regs
+                    pc = 0
                 elif callable(fn):
-                    res = fn(*args)
-                    if dst is not None:
-                        self.regs[dst] = res
+                    res = fn(*[regs[r] for r in c])
                     # if dst is None, discard result (e.g., print)
+                    if a is not None:
+                        regs[a] = res
                 else:
                     raise TypeError(f"Object of type {type(fn).__name__} is not callable")
-            elif op == 'RETURN':
-                _, src = ins
-                ret = self.regs[src] if src is not None else None
-                if self.call_stack:
-                    frame = self.call_stack.pop()
-                    instructions = frame['instructions']
-                    consts = frame['consts']
-                    names = frame['names']
-                    pc = frame['pc']
-                    regs = frame['regs']
-                    return_reg = frame.get('return_reg')
-                    self.instructions = instructions
-                    self.consts = consts
-                    self.names = names
-                    self.pc = pc
-                    self.regs = regs
-                    # store return value into the caller's expected register (if provided)
-                    if return_reg is not None:
-                        self.regs[return_reg] = ret
-                    else:
-                        # fallback to r0
-                        self.regs[0] = ret
+            elif op == RETURN:
+                ret = regs[a] if a is not None else None
+                if call_stack:
+                    code, pc, regs, return_reg = call_stack.pop()
+                    # store return value into the caller's expected register,
+                    # falling back to r0
+                    regs[return_reg if return_reg is not None else 0] = ret
                     continue
+                self.regs = regs
                 return ret
+            elif op == JUMP_IF_FALSE:
+                if not regs[a]:
+                    pc = b
+            elif op == JUMP:
+                pc = a
+            elif op == DIV:
+                if regs[c] == 0:
+                    raise ZeroDivisionError("Division by zero")
+                regs[a] = regs[b] / regs[c]
+            elif op == LT:
+                regs[a] = regs[b] < regs[c]
+            elif op == GT:
+                regs[a] = regs[b] > regs[c]
+            elif op == LE:
+                regs[a] = regs[b] <= regs[c]
+            elif op == GE:
+                regs[a] = regs[b] >= regs[c]
+            elif op == EQ:
+                regs[a] = regs[b] == regs[c]
+            elif op == NE:
+                regs[a] = regs[b] != regs[c]
+            elif op == LOAD_DOTTED:
+                regs[a] = load_dotted(b, c)
+            elif op == STORE_NAME:
+                globals_[b] = regs[a]
+            elif op == HALT:
+                self.regs = regs
+                return None
             else:
                 raise NotImplementedError(f"RegVM: opcode {op} not implemented")
-        return None
@@ -1,46 +1,72 @@
 """Sandbox runner for executing Jusu programs with timeout and optional memory limit.
 
 API:
-- run_file(path, timeout=5, memory_limit_mb=None, backend='interp') -> result dict
-  result contains: returncode, stdout, stderr, timed_out (bool), killed (bool)
+- run_file(path, timeout=5, memory_limit_mb=None, backend='interp', cpu_limit_s=None, counters=False)
+  -> result dict; result contains: returncode, stdout, stderr, timed_out (bool),
+  killed (bool), wall_time (seconds), usage (the child's user_time, system_time,
+  max_rss_kb, voluntary_switches, involuntary_switches; None where unavailable)
+  and counters (runtime.instrument counters when counters=True, else None)
+- run_source(src, ...) -> result dict; the source is sent over the child's stdin
+- stream_file(path, ...) / stream_source(src, ...) -> iterator of
+  ('stdout' | 'stderr', text) chunks as the program writes them, ending with
+  ('exit', result without stdout and stderr)
+- run_budgeted(src, steps=100000, max_size=1000000, backend='interp') -> result dict
+  runs in-process within a runtime.budget.Budget; the result also contains
+  budget_exceeded ('steps', 'size' or None) and steps (steps used), but only
+  wall_time of the resource figures
+- SandboxPool(size=2, timeout=5, memory_limit_mb=None, max_runs=100, cpu_limit_s=None)
+  keeps `size` worker processes with the runtime imported and limits applied;
+  pool.run_file / pool.run_source return the same result dict as run_file
+- ForkServer(timeout=5, memory_limit_mb=None, cpu_limit_s=None)
+  forks each run from a zygote process that imported the runtime once;
+  server.run_file / server.run_source return the same result dict as run_file
+- UsageSummary() / summarize(results): totals of wall and CPU time, peak RSS,
+  context switches and counters over many results; pools and fork servers
+  keep one in `.usage`
 
-This implementation launches a subprocess running `python -m runtime._sandbox_child`.
+run_file launches a subprocess running `python -m runtime._sandbox_child`;
+SandboxPool reuses such subprocesses (`--serve`), ForkServer forks a fresh
+one per run from a warm zygote (`--zygote`), and run_budgeted avoids the
+process start-up altogether for short untrusted scripts.
 """
 from __future__ import annotations
 
+import codecs
+import contextlib
+import io
+import json
+import queue
 import sys
+import threading
 import subprocess
-import tempfile
 import os
-from typing import Optional, Dict, Any
+import time
+import traceback
+from typing import Optional, Dict, Any, Iterable, Iterator, Tuple
 
+from runtime import _sandbox_child
 
-def run_file(path: str, timeout: float = 5.0, memory_limit_mb: Optional[int] = None, backend: str = 'interp') -> Dict[str, Any]:
+
+def _child_command(path: str, memory_limit_mb: Optional[int], backend: str, cpu_limit_s: Optional[float] = None):
     cmd = [sys.executable, '-u', '-m', 'runtime._sandbox_child', '--file', path, '--backend', backend]
     if memory_limit_mb:
         cmd += ['--mem', str(int(memory_limit_mb))]
+    if cpu_limit_s:
+        cmd += ['--cpu', str(cpu_limit_s)]
+    return cmd
+
 
+def _run_child(cmd, src: Optional[str], timeout: float, counters: bool) -> Dict[str, Any]:
+    # `src` is piped to the child's stdin when it runs `--file -`
+    out, err = [], []
     try:
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
-        return {
-            'returncode': proc.returncode,
-            'stdout': proc.stdout,
-            'stderr': proc.stderr,
-            'timed_out': False,
-            'killed': False,
-        }
-    except subprocess.TimeoutExpired as e:
-        # Process exceeded time; we attempted to kill it via subprocess.run
-        # however TimeoutExpired doesn't guarantee the process died; mark timed_out=True
-        out = (e.stdout or '')
-        err = (e.stderr or '')
-        return {
-            'returncode': None,
-            'stdout': out,
-            'stderr': err,
-            'timed_out': True,
-            'killed': True,
-        }
+        for name, item in _stream(cmd, src, timeout, counters):
+            if name == 'stdout':
+                out.append(item)
+            elif name == 'stderr':
+                err.append(item)
+            else:
+                result = item
     except Exception as e:
         return {
             'returncode': None,
@@ -48,18 +74,460 @@ def run_file(path: str, timeout: float = 5.0, memory_limit_mb: Optional[int] = N
             'stderr': str(e),
             'timed_out': False,
             'killed': False,
+            'wall_time': None,
+            'usage': None,
+            'counters': None,
         }
+    return dict(result, stdout=''.join(out), stderr=''.join(err))
+
+
+def run_file(path: str, timeout: float = 5.0, memory_limit_mb: Optional[int] = None, backend: str = 'interp',
+             cpu_limit_s: Optional[float] = None, counters: bool = False) -> Dict[str, Any]:
+    return _run_child(_child_command(path, memory_limit_mb, backend, cpu_limit_s), None, timeout, counters)
+
+
+def run_source(src: str, timeout: float = 5.0, memory_limit_mb: Optional[int] = None, backend: str = 'interp',
+               cpu_limit_s: Optional[float] = None, counters: bool = False) -> Dict[str, Any]:
+    # the source goes over the child's stdin; nothing touches the filesystem
+    return _run_child(_child_command('-', memory_limit_mb, backend, cpu_limit_s), src, timeout, counters)
+
+
+def _stream(cmd, src: Optional[str], timeout: float, counters: bool = False):
+    # counters come back as JSON over an extra pipe (Unix only)
+    stats_r = stats_w = None
+    if counters and os.name == 'posix':
+        stats_r, stats_w = os.pipe()
+        cmd = cmd + ['--stats-fd', str(stats_w)]
+    start = time.perf_counter()
+    try:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE if src is not None else subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                pass_fds=(stats_w,) if stats_w is not None else ())
+    finally:
+        if stats_w is not None:
+            os.close(stats_w)
+    chunks: queue.Queue = queue.Queue()
+    stats = []
+
+    def pump(name, pipe):
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+        for data in iter(lambda: pipe.read1(65536), b''):
+            text = decoder.decode(data)
+            if text:
+                chunks.put((name, text))
+        text = decoder.decode(b'', final=True)
+        if text:
+            chunks.put((name, text))
+        chunks.put((name, None))
+
+    def feed():
+        try:
+            proc.stdin.write(src.encode('utf-8'))
+            proc.stdin.close()
+        except OSError:
+            pass  # the child exited without reading its program
 
+    def read_stats():
+        with os.fdopen(stats_r, 'rb') as f:
+            stats.append(f.read())
 
-def run_source(src: str, timeout: float = 5.0, memory_limit_mb: Optional[int] = None, backend: str = 'interp') -> Dict[str, Any]:
-    # Write to a temporary file and run
-    with tempfile.NamedTemporaryFile('w', suffix='.jusu', delete=False) as f:
-        f.write(src)
-        tmp = f.name
+    threading.Thread(target=pump, args=('stdout', proc.stdout), daemon=True).start()
+    threading.Thread(target=pump, args=('stderr', proc.stderr), daemon=True).start()
+    if src is not None:
+        threading.Thread(target=feed, daemon=True).start()
+    stats_reader = None
+    if stats_r is not None:
+        stats_reader = threading.Thread(target=read_stats, daemon=True)
+        stats_reader.start()
+    deadline = time.monotonic() + timeout
+    timed_out = False
+    open_streams = 2
     try:
-        return run_file(tmp, timeout=timeout, memory_limit_mb=memory_limit_mb, backend=backend)
+        while open_streams:
+            try:
+                name, text = chunks.get(timeout=None if timed_out else max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                timed_out = True
+                proc.kill()
+                continue
+            if text is None:
+                open_streams -= 1
+            else:
+                yield name, text
+        used = None
+        if hasattr(os, 'wait4'):
+            # reap the child ourselves to get its own resource usage
+            _, status, ru = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            used = _sandbox_child.usage(ru)
+        else:
+            proc.wait()
+        wall_time = time.perf_counter() - start
+        if stats_reader is not None:
+            stats_reader.join()
+        yield 'exit', {
+            'returncode': None if timed_out else proc.returncode,
+            'timed_out': timed_out,
+            'killed': timed_out,
+            'wall_time': wall_time,
+            'usage': used,
+            'counters': json.loads(stats[0]) if stats and stats[0] else None,
+        }
     finally:
+        # also when the caller stops iterating early
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+def stream_file(path: str, timeout: float = 5.0, memory_limit_mb: Optional[int] = None, backend: str = 'interp',
+                cpu_limit_s: Optional[float] = None, counters: bool = False) -> Iterator[Tuple[str, Any]]:
+    """Run like run_file, yielding output as the program writes it.
+
+    Yields ('stdout', text) and ('stderr', text) chunks, then one ('exit',
+    result) where result is the run_file dict without stdout and stderr.
+    Nothing is buffered beyond a chunk; closing the generator early kills
+    the child.
+    """
+    return _stream(_child_command(path, memory_limit_mb, backend, cpu_limit_s), None, timeout, counters)
+
+
+def stream_source(src: str, timeout: float = 5.0, memory_limit_mb: Optional[int] = None, backend: str = 'interp',
+                  cpu_limit_s: Optional[float] = None, counters: bool = False) -> Iterator[Tuple[str, Any]]:
+    """stream_file for a source string, sent over the child's stdin."""
+    return _stream(_child_command('-', memory_limit_mb, backend, cpu_limit_s), src, timeout, counters)
+
+
+def run_budgeted(src: str, steps: Optional[int] = 100000, max_size: Optional[int] = 1000000, backend: str = 'interp') -> Dict[str, Any]:
+    from runtime.budget import Budget, BudgetExceeded
+    from runtime.compiler import run_source as run_in_process
+
+    budget = Budget(steps=steps, max_size=max_size)
+    out = io.StringIO()
+    returncode, err, exceeded = 0, '', None
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(out):
+            run_in_process(src, backend, budget=budget)
+    except BudgetExceeded as e:
+        returncode, err, exceeded = 1, f"BudgetExceeded: {e}\n", e.kind
+    except RecursionError as e:
+        returncode, err = 1, f"RecursionError: {e}\n"
+    except Exception:
+        returncode, err = 2, traceback.format_exc()
+    return {
+        'returncode': returncode,
+        'stdout': out.getvalue(),
+        'stderr': err,
+        'timed_out': False,
+        'killed': False,
+        'wall_time': time.perf_counter() - start,
+        'budget_exceeded': exceeded,
+        'steps': budget.used,
+    }
+
+
+# seconds a new worker may take to import the runtime
+WORKER_STARTUP_TIMEOUT = 30.0
+
+
+class _Worker:
+    """One `_sandbox_child --serve` (or `--zygote`) process and the thread reading its answers."""
+
+    def __init__(self, memory_limit_mb: Optional[int], mode: str = '--serve'):
+        cmd = [sys.executable, '-u', '-m', 'runtime._sandbox_child', mode]
+        if memory_limit_mb:
+            cmd += ['--mem', str(int(memory_limit_mb))]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.DEVNULL, text=True, encoding='utf-8')
+        self.replies: queue.Queue = queue.Queue()
+        self.ready = False
+        self.runs = 0
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.proc.stdout:
+            self.replies.put(json.loads(line))
+        self.replies.put(None)  # the worker exited
+
+    def request(self, message: Dict[str, Any], timeout: float) -> Optional[Dict[str, Any]]:
+        """Answer to `message`, or None if the worker died; raises queue.Empty
+        after `timeout` seconds."""
+        if not self.ready:
+            if self.replies.get(timeout=WORKER_STARTUP_TIMEOUT) is None:
+                return None
+            self.ready = True
+        try:
+            self.proc.stdin.write(json.dumps(message) + '\n')
+            self.proc.stdin.flush()
+        except OSError:
+            return None
+        self.runs += 1
+        return self.replies.get(timeout=timeout)
+
+    def close(self):
         try:
-            os.unlink(tmp)
+            self.proc.stdin.close()
+            self.proc.wait(timeout=1.0)
         except Exception:
-            pass
+            self.kill()
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.wait()
+
+
+class SandboxPool:
+    """Pre-started sandbox workers that run one program at a time each.
+
+    Workers import the runtime and apply `memory_limit_mb` once, so a run
+    costs a pipe round trip instead of a Python start-up. A worker is
+    replaced after a timeout, a crash or an unhandled error, and after
+    `max_runs` programs; programs that run in the same worker share its
+    process, so use fresh subprocesses (`run_file`) when runs must not see
+    each other's leftovers. Safe to use from several threads; runs wait for
+    an idle worker.
+
+    `cpu_limit_s` limits the CPU time of each run; a worker that exceeds it
+    is killed by SIGXCPU and replaced. A result's usage is the worker's own
+    during the run, except max_rss_kb, the worker's peak so far. `usage`
+    sums up every run of the pool.
+    """
+
+    def __init__(self, size: int = 2, timeout: float = 5.0, memory_limit_mb: Optional[int] = None, max_runs: int = 100,
+                 cpu_limit_s: Optional[float] = None):
+        if size < 1:
+            raise ValueError("SandboxPool needs at least one worker")
+        self.size = size
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_runs = max_runs
+        self.cpu_limit_s = cpu_limit_s
+        self.recycled = 0
+        self.usage = UsageSummary()
+        self._closed = False
+        self._idle: queue.Queue = queue.Queue()
+        for _ in range(size):
+            self._idle.put(_Worker(memory_limit_mb))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run_file(self, path: str, timeout: Optional[float] = None, backend: str = 'interp', counters: bool = False) -> Dict[str, Any]:
+        return self._run({'file': os.path.abspath(path), 'backend': backend, 'counters': counters}, timeout)
+
+    def run_source(self, src: str, timeout: Optional[float] = None, backend: str = 'interp', counters: bool = False) -> Dict[str, Any]:
+        return self._run({'source': src, 'backend': backend, 'counters': counters}, timeout)
+
+    def _run(self, message: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        if self._closed:
+            raise RuntimeError("SandboxPool is closed")
+        worker = self._idle.get()
+        reply = None
+        start = time.perf_counter()
+        try:
+            reply = worker.request(dict(message, cpu=self.cpu_limit_s), self.timeout if timeout is None else timeout)
+            timed_out = False
+        except queue.Empty:
+            timed_out = True
+        finally:
+            self._release(worker, reply)
+        if reply is not None:
+            result = dict(reply, timed_out=False, killed=False)
+        elif timed_out:
+            result = {
+                'returncode': None,
+                'stdout': '',
+                'stderr': '',
+                'timed_out': True,
+                'killed': True,
+                'usage': None,
+                'counters': None,
+            }
+        else:
+            result = {
+                'returncode': worker.proc.returncode,
+                'stdout': '',
+                'stderr': 'sandbox worker exited unexpectedly',
+                'timed_out': False,
+                'killed': False,
+                'usage': None,
+                'counters': None,
+            }
+        result['wall_time'] = time.perf_counter() - start
+        self.usage.add(result)
+        return result
+
+    def _release(self, worker: _Worker, reply: Optional[Dict[str, Any]]):
+        # back to the idle queue, or replaced by a fresh worker
+        if reply is not None and reply['returncode'] != 2 and worker.runs < self.max_runs:
+            self._idle.put(worker)
+            return
+        if reply is None:
+            worker.kill()
+        else:
+            worker.close()
+        self.recycled += 1
+        self._idle.put(_Worker(self.memory_limit_mb) if not self._closed else worker)
+
+    def close(self):
+        """Stop the idle workers; runs in progress finish first."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in range(self.size):
+            self._idle.get().close()
+
+
+# seconds the zygote may take beyond a run's timeout to kill it and answer
+ZYGOTE_GRACE = 5.0
+
+
+class ForkServer:
+    """Sandboxed runs forked from a zygote process that imported the runtime.
+
+    Each run gets its own child, forked from the zygote and limited by
+    `memory_limit_mb` (and seccomp, where available) before it starts, so
+    runs are isolated like `run_file` but start at fork cost instead of
+    interpreter start-up. The zygote enforces timeouts itself; it is
+    restarted only if it dies. Unix only. Runs are serialized; use one
+    ForkServer per concurrent client.
+
+    `cpu_limit_s` sets RLIMIT_CPU in each child. A result's usage is the
+    child's own, and `usage` sums up every run of the server.
+    """
+
+    def __init__(self, timeout: float = 5.0, memory_limit_mb: Optional[int] = None, cpu_limit_s: Optional[float] = None):
+        if not hasattr(os, 'fork'):
+            raise RuntimeError("ForkServer needs os.fork (Unix only)")
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit_s = cpu_limit_s
+        self.restarts = 0
+        self.usage = UsageSummary()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._zygote = _Worker(memory_limit_mb, '--zygote')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run_file(self, path: str, timeout: Optional[float] = None, backend: str = 'interp', counters: bool = False) -> Dict[str, Any]:
+        return self._run({'file': os.path.abspath(path), 'backend': backend, 'counters': counters}, timeout)
+
+    def run_source(self, src: str, timeout: Optional[float] = None, backend: str = 'interp', counters: bool = False) -> Dict[str, Any]:
+        return self._run({'source': src, 'backend': backend, 'counters': counters}, timeout)
+
+    def _run(self, message: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ForkServer is closed")
+            try:
+                result = self._zygote.request(dict(message, timeout=timeout, cpu=self.cpu_limit_s), timeout + ZYGOTE_GRACE)
+            except queue.Empty:
+                result = None
+            if result is None:
+                self._zygote.kill()
+                self._zygote = _Worker(self.memory_limit_mb, '--zygote')
+                self.restarts += 1
+                result = {
+                    'returncode': None,
+                    'stdout': '',
+                    'stderr': 'sandbox zygote exited unexpectedly',
+                    'timed_out': False,
+                    'killed': False,
+                    'usage': None,
+                    'counters': None,
+                }
+        result['wall_time'] = time.perf_counter() - start
+        self.usage.add(result)
+        return result
+
+    def close(self):
+        """Stop the zygote after the run in progress, if any."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._zygote.close()
+
+
+class UsageSummary:
+    """Totals over sandbox results, for capacity planning.
+
+    `add(result)` takes any result dict of this module; `to_dict()` reports
+    run, failure and timeout counts, total, mean and maximum wall time,
+    total user/system CPU time and context switches, the largest max RSS
+    and, for runs with counters, total instructions and function calls.
+    Missing figures (no usage on this platform, no counters) are skipped.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.wall_time = 0.0
+        self.max_wall_time = 0.0
+        self.user_time = 0.0
+        self.system_time = 0.0
+        self.max_rss_kb = 0
+        self.voluntary_switches = 0
+        self.involuntary_switches = 0
+        self.instructions = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def add(self, result: Dict[str, Any]):
+        with self._lock:
+            self.runs += 1
+            if result.get('timed_out'):
+                self.timeouts += 1
+            if result.get('returncode') != 0:
+                self.failures += 1
+            wall_time = result.get('wall_time') or 0.0
+            self.wall_time += wall_time
+            self.max_wall_time = max(self.max_wall_time, wall_time)
+            used = result.get('usage')
+            if used:
+                self.user_time += used['user_time']
+                self.system_time += used['system_time']
+                self.max_rss_kb = max(self.max_rss_kb, used['max_rss_kb'])
+                self.voluntary_switches += used['voluntary_switches']
+                self.involuntary_switches += used['involuntary_switches']
+            counters = result.get('counters')
+            if counters:
+                self.instructions += counters['instructions']
+                self.calls += sum(f['calls'] for f in counters['functions'].values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'wall_time': self.wall_time,
+            'mean_wall_time': self.wall_time / self.runs if self.runs else None,
+            'max_wall_time': self.max_wall_time,
+            'user_time': self.user_time,
+            'system_time': self.system_time,
+            'max_rss_kb': self.max_rss_kb,
+            'voluntary_switches': self.voluntary_switches,
+            'involuntary_switches': self.involuntary_switches,
+            'instructions': self.instructions,
+            'calls': self.calls,
+        }
+
+
+def summarize(results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """UsageSummary totals of `results`."""
+    summary = UsageSummary()
+    for result in results:
+        summary.add(result)
+    return summary.to_dict()
@@ -0,0 +1,653 @@
+"""
+Mid-level SSA IR shared by the register VM and the JIT.
+
+`build_function` turns a FunctionDeclaration AST into an `SSAFunction` made of basic
+blocks holding typed SSA values, with phi nodes at the merge points of if/else.
+Optimizations are written once against this IR:
+
+- constant_propagation: folds numeric constants and constant branches, removes
+  unreachable blocks and trivial phis
+- dead_code_elimination: removes side-effect free values that are never used
+- inline_calls: inlines small non-recursive callees
+
+Backends lower the optimized IR: `register_compiler.lower_ssa_function` emits
+RegisterVM code and `jit` emits llvmlite IR. Function locals follow the
+interpreter's semantics: assignments inside a function create locals, other names
+are read from globals at the point of use.
+
+The language has no loop constructs, so every CFG built here is acyclic and
+there is no loop-invariant code motion pass.
+"""
+import math
+
+
+class SSAUnsupported(Exception):
+    """Raised when a function uses constructs the SSA builder cannot express."""
+
+
+NUMERIC_TYPES = ('int', 'float', 'bool')
+COMPARISON_OPS = ('<', '>', '<=', '>=', '==', '!=')
+ARITHMETIC_OPS = ('+', '-', '*', '/')
+
+# Numeric stdlib values and functions (runtime/stdlib.py MathModule and the
+# interpreter builtins), typed by `infer_types(..., builtins=True)`
+MATH_CONSTANTS = {'math.pi': math.pi}
+MATH_FUNCTIONS = ('math.sqrt', 'math.sin', 'abs', 'min', 'max')
+
+# ops without side effects whose results may be dropped when unused
+_PURE_OPS = ('const', 'global', 'phi')
+
+
+class Value:
+    """An SSA value. `args` are operand Values; op-specific data lives in attributes."""
+
+    def __init__(self, op, args=(), type='any', **attrs):
+        self.op = op
+        self.args = list(args)
+        self.type = type
+        self.id = None
+        self.block = None
+        for key, value in attrs.items():
+            setattr(self, key, value)
+
+    def __repr__(self):
+        return f"%{self.id}" if self.id is not None else f"<{self.op}>"
+
+
+class Terminator:
+    """Block terminator: ('ret', [value?]), ('br', [], [target]), ('cbr', [cond], [then, else])."""
+
+    def __init__(self, op, args=(), targets=()):
+        self.op = op
+        self.args = list(args)
+        self.targets = list(targets)
+
+
+class Block:
+    def __init__(self, name):
+        self.name = name
+        self.instrs = []
+        self.term = None
+
+    def successors(self):
+        return list(self.term.targets) if self.term is not None else []
+
+    def __repr__(self):
+        return self.name
+
+
+class SSAFunction:
+    def __init__(self, name, param_names):
+        self.name = name
+        self.param_names = list(param_names)
+        self.params = [Value('param', index=i, name=p) for i, p in enumerate(param_names)]
+        self.blocks = []
+        self._next_id = 0
+        self._labels = {}
+
+    def new_block(self, prefix):
+        n = self._labels.get(prefix, 0)
+        self._labels[prefix] = n + 1
+        block = Block(prefix if prefix == 'entry' else f"{prefix}{n}")
+        self.blocks.append(block)
+        return block
+
+    def predecessors(self):
+        preds = {b: [] for b in self.blocks}
+        for b in self.blocks:
+            for s in b.successors():
+                preds[s].append(b)
+        return preds
+
+    def values(self):
+        for b in self.blocks:
+            yield from b.instrs
+
+    def number(self):
+        """Assign printable ids in block order."""
+        n = 0
+        for p in self.params:
+            p.id = n
+            n += 1
+        for v in self.values():
+            v.id = n
+            n += 1
+        self._next_id = n
+
+    def replace_all_uses(self, old, new):
+        for b in self.blocks:
+            for v in b.instrs:
+                v.args = [new if a is old else a for a in v.args]
+            if b.term is not None:
+                b.term.args = [new if a is old else a for a in b.term.args]
+
+    def uses(self):
+        counts = {}
+        for b in self.blocks:
+            for v in b.instrs:
+                for a in v.args:
+                    counts[id(a)] = counts.get(id(a), 0) + 1
+            if b.term is not None:
+                for a in b.term.args:
+                    counts[id(a)] = counts.get(id(a), 0) + 1
+        return counts
+
+    def return_type(self):
+        types = [b.term.args[0].type if b.term.args else 'none'
+                 for b in self.blocks if b.term is not None and b.term.op == 'ret']
+        return unify_types(types)
+
+    def dump(self):
+        self.number()
+        lines = [f"function {self.name}({', '.join(f'%{p.id} {p.name}: {p.type}' for p in self.params)}):"]
+        for b in self.blocks:
+            lines.append(f"{b.name}:")
+            for v in b.instrs:
+                lines.append(f"    {v!r} = {_format_value(v)} : {v.type}")
+            t = b.term
+            if t is None:
+                lines.append("    <no terminator>")
+            elif t.op == 'ret':
+                lines.append(f"    ret {t.args[0]!r}" if t.args else "    ret")
+            elif t.op == 'br':
+                lines.append(f"    br {t.targets[0].name}")
+            else:
+                lines.append(f"    cbr {t.args[0]!r}, {t.targets[0].name}, {t.targets[1].name}")
+        return lines
+
+
+def _format_value(v):
+    if v.op == 'const':
+        return f"const {v.value!r}"
+    if v.op == 'global':
+        return f"global {v.name}"
+    if v.op == 'binop':
+        return f"{v.operator} {v.args[0]!r}, {v.args[1]!r}"
+    if v.op == 'call':
+        return f"call {v.callee}({', '.join(repr(a) for a in v.args)})"
+    if v.op == 'phi':
+        return "phi " + ', '.join(f"[{a!r}, {b.name}]" for a, b in zip(v.args, v.blocks))
+    return f"{v.op} {', '.join(repr(a) for a in v.args)}"
+
+
+# ---------------------------------------------------------------------------
+# Construction from the AST
+# ---------------------------------------------------------------------------
+
+class _Builder:
+    def __init__(self, fn):
+        self.fn = fn
+        self.block = fn.new_block('entry')
+        self.env = dict(zip(fn.param_names, fn.params))
+        # names assigned on some but not all paths into the current block
+        self.partial = set()
+
+    def emit(self, value):
+        value.block = self.block
+        self.block.instrs.append(value)
+        return value
+
+    def terminate(self, term):
+        self.block.term = term
+        self.block = None
+
+    def stmts(self, body):
+        for stmt in body:
+            if self.block is None:
+                # code after a return on every path is unreachable
+                return
+            self.stmt(stmt)
+
+    def stmt(self, node):
+        t = node.type
+        if t == 'Assignment':
+            self.env[node.name] = self.expr(node.value)
+            self.partial.discard(node.name)
+        elif t == 'ReturnStatement':
+            args = [] if node.value is None else [self.expr(node.value)]
+            self.terminate(Terminator('ret', args))
+        elif t == 'ExpressionStatement':
+            self.expr(node.expression)
+        elif t == 'SayStatement':
+            self.emit(Value('call', [self.expr(node.expression)], callee='print', discard=True))
+        elif t == 'IfStatement':
+            self.if_stmt(node)
+        else:
+            raise SSAUnsupported(f"statement {t}")
+
+    def if_stmt(self, node):
+        cond = self.expr(node.condition)
+        then_bb = self.fn.new_block('then')
+        else_bb = self.fn.new_block('else') if node.else_branch else None
+        merge_bb = self.fn.new_block('merge')
+        cond_block = self.block
+        self.terminate(Terminator('cbr', [cond], [then_bb, else_bb or merge_bb]))
+        saved_env, saved_partial = dict(self.env), set(self.partial)
+
+        arms = []
+        for bb, body in ((then_bb, node.then_branch), (else_bb, node.else_branch)):
+            if bb is None:
+                continue
+            self.block, self.env, self.partial = bb, dict(saved_env), set(saved_partial)
+            self.stmts(body)
+            if self.block is not None:
+                self.block.term = Terminator('br', [], [merge_bb])
+                arms.append((self.block, self.env, self.partial))
+        if else_bb is None:
+            arms.append((cond_block, saved_env, saved_partial))
+
+        if not arms:
+            self.fn.blocks.remove(merge_bb)
+            self.block = None
+            return
+        self.block = merge_bb
+        self.env, self.partial = {}, set()
+        for _, env, partial in arms:
+            self.partial |= partial
+        names = set()
+        for _, env, _ in arms:
+            names |= set(env)
+        for name in names:
+            incoming = [env.get(name) for _, env, _ in arms]
+            if any(v is None for v in incoming):
+                self.partial.add(name)
+            elif all(v is incoming[0] for v in incoming):
+                self.env[name] = incoming[0]
+            else:
+                phi = Value('phi', incoming, blocks=[b for b, _, _ in arms])
+                phi.block = merge_bb
+                merge_bb.instrs.append(phi)
+                self.env[name] = phi
+
+    def expr(self, node):
+        t = node.type
+        if t in ('NumberLiteral', 'StringLiteral', 'BooleanLiteral'):
+            return self.emit(Value('const', value=node.value))
+        if t in ('ArrayLiteral', 'ObjectLiteral'):
+            from runtime.register_compiler import RegisterCompiler
+            return self.emit(Value('const', value=RegisterCompiler()._materialize_literal(node)))
+        if t == 'Identifier':
+            name = node.name
+            base = name.split('.', 1)[0]
+            if name in self.partial or base in self.partial:
+                raise SSAUnsupported(f"'{base}' is only assigned on some paths")
+            if name in self.env:
+                return self.env[name]
+            if base in self.env:
+                raise SSAUnsupported(f"attribute access on local '{base}'")
+            return self.emit(Value('global', name=name))
+        if t == 'BinaryExpression':
+            if node.operator not in ARITHMETIC_OPS + COMPARISON_OPS:
+                raise SSAUnsupported(f"operator {node.operator}")
+            left = self.expr(node.left)
+            right = self.expr(node.right)
+            return self.emit(Value('binop', [left, right], operator=node.operator))
+        if t == 'CallExpression':
+            base = node.callee.split('.', 1)[0]
+            if node.callee in self.env or base in self.env or base in self.partial:
+                raise SSAUnsupported(f"call through local '{node.callee}'")
+            args = [self.expr(a) for a in node.arguments]
+            return self.emit(Value('call', args, callee=node.callee))
+        raise SSAUnsupported(f"expression {t}")
+
+
+def build_function(node):
+    """Build an SSAFunction from a FunctionDeclaration AST node."""
+    fn = SSAFunction(node.name, node.params)
+    b = _Builder(fn)
+    b.stmts(node.body)
+    if b.block is not None:
+        b.terminate(Terminator('ret', []))
+    fn.number()
+    return fn
+
+
+# ---------------------------------------------------------------------------
+# Types
+# ---------------------------------------------------------------------------
+
+def const_type(value):
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        # integral literals are typed as int so integer kernels stay in i64
+        return 'int' if value.is_integer() else 'float'
+    if value is None:
+        return 'none'
+    if isinstance(value, str):
+        return 'str'
+    return 'any'
+
+
+def unify_types(types):
+    types = set(types)
+    if not types:
+        return 'none'
+    if len(types) == 1:
+        return types.pop()
+    if types <= set(NUMERIC_TYPES):
+        return 'float' if 'float' in types else 'int'
+    return 'any'
+
+
+def binop_type(operator, lt, rt):
+    if operator in COMPARISON_OPS:
+        return 'bool'
+    if lt not in NUMERIC_TYPES or rt not in NUMERIC_TYPES:
+        if operator == '+' and lt == rt == 'str':
+            return 'str'
+        return 'any'
+    if operator == '/' or 'float' in (lt, rt):
+        return 'float'
+    return 'int'
+
+
+def builtin_call_type(callee, arg_types):
+    """Result type of a call to one of MATH_FUNCTIONS with numeric arguments, or None."""
+    if callee not in MATH_FUNCTIONS or any(t not in NUMERIC_TYPES for t in arg_types):
+        return None
+    if callee in ('math.sqrt', 'math.sin') and len(arg_types) == 1:
+        return 'float'
+    if callee == 'abs' and len(arg_types) == 1:
+        return 'float' if arg_types[0] == 'float' else 'int'
+    if callee in ('min', 'max') and len(arg_types) >= 2:
+        return unify_types(arg_types)
+    return None
+
+
+def infer_types(fn, param_types=None, call_types=None, builtins=False):
+    """Assign `type` to every value; parameters default to 'any'.
+
+    `call_types` maps callee names to known return types; other calls are 'any',
+    or typed by `builtin_call_type` when `builtins` is set (callers that know
+    the MATH_FUNCTIONS names are not rebound).
+    """
+    call_types = call_types or {}
+    for p, t in zip(fn.params, param_types or ['any'] * len(fn.params)):
+        p.type = t
+    # blocks are created in an order where definitions precede uses, except that
+    # phis may see operands from later blocks; iterate to a fixpoint
+    for _ in range(len(fn.blocks) + 1):
+        changed = False
+        for v in fn.values():
+            if v.op == 'const':
+                t = const_type(v.value)
+            elif v.op == 'binop':
+                t = binop_type(v.operator, v.args[0].type, v.args[1].type)
+            elif v.op == 'phi':
+                t = unify_types(a.type for a in v.args)
+            elif v.op == 'call':
+                if v.callee in call_types:
+                    t = call_types[v.callee]
+                elif builtins:
+                    t = builtin_call_type(v.callee, [a.type for a in v.args]) or 'any'
+                else:
+                    t = 'any'
+            else:
+                t = 'any'
+            if t != v.type:
+                v.type = t
+                changed = True
+        if not changed:
+            break
+    return fn
+
+
+# ---------------------------------------------------------------------------
+# Passes
+# ---------------------------------------------------------------------------
+
+def _fold(operator, a, b):
+    if operator == '+':
+        return a + b
+    if operator == '-':
+        return a - b
+    if operator == '*':
+        return a * b
+    if operator == '/':
+        return a / b
+    if operator == '<':
+        return a < b
+    if operator == '>':
+        return a > b
+    if operator == '<=':
+        return a <= b
+    if operator == '>=':
+        return a >= b
+    if operator == '==':
+        return a == b
+    return a != b
+
+
+def _is_number(v):
+    return v.op == 'const' and isinstance(v.value, (int, float)) and not isinstance(v.value, bool)
+
+
+def remove_unreachable_blocks(fn):
+    reachable = set()
+    work = [fn.blocks[0]]
+    while work:
+        b = work.pop()
+        if b in reachable:
+            continue
+        reachable.add(b)
+        work.extend(b.successors())
+    fn.blocks = [b for b in fn.blocks if b in reachable]
+    for b in fn.blocks:
+        for v in b.instrs:
+            if v.op == 'phi':
+                pairs = [(a, pb) for a, pb in zip(v.args, v.blocks) if pb in reachable]
+                v.args = [a for a, _ in pairs]
+                v.blocks = [pb for _, pb in pairs]
+
+
+def constant_propagation(fn):
+    changed = True
+    while changed:
+        changed = False
+        for b in fn.blocks:
+            for v in list(b.instrs):
+                new = None
+                if v.op == 'binop' and _is_number(v.args[0]) and _is_number(v.args[1]):
+                    if v.operator == '/' and v.args[1].value == 0:
+                        continue
+                    new = Value('const', value=_fold(v.operator, v.args[0].value, v.args[1].value))
+                elif v.op == 'phi' and v.args and all(a is v.args[0] for a in v.args):
+                    fn.replace_all_uses(v, v.args[0])
+                    b.instrs.remove(v)
+                    changed = True
+                    continue
+                if new is not None:
+                    new.block = b
+                    b.instrs[b.instrs.index(v)] = new
+                    fn.replace_all_uses(v, new)
+                    changed = True
+            t = b.term
+            if t is not None and t.op == 'cbr' and t.args[0].op == 'const':
+                target = t.targets[0] if t.args[0].value else t.targets[1]
+                b.term = Terminator('br', [], [target])
+                remove_unreachable_blocks(fn)
+                # the untaken successor may still be reachable; drop its phi edge
+                for s in fn.blocks:
+                    for v in s.instrs:
+                        if v.op == 'phi' and s is not target:
+                            pairs = [(a, pb) for a, pb in zip(v.args, v.blocks) if pb is not b]
+                            v.args = [a for a, _ in pairs]
+                            v.blocks = [pb for _, pb in pairs]
+                changed = True
+                break
+    _merge_straight_blocks(fn)
+    fn.number()
+    return fn
+
+
+def _merge_straight_blocks(fn):
+    """Merge a block into its single predecessor when that predecessor only branches to it."""
+    merged = True
+    while merged:
+        merged = False
+        preds = fn.predecessors()
+        for b in fn.blocks:
+            t = b.term
+            if t is None or t.op != 'br':
+                continue
+            succ = t.targets[0]
+            if succ is fn.blocks[0] or len(preds[succ]) != 1:
+                continue
+            for v in succ.instrs:
+                if v.op == 'phi':
+                    fn.replace_all_uses(v, v.args[0])
+                else:
+                    v.block = b
+                    b.instrs.append(v)
+            b.term = succ.term
+            for s in succ.successors():
+                for v in s.instrs:
+                    if v.op == 'phi':
+                        v.blocks = [b if pb is succ else pb for pb in v.blocks]
+            fn.blocks.remove(succ)
+            merged = True
+            break
+
+
+def dead_code_elimination(fn):
+    while True:
+        counts = fn.uses()
+        removed = False
+        for b in fn.blocks:
+            keep = [v for v in b.instrs
+                    if counts.get(id(v)) or not (v.op in _PURE_OPS or _pure_binop(v))]
+            if len(keep) != len(b.instrs):
+                b.instrs = keep
+                removed = True
+        if not removed:
+            fn.number()
+            return fn
+
+
+def _pure_binop(v):
+    # arithmetic on unknown types may raise, so only numeric binops are dropped
+    return v.op == 'binop' and v.args[0].type in NUMERIC_TYPES and v.args[1].type in NUMERIC_TYPES
+
+
+def size(fn):
+    return sum(len(b.instrs) + 1 for b in fn.blocks)
+
+
+def calls_itself(fn):
+    return any(v.op == 'call' and v.callee == fn.name for v in fn.values())
+
+
+def inline_calls(fn, lookup, max_size=12):
+    """Inline calls to small non-recursive functions returned by `lookup(name)`."""
+    sites = [v for v in fn.values() if v.op == 'call' and v.callee != fn.name]
+    for call in sites:
+        callee = lookup(call.callee)
+        if callee is None or callee is fn or calls_itself(callee) or size(callee) > max_size:
+            continue
+        if len(callee.params) != len(call.args):
+            continue
+        _inline_one(fn, call, callee)
+    fn.number()
+    return fn
+
+
+def _inline_one(fn, call, callee):
+    block = call.block
+    pos = block.instrs.index(call)
+    tail = fn.new_block('cont')
+    fn.blocks.remove(tail)
+    tail.instrs = block.instrs[pos + 1:]
+    for v in tail.instrs:
+        v.block = tail
+    tail.term = block.term
+    for s in tail.successors():
+        for v in s.instrs:
+            if v.op == 'phi':
+                v.blocks = [tail if pb is block else pb for pb in v.blocks]
+    block.instrs = block.instrs[:pos]
+
+    # clone the callee's blocks with parameters bound to the call arguments
+    vmap = {id(p): a for p, a in zip(callee.params, call.args)}
+    bmap = {}
+    for cb in callee.blocks:
+        bmap[cb] = fn.new_block(f"inl_{callee.name}_")
+        fn.blocks.remove(bmap[cb])
+    phis = []
+    for cb in callee.blocks:
+        nb = bmap[cb]
+        for v in cb.instrs:
+            nv = Value(v.op, v.args, v.type, **{k: val for k, val in v.__dict__.items()
+                                                if k not in ('op', 'args', 'type', 'id', 'block')})
+            nv.block = nb
+            vmap[id(v)] = nv
+            nb.instrs.append(nv)
+            if v.op == 'phi':
+                phis.append(nv)
+    returns = []
+    for cb in callee.blocks:
+        nb = bmap[cb]
+        for nv in nb.instrs:
+            nv.args = [vmap.get(id(a), a) for a in nv.args]
+        for nv in phis:
+            if nv.block is nb:
+                nv.blocks = [bmap[pb] for pb in nv.blocks]
+        t = cb.term
+        if t.op == 'ret':
+            if t.args:
+                rv = vmap.get(id(t.args[0]), t.args[0])
+            else:
+                rv = Value('const', value=None)
+                rv.block = nb
+                nb.instrs.append(rv)
+            returns.append((rv, nb))
+            nb.term = Terminator('br', [], [tail])
+        else:
+            nb.term = Terminator(t.op, [vmap.get(id(a), a) for a in t.args], [bmap[x] for x in t.targets])
+
+    block.term = Terminator('br', [], [bmap[callee.blocks[0]]])
+    if len(returns) == 1:
+        result = returns[0][0]
+    else:
+        result = Value('phi', [r for r, _ in returns], blocks=[b for _, b in returns])
+        result.block = tail
+        tail.instrs.insert(0, result)
+    at = fn.blocks.index(block) + 1
+    fn.blocks[at:at] = [bmap[cb] for cb in callee.blocks] + [tail]
+    fn.replace_all_uses(call, result)
+
+
+def split_critical_edges(fn):
+    """Insert empty blocks on edges from a multi-successor block into a block with phis.
+
+    Backends that lower phis to copies at the end of predecessors need this.
+    """
+    preds = fn.predecessors()
+    for b in list(fn.blocks):
+        succs = b.successors()
+        if len(succs) < 2:
+            continue
+        for i, s in enumerate(succs):
+            if len(preds[s]) < 2 or not any(v.op == 'phi' for v in s.instrs):
+                continue
+            edge = fn.new_block('edge')
+            fn.blocks.remove(edge)
+            fn.blocks.insert(fn.blocks.index(s), edge)
+            edge.term = Terminator('br', [], [s])
+            b.term.targets[i] = edge
+            for v in s.instrs:
+                if v.op == 'phi':
+                    v.blocks = [edge if pb is b else pb for pb in v.blocks]
+    return fn
+
+
+def optimize(fn, lookup=None, param_types=None):
+    """Run the shared pass pipeline; `lookup` enables inlining of known callees."""
+    if lookup is not None:
+        inline_calls(fn, lookup)
+    constant_propagation(fn)
+    infer_types(fn, param_types)
+    dead_code_elimination(fn)
+    return fn
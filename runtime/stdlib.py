@@ -1,7 +1,8 @@
 """
 Jusu++ Standard Library (minimal)
 Expose simple modules: math, json, time, random and helpers.
-get_builtins() returns a mapping of names to module-like dicts or callables.
+get_builtins() returns a mapping of names to module-like dicts or callables;
+modules with optional dependencies are imported on first use.
 """
 import math
 import json
@@ -29,49 +30,150 @@ class RandomModule:
     def rand(self):
         return random.random()
 
-def get_builtins():
-    # Import datascience lazily to avoid hard dependency on numpy/pandas
+class LazyModule:
+    """Proxy for a module-like object that is created on first attribute access.
+
+    Keeps optional dependencies (aiohttp/requests, numpy/pandas, node, wasmtime)
+    and plugin packages from being imported until a program uses them.
+    """
+    __slots__ = ('_name', '_factory', '_module')
+
+    def __init__(self, name, factory):
+        self._name = name
+        self._factory = factory
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = self._factory()
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        if attr in LazyModule.__slots__:
+            raise AttributeError(attr)
+        return getattr(self._load(), attr)
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __call__(self, *args, **kwargs):
+        # plugins and `ffi` may be functions rather than modules
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        if self._module is None:
+            return f"<lazy module '{self._name}'>"
+        return repr(self._module)
+
+
+class _PandasMissingStub:
+    def __getattr__(self, name):
+        raise RuntimeError("pandas not available; install via 'pip install pandas' to use pd.* features")
+    def __repr__(self):
+        return "<PandasModule pandas=no>"
+
+
+def _http_module():
+    from runtime.web import WebModule
+    return WebModule()
+
+
+def _js_module():
+    from runtime import js
+    return js
+
+
+def _wasm_module():
+    from runtime import wasm
+    return wasm
+
+
+def _numpy_module():
+    # falls back to pure Python when numpy is missing
+    from runtime.datascience import DataScienceModule
+    return DataScienceModule()
+
+
+def _pandas_module():
     try:
-        from runtime.datascience import DataScienceModule, PandasModule
-        ds = DataScienceModule()
-        pd_mod = PandasModule()
+        from runtime.datascience import PandasModule
+        return PandasModule()
     except Exception:
-        ds = None
-        pd_mod = None
-
-    builtins = {
-        'math': MathModule(),
-        'json': JSONModule(),
-        'time': TimeModule(),
-        'random': RandomModule(),
-        'http': __import__('runtime.web', fromlist=['WebModule']).WebModule(),
-        'ffi': __import__('runtime.ffi', fromlist=['load']).load,
-        'js': __import__('runtime.js', fromlist=['call']) ,
-        'wasm': __import__('runtime.wasm', fromlist=['instantiate_wat']) ,
-    }
+        return _PandasMissingStub()
 
-    # Always expose 'np' with the provided wrapper (fallback works when numpy missing)
-    if ds is not None:
-        builtins['np'] = ds
-
-    # Expose 'pd' if pandas wrapper present; otherwise provide a lightweight stub
-    if pd_mod is not None:
-        builtins['pd'] = pd_mod
-    else:
-        class _PandasMissingStub:
-            def __getattr__(self, name):
-                raise RuntimeError("pandas not available; install via 'pip install pandas' to use pd.* features")
-            def __repr__(self):
-                return "<PandasModule pandas=no>"
-        builtins['pd'] = _PandasMissingStub()
-
-    # Discover external plugins (third-party packages) and inject them
-    try:
+
+def _ffi_load(*args, **kwargs):
+    from runtime.ffi import load
+    return load(*args, **kwargs)
+
+
+# name -> factory for the modules that import optional dependencies
+_LAZY_MODULES = {
+    'http': _http_module,
+    'js': _js_module,
+    'wasm': _wasm_module,
+    'np': _numpy_module,
+    'pd': _pandas_module,
+}
+
+_plugin_entry_points = None
+_plugins = {}
+
+
+def _scan_plugins():
+    # entry points of the jusu.plugins group, read once per process
+    global _plugin_entry_points
+    if _plugin_entry_points is None:
         from runtime import pkgmgr
-        plugins = pkgmgr.discover_plugins()
-        builtins.update(plugins)
-    except Exception:
-        # noop if plugin manager missing or discovery fails
-        pass
+        _plugin_entry_points = pkgmgr.plugin_entry_points()
+    return _plugin_entry_points
 
-    return builtins
+
+def load_plugin(name):
+    """Plugin registered under `name` (pkgmgr.register_builtin or a jusu.plugins
+    entry point), or None.
+
+    Backends call this when a global name is not defined, so plugin discovery
+    costs nothing for programs that do not use plugins.
+    """
+    from runtime import pkgmgr
+    if name in pkgmgr._registered:
+        return pkgmgr._registered[name]
+    if name not in _plugins:
+        try:
+            ep = _scan_plugins().get(name)
+        except Exception:
+            ep = None
+        _plugins[name] = None if ep is None else LazyModule(name, lambda: pkgmgr.load_entry_point(ep))
+    return _plugins[name]
+
+
+def _plugin_or(name, factory):
+    # a plugin registered under a stdlib name replaces the stdlib module
+    def load():
+        plugin = load_plugin(name)
+        return factory() if plugin is None else plugin
+    return load
+
+
+def get_builtins():
+    """Stdlib modules by name, as LazyModule proxies.
+
+    A proxy is resolved on first use, to the plugin of the same name if there
+    is one (see `load_plugin`) and otherwise to the stdlib module, importing
+    its optional dependencies only then. Other plugins are resolved by
+    `load_plugin` when first referenced.
+    """
+    factories = {
+        'math': MathModule,
+        'json': JSONModule,
+        'time': TimeModule,
+        'random': RandomModule,
+        'ffi': lambda: _ffi_load,
+        **_LAZY_MODULES,
+    }
+    return {name: LazyModule(name, _plugin_or(name, factory)) for name, factory in factories.items()}
@@ -0,0 +1,450 @@
+"""
+Tiered execution policy and JIT telemetry.
+
+Jusu functions start in the 'interp' tier, run by the interpreter, the stack VM
+or the register VM, and move to the 'jit' tier once one argument signature has
+been called `thresholds['jit']` times. Each backend keeps a `FunctionProfile`
+per function that counts calls and hands out native code. A `TieringPolicy`
+decides when that happens and for which functions:
+
+- thresholds: calls per tier before promotion
+- max_compiled: cap on native specializations in the process
+- max_specializations: cap on signatures compiled per function
+- enable/disable per function name, or switch the JIT off entirely
+
+The process-wide policy is read from the environment on first use:
+JUSU_JIT=0, JUSU_JIT_THRESHOLD, JUSU_JIT_MAX_COMPILED, JUSU_JIT_DISABLE and
+JUSU_JIT_ONLY (comma-separated function names). `jusu run` has matching flags.
+
+Functions of libraries built by `jusu build` (`add_native_library`) are bound
+on their first call. The JIT (and llvmlite) is only imported once a signature
+reaches the threshold and the policy admits the function; the code cache is
+probed then, before compiling. Native code raises `JITDeopt`
+for arguments it cannot represent (e.g. ints beyond 64 bits); backends then
+run that call as if the function had no native code. `suspend_native()`
+switches native code off for the whole process, e.g. while runtime.instrument
+counts calls.
+
+`jit_stats()` returns per-function call counts, native call counts, compile
+time and tier for every profiled function, plus background
+compiler, code cache and JIT engine (optimization level, target CPU) details. JIT progress messages go to the 'jusu.jit'
+logger instead of program output.
+"""
+import os
+import threading
+import time
+import weakref
+
+TIERS = ('interp', 'jit')
+
+
+class JITDeopt(Exception):
+    """Raised by a compiled function's entry guard when the arguments do not
+    match the signature it was specialized for."""
+
+
+# argument types with a native representation, as in `jit.signature`
+_TYPE_NAMES = {int: 'int', float: 'float', bool: 'bool'}
+
+
+def _names(value):
+    return {n.strip() for n in value.split(',') if n.strip()} if value else set()
+
+
+class TieringPolicy:
+    def __init__(self, thresholds=None, max_compiled=None, max_specializations=4,
+                 disabled=(), only=None, jit=True):
+        self.thresholds = {'jit': 8}
+        self.thresholds.update(thresholds or {})
+        self.max_compiled = max_compiled
+        self.max_specializations = max_specializations
+        self.disabled = set(disabled)
+        # when set, only these functions are compiled
+        self.only = set(only) if only is not None else None
+        self.jit = jit
+        self.compiled = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ=None):
+        env = os.environ if environ is None else environ
+        thresholds = {}
+        if env.get('JUSU_JIT_THRESHOLD'):
+            thresholds['jit'] = int(env['JUSU_JIT_THRESHOLD'])
+        max_compiled = env.get('JUSU_JIT_MAX_COMPILED')
+        return cls(
+            thresholds=thresholds,
+            max_compiled=int(max_compiled) if max_compiled else None,
+            disabled=_names(env.get('JUSU_JIT_DISABLE')),
+            only=_names(env.get('JUSU_JIT_ONLY')) or None,
+            jit=env.get('JUSU_JIT', '1') != '0',
+        )
+
+    def threshold(self, tier):
+        return self.thresholds[tier]
+
+    def enable(self, name):
+        self.disabled.discard(name)
+        if self.only is not None:
+            self.only.add(name)
+
+    def disable(self, name):
+        self.disabled.add(name)
+
+    def allows(self, name):
+        """True if `name` may be compiled at all."""
+        if not self.jit or name in self.disabled:
+            return False
+        return self.only is None or name in self.only
+
+    def reserve(self):
+        """Claim one compiled-function slot; False once `max_compiled` is reached."""
+        with self.lock:
+            if self.max_compiled is not None and self.compiled >= self.max_compiled:
+                return False
+            self.compiled += 1
+            return True
+
+    def release(self):
+        """Return a slot claimed by `reserve` whose compilation failed."""
+        with self.lock:
+            self.compiled = max(0, self.compiled - 1)
+
+    def describe(self):
+        return {
+            'jit': self.jit,
+            'thresholds': dict(self.thresholds),
+            'max_compiled': self.max_compiled,
+            'max_specializations': self.max_specializations,
+            'compiled': self.compiled,
+            'disabled': sorted(self.disabled),
+            'only': None if self.only is None else sorted(self.only),
+        }
+
+
+_policy = None
+
+
+# runs that must see every call (instrumentation, deterministic profiling)
+# switch native code off; counted so they can nest
+_suspended = 0
+
+
+def suspend_native():
+    """Make every FunctionProfile.native return None until `resume_native()`.
+
+    Calls then run in the backends, which count and time them; functions
+    are not compiled meanwhile.
+    """
+    global _suspended
+    _suspended += 1
+
+
+def resume_native():
+    global _suspended
+    _suspended = max(0, _suspended - 1)
+
+
+def get_policy():
+    """Return the process-wide TieringPolicy, configured from the environment."""
+    global _policy
+    if _policy is None:
+        _policy = TieringPolicy.from_env()
+    return _policy
+
+
+def set_policy(policy):
+    """Install a TieringPolicy (None re-reads the environment on next use)."""
+    global _policy
+    _policy = policy
+
+
+class FunctionProfile:
+    """Call profile and native code of one Jusu function, shared by all backends.
+
+    A backend calls `native(args)` on every call of the function: it counts the
+    call, records the argument signature and returns the native entry point to
+    use, or None to run the call on its slow path. Compilation is triggered
+    here once a signature is hot and the policy admits it.
+
+    `lookup(name)` returns the FunctionDeclaration currently bound to a global
+    name (or None); it resolves callees for `jit.call_group` and detects
+    redefinitions of functions compiled into native code.
+    """
+
+    def __init__(self, node, lookup, backend='interp'):
+        self.node = node
+        self.lookup = lookup
+        self.backend = backend
+        self.call_count = 0
+        self.native_calls = 0
+        # argument signature -> calls seen / native entry point
+        self.type_feedback = {}
+        self.specializations = {}
+        # array entry points for `jit.map_array`, by signature
+        self.vectors = {}
+        # signatures that are not eligible for compilation, and
+        # signatures queued for background compilation
+        self.rejected = set()
+        self.compiling = set()
+        # calls that found native code for other argument types
+        self.guard_failures = 0
+        self.compiles = 0
+        self.compile_time = 0.0
+        _functions.add(self)
+
+    def resolve(self, name):
+        # declaration a call to `name` reaches from this function's body
+        if name == self.node.name:
+            return self.node
+        return self.lookup(name)
+
+    def deps_current(self, deps):
+        # native code calls the functions it was compiled with directly
+        for dep_name, dep_node in deps.items():
+            if self.lookup(dep_name) is not dep_node:
+                return False
+        return True
+
+    def native(self, args):
+        if _suspended:
+            return None
+        self.call_count += 1
+        # a signature containing None (a non-numeric argument) is never compiled
+        sig = tuple(map(_TYPE_NAMES.get, map(type, args)))
+        native = self.specializations.get(sig)
+        if native is not None and (not native.jit_deps or self.deps_current(native.jit_deps)):
+            self.native_calls += 1
+            return native.call
+        return self._slow_path(args, sig, native)
+
+    def _slow_path(self, args, sig, native):
+        if None in sig:
+            sig = None
+        if native is not None:
+            # a function compiled into the native code was redefined
+            from runtime import jit
+            jit.log.info("'%s' invalidated: a callee was redefined", self.node.name)
+            self.specializations = {}
+            self.vectors = {}
+            self.type_feedback = {}
+            self.rejected = set()
+        elif self.specializations:
+            # the entry guard failed: run this call on the slow path
+            self.guard_failures += 1
+
+        if sig is None or sig in self.rejected:
+            return None
+        seen = self.type_feedback.get(sig, 0) + 1
+        self.type_feedback[sig] = seen
+        native = None
+        policy = get_policy()
+        try:
+            if seen == 1 and _libraries:
+                native = self.load_library(sig)
+            if native is None and seen >= policy.threshold('jit') and sig not in self.compiling:
+                if not policy.allows(self.node.name):
+                    self.rejected.add(sig)
+                else:
+                    native = self.load_cached(sig) or self.compile(sig)
+        except Exception as e:
+            # ignore JIT failures and continue
+            from runtime import jit
+            jit.log.warning("compiling '%s' raised: %s", self.node.name, e)
+            self.rejected.add(sig)
+        if native is None:
+            return None
+        self.native_calls += 1
+        return native.call
+
+    def vector(self, sig, n):
+        """Array entry point for mapping the function over `n` elements of `sig`.
+
+        Elements count as calls. The entry point is compiled (synchronously)
+        once calls with `sig` plus `n` reach the JIT threshold; before that
+        None is returned and the caller makes `n` ordinary calls.
+        """
+        from runtime import jit
+        vector = self.vectors.get(sig)
+        if vector is not None and not self.deps_current(vector.jit_deps):
+            jit.log.info("'%s' invalidated: a callee was redefined", self.node.name)
+            self.vectors = {}
+            vector = None
+        if vector is None:
+            policy = get_policy()
+            if (sig in self.rejected or not policy.allows(self.node.name)
+                    or self.type_feedback.get(sig, 0) + n < policy.threshold('jit')
+                    or not policy.reserve()):
+                return None
+            jit.log.info("compiling array entry point of '%s' for (%s)",
+                         self.node.name, ', '.join(sig))
+            try:
+                vector = self.timed_compile(sig, jit.compile_vector_function)
+            except Exception as e:
+                jit.log.warning("compiling '%s' raised: %s", self.node.name, e)
+                vector = None
+            if vector is None:
+                policy.release()
+                self.rejected.add(sig)
+                return None
+            self.vectors[sig] = vector
+        self.call_count += n
+        self.native_calls += n
+        self.type_feedback[sig] = self.type_feedback.get(sig, 0) + n
+        return vector
+
+    def admit(self, sig):
+        # whether the policy lets this signature get native code
+        policy = get_policy()
+        if (not policy.allows(self.node.name)
+                or len(self.specializations) + len(self.compiling) >= policy.max_specializations
+                or not policy.reserve()):
+            self.rejected.add(sig)
+            return False
+        return True
+
+    def load_library(self, sig):
+        # an AOT library may have compiled this signature
+        for library in _libraries:
+            native = library.lookup(self.node, self.resolve, sig)
+            if native is not None:
+                # built ahead of time: no JIT policy applies
+                self.specializations[sig] = native
+                return native
+        return None
+
+    def load_cached(self, sig):
+        # an earlier process may have compiled this signature
+        from runtime import jit
+        native = jit.load_cached_function(self.node, self.resolve, sig)
+        if native is not None and self.admit(sig):
+            self.specializations[sig] = native
+            return native
+        return None
+
+    def compile(self, sig):
+        """Compile a specialization for `sig`.
+
+        With a background compiler the job is queued and None is returned; the
+        native entry point is installed when ready.
+        """
+        from runtime import jit
+        if not self.admit(sig):
+            return None
+        jit.log.info("compiling '%s' for (%s) after %d calls (%s)",
+                     self.node.name, ', '.join(sig), self.type_feedback[sig], self.backend)
+        background = jit.get_background_compiler()
+        if background is None:
+            return self.install(sig, self.timed_compile(sig))
+        # marked before submitting: the worker may install (and unmark) it
+        # before submit returns
+        self.compiling.add(sig)
+        if not background.submit((id(self), sig), lambda: self.timed_compile(sig),
+                                 lambda native: self.install(sig, native)):
+            self.compiling.discard(sig)
+            get_policy().release()
+        return None
+
+    def timed_compile(self, sig, compile_fn=None):
+        from runtime import jit
+        compile_fn = compile_fn or jit.compile_simple_function
+        start = time.perf_counter()
+        try:
+            return compile_fn(self.node, self.resolve, sig)
+        finally:
+            self.compiles += 1
+            self.compile_time += time.perf_counter() - start
+
+    def install(self, sig, compiled):
+        # a single dict store, so callers on other threads see either no
+        # native code or the finished entry point
+        from runtime import jit
+        self.compiling.discard(sig)
+        if compiled is None:
+            jit.log.info("'%s' not eligible for JIT compilation", self.node.name)
+            self.rejected.add(sig)
+            get_policy().release()
+        else:
+            jit.log.info("'%s' compiled for (%s)", self.node.name, ', '.join(sig))
+            self.specializations[sig] = compiled
+        return compiled
+
+
+# native libraries from `jusu build` (runtime.compiler.NativeLibrary), searched
+# before the JIT code cache
+_libraries = []
+
+
+def add_native_library(library):
+    _libraries.append(library)
+
+
+def remove_native_library(library):
+    if library in _libraries:
+        _libraries.remove(library)
+
+
+# every FunctionProfile created by any backend, for telemetry
+_functions = weakref.WeakSet()
+
+
+def function_stats(fn):
+    def sigs(keys):
+        return [list(sig) for sig in keys]
+
+    return {
+        'name': fn.node.name,
+        'backend': fn.backend,
+        'tier': 'jit' if fn.specializations or fn.vectors else 'interp',
+        'calls': fn.call_count,
+        'native_calls': fn.native_calls,
+        'interpreted_calls': fn.call_count - fn.native_calls,
+        'compile_time': fn.compile_time,
+        'compiles': fn.compiles,
+        'guard_failures': fn.guard_failures,
+        'specializations': sigs(fn.specializations),
+        'vectors': sigs(fn.vectors),
+        'rejected': sigs(fn.rejected),
+    }
+
+
+def jit_stats():
+    """Structured JIT telemetry for this process."""
+    from runtime import jit
+    background = jit.get_background_compiler()
+    cache = jit.get_code_cache()
+    engine = jit._engine
+    functions = sorted((function_stats(fn) for fn in list(_functions)),
+                       key=lambda s: (-s['calls'], s['name']))
+    return {
+        'policy': get_policy().describe(),
+        'functions': functions,
+        'background': background.metrics() if background is not None else None,
+        'code_cache': cache.stats() if cache is not None else None,
+        'engine': {'opt_level': engine.opt_level, 'cpu': engine.cpu} if engine is not None else None,
+    }
+
+
+def format_stats(stats=None):
+    """Render `jit_stats()` as a table for `jusu run --jit-stats`."""
+    stats = stats or jit_stats()
+    lines = ["JIT statistics",
+             f"{'function':<20} {'tier':<7} {'calls':>9} {'native':>9} {'compile ms':>11} {'guards':>7}  signatures"]
+    for s in stats['functions']:
+        sigs = ' '.join('(' + ', '.join(sig) + ')' for sig in s['specializations']) or '-'
+        lines.append(f"{s['name']:<20} {s['tier']:<7} {s['calls']:>9} {s['native_calls']:>9} "
+                     f"{s['compile_time'] * 1000:>11.2f} {s['guard_failures']:>7}  {sigs}")
+    if not stats['functions']:
+        lines.append("(no functions declared)")
+    bg = stats['background']
+    if bg is not None:
+        lines.append(f"background: queued={bg['queue_length']} completed={bg['completed']} "
+                     f"failed={bg['failed']} dropped={bg['dropped']}")
+    cache = stats['code_cache']
+    if cache is not None:
+        lines.append(f"code cache: hits={cache['hits']} misses={cache['misses']} "
+                     f"stores={cache['stores']} entries={cache['entries']}")
+    engine = stats.get('engine')
+    if engine is not None:
+        lines.append(f"engine: O{engine['opt_level']} cpu={engine['cpu']}")
+    return '\n'.join(lines)
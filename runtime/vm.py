@@ -1,6 +1,8 @@
 """
 Simple VM skeleton for Jusu++ (proof of concept)
 """
+from runtime import instrument
+from runtime.tiering import JITDeopt
 
 # Define opcodes (match runtime/bytecode_compiler.py)
 LOAD_CONST = 1
@@ -22,6 +24,37 @@ BINARY_EQ = 16
 BINARY_NE = 17
 BINARY_ADD_FAST = 18
 
+OPNAMES = {
+    LOAD_CONST: 'LOAD_CONST',
+    LOAD_NAME: 'LOAD_NAME',
+    STORE_NAME: 'STORE_NAME',
+    BINARY_ADD: 'BINARY_ADD',
+    BINARY_SUB: 'BINARY_SUB',
+    BINARY_MUL: 'BINARY_MUL',
+    BINARY_DIV: 'BINARY_DIV',
+    RETURN_VALUE: 'RETURN_VALUE',
+    CALL_FUNCTION: 'CALL_FUNCTION',
+    JUMP_IF_FALSE: 'JUMP_IF_FALSE',
+    JUMP: 'JUMP',
+    BINARY_LT: 'BINARY_LT',
+    BINARY_GT: 'BINARY_GT',
+    BINARY_LE: 'BINARY_LE',
+    BINARY_GE: 'BINARY_GE',
+    BINARY_EQ: 'BINARY_EQ',
+    BINARY_NE: 'BINARY_NE',
+    BINARY_ADD_FAST: 'BINARY_ADD_FAST',
+}
+
+def _assigns(nodes):
+    """True if any statement in `nodes` (recursively) is an Assignment."""
+    for node in nodes:
+        if node.type == 'Assignment':
+            return True
+        if node.type == 'IfStatement' and (_assigns(node.then_branch) or _assigns(node.else_branch or [])):
+            return True
+    return False
+
+
 class VM:
     def __init__(self):
         self.consts = []
@@ -35,20 +68,75 @@ class VM:
         # we check the cache first. This is a simple form of inline caching.
         self.name_cache = {}
         # Call frame stack to avoid creating new VM instances on each call
-        # Each frame is a dict with keys: instructions, consts, names, pc, locals
+        # Each frame is a dict with keys: instructions, consts, names, pc, locals,
+        # lines and function
         self.call_stack = []
         self.locals = None
+        # line table of the running code and its code object (None at top
+        # level); read by the sampling profiler
+        self.lines = ()
+        self.function = None
+        # runtime.budget.Budget of the run, or None
+        self.budget = None
+        # JIT call profiles: id(code) -> (code, FunctionProfile or None)
+        self.profiles = {}
+
+    def _lookup_function(self, name):
+        value = self.globals.get(name)
+        if isinstance(value, tuple) and len(value) > 5 and value[0] == 'code':
+            return value[5]
+        return None
 
-    def run(self, instructions, consts=None, names=None):
+    def _global(self, name):
+        # plugins (stdlib.load_plugin) are bound the first time a name misses
+        if name in self.globals:
+            return self.globals[name]
+        from runtime.stdlib import load_plugin
+        value = load_plugin(name)
+        if value is not None:
+            self.globals[name] = value
+        return value
+
+    def _profile(self, fn):
+        entry = self.profiles.get(id(fn))
+        if entry is not None and entry[0] is fn:
+            return entry[1]
+        profile = None
+        node = fn[5]
+        # functions store assignments to globals in this VM, which native code
+        # would not do, so only assignment-free functions are profiled
+        if node is not None and not _assigns(node.body):
+            from runtime import tiering
+            profile = tiering.FunctionProfile(node, self._lookup_function, backend='vm')
+        self.profiles[id(fn)] = (fn, profile)
+        return profile
+
+    def run(self, instructions, consts=None, names=None, lines=None):
+        if self.budget is not None:
+            from runtime import budget
+            return budget.run_vm(self, instructions, consts, names, lines)
+        counters = instrument.active
+        if counters is not None:
+            return instrument.run_vm(self, counters, instructions, consts, names, lines)
+        return self._run(instructions, consts, names, lines)
+
+    def _run(self, instructions, consts=None, names=None, lines=None, probe=None):
+        # `probe(op, arg)` sees every instruction after its fetch (runtime/instrument.py);
+        # with a budget, calls take steps and + and * check sizes (runtime/budget.py)
+        budget = self.budget
         self.instructions = instructions
         self.consts = consts or []
         self.names = names or []
+        self.lines = lines or ()
+        self.function = None
         self.pc = 0
         self.stack = []
 
         while self.pc < len(self.instructions):
             op, arg = self.instructions[self.pc]
             self.pc += 1
+            if probe is not None:
+                probe(op, arg)
             if op == LOAD_CONST:
                 self.stack.append(self.consts[arg])
             elif op == LOAD_NAME:
@@ -65,7 +153,7 @@ class VM:
                 # Resolve dotted names (e.g., 'math.sqrt') by traversing
                 if '.' in name:
                     parts = name.split('.')
-                    obj = self.globals.get(parts[0])
+                    obj = self._global(parts[0])
                     for p in parts[1:]:
                         try:
                             if hasattr(obj, p):
@@ -77,7 +165,7 @@ class VM:
                             break
                     value = obj
                 else:
-                    value = self.globals.get(name)
+                    value = self._global(name)
 
                 # Cache the resolved global value for subsequent fast lookup
                 self.name_cache[name] = value
@@ -91,13 +179,15 @@ class VM:
             elif op == BINARY_ADD:
                 b = self.stack.pop()
                 a = self.stack.pop()
-                self.stack.append(a + b)
+                self.stack.append(a + b if budget is None else budget.add(a, b))
             elif op == BINARY_ADD_FAST:
                 b = self.stack.pop()
                 a = self.stack.pop()
                 # Fast-path for numeric types
                 if (isinstance(a, (int, float)) and isinstance(b, (int, float))):
                     self.stack.append(a + b)
+                elif budget is not None:
+                    self.stack.append(budget.add(a, b))
                 else:
                     # fallback to python addition
                     self.stack.append(a + b)
@@ -108,10 +198,12 @@ class VM:
             elif op == BINARY_MUL:
                 b = self.stack.pop()
                 a = self.stack.pop()
-                self.stack.append(a * b)
+                self.stack.append(a * b if budget is None else budget.mul(a, b))
             elif op == BINARY_DIV:
                 b = self.stack.pop()
                 a = self.stack.pop()
+                if b == 0:
+                    raise ZeroDivisionError("Division by zero")
                 self.stack.append(a / b)
             elif op == BINARY_LT:
                 b = self.stack.pop()
@@ -147,13 +239,25 @@ class VM:
                     # fallback to python addition
                     self.stack.append(a + b)
             elif op == CALL_FUNCTION:
+                if budget is not None:
+                    budget.step()
                 argc = arg
                 # Pop callee then args
                 fn = self.stack.pop()
                 args = [self.stack.pop() for _ in range(argc)][::-1]
-                # If fn is a compiled code object: ('code', instrs, consts, names, params)
+                # If fn is a compiled code object: ('code', instrs, consts, names, params[, node, lines])
                 if isinstance(fn, tuple) and len(fn) >= 5 and fn[0] == 'code':
-                    _, instrs, consts, names, params = fn
+                    # native code would not count steps
+                    profile = self._profile(fn) if len(fn) > 5 and budget is None else None
+                    native = profile.native(args) if profile is not None else None
+                    if native is not None:
+                        try:
+                            self.stack.append(native(*args))
+                            continue
+                        except JITDeopt:
+                            # arguments the native code cannot represent
+                            pass
+                    instrs, consts, names, params = fn[1:5]
                     # Push current frame
                     frame = {
                         'instructions': self.instructions,
@@ -161,12 +265,16 @@ class VM:
                         'names': self.names,
                         'pc': self.pc,
                         'locals': self.locals,
+                        'lines': self.lines,
+                        'function': self.function,
                     }
                     self.call_stack.append(frame)
                     # Set up new frame for function
                     self.instructions = instrs
                     self.consts = consts
                     self.names = names
+                    self.lines = fn[6] if len(fn) > 6 else ()
+                    self.function = fn
                     self.locals = {}
                     for p, a in zip(params, args):
                         self.locals[p] = a
@@ -192,6 +300,8 @@ class VM:
                     self.consts = frame['consts']
                     self.names = frame['names']
                     self.locals = frame['locals']
+                    self.lines = frame['lines']
+                    self.function = frame['function']
                     self.pc = frame['pc']
                     # push return value for caller
                     self.stack.append(ret)
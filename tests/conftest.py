@@ -1,7 +1,43 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 # Ensure repository root is on sys.path for test imports
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+# Keep the JIT code cache out of the user's home directory during tests
+import os
+import tempfile
+os.environ.setdefault('JUSU_JIT_CACHE_DIR', tempfile.mkdtemp(prefix='jusu-jit-cache-'))
+# Compile hot functions synchronously so tests see native code deterministically;
+# tests/test_jit_background.py installs its own background compiler
+os.environ.setdefault('JUSU_JIT_BACKGROUND', '0')
+
+
+@pytest.fixture
+def no_code_cache():
+    """Compile without the on-disk JIT code cache for the duration of a test."""
+    from runtime import jit
+    previous = jit._code_cache
+    jit.set_code_cache(None)
+    yield
+    jit.set_code_cache(previous)
+
+
+def functions(src):
+    """The FunctionDeclaration nodes of `src` by name, in source order."""
+    from runtime.compiler import compile_to_ast
+    return {n.name: n for n in compile_to_ast(src) if n.type == 'FunctionDeclaration'}
+
+
+def declare(src):
+    """An Interpreter that has executed `src`."""
+    from runtime.compiler import compile_to_ast
+    from runtime.interpreter import Interpreter
+    interp = Interpreter()
+    for node in compile_to_ast(src):
+        interp.execute(node)
+    return interp
@@ -0,0 +1,102 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from runtime import jit, tiering
+from runtime.compiler import build_native_library, compile_to_ast, load_native_library
+from runtime.interpreter import Interpreter
+
+pytestmark = [
+    pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available"),
+    pytest.mark.skipif(shutil.which(os.environ.get('CC', 'cc')) is None, reason="no C compiler to link"),
+]
+
+SRC = '''
+function square(x):
+    return x * x
+end
+function sumsq(a, b):
+    return square(a) + square(b)
+end
+function greet(name):
+    return "hi " + name
+end
+'''
+
+
+@pytest.fixture
+def built(tmp_path):
+    source = tmp_path / 'prog.jusu'
+    source.write_text(SRC)
+    manifest = build_native_library(str(source))
+    library = load_native_library(str(tmp_path / 'prog.json'))
+    yield manifest, library
+    tiering.remove_native_library(library)
+
+
+def _run(src):
+    interp = Interpreter()
+    for node in compile_to_ast(src):
+        interp.execute(node)
+    return interp
+
+
+def test_manifest_lists_compiled_and_skipped_functions(built, tmp_path):
+    manifest, _ = built
+    assert (tmp_path / manifest['library']).exists()
+    assert sorted(manifest['functions']) == ['square', 'sumsq']
+    assert manifest['skipped'] == ['greet']
+    sumsq = manifest['functions']['sumsq']
+    assert sumsq['params'] == ['float', 'float'] and sumsq['ret'] == 'float'
+    assert list(sumsq['callees']) == ['square']
+    assert json.loads((tmp_path / 'prog.json').read_text()) == manifest
+
+
+def test_functions_run_natively_from_the_first_call(built):
+    interp = _run(SRC + '''
+r = sumsq(3, 4)
+g = greet("jusu")
+''')
+    assert interp.variables['r'] == 25.0
+    assert interp.variables['g'] == 'hi jusu'
+    profile = interp.variables['sumsq'].profile
+    assert list(profile.specializations) == [('float', 'float')]
+    assert profile.native_calls == 1
+    assert not interp.variables['greet'].profile.specializations
+
+
+def test_changed_source_is_interpreted(built):
+    interp = _run(SRC.replace('return x * x', 'return x * x * 2') + '''
+r = sumsq(3, 4)
+''')
+    # square changed, and sumsq was compiled with the old square inlined
+    assert interp.variables['r'] == 50.0
+    assert not interp.variables['square'].profile.specializations
+    assert not interp.variables['sumsq'].profile.specializations
+
+
+def test_division_by_zero_raises(tmp_path):
+    source = tmp_path / 'inv.jusu'
+    source.write_text('function inverse(x):\n    return 1 / x\nend\n')
+    manifest = build_native_library(str(source))
+    assert manifest['functions']['inverse']['error']
+    library = load_native_library(str(tmp_path / 'inv.json'))
+    try:
+        interp = _run(source.read_text() + 'r = inverse(4)\n')
+        assert interp.variables['r'] == 0.25
+        inverse = interp.variables['inverse']
+        assert inverse.profile.native_calls == 1
+        with pytest.raises(ZeroDivisionError, match='Division by zero'):
+            inverse(0.0)
+        assert inverse.profile.native_calls == 2
+    finally:
+        tiering.remove_native_library(library)
+
+
+def test_unknown_manifest_format(tmp_path):
+    path = tmp_path / 'lib.json'
+    path.write_text(json.dumps({'format': 99}))
+    with pytest.raises(ValueError):
+        load_native_library(str(path))
@@ -0,0 +1,117 @@
+import pytest
+
+from runtime import sandbox
+from runtime.budget import Budget, BudgetExceeded
+from runtime.compiler import BACKENDS, run_source
+
+FIB = '''
+function fib(n):
+    if n < 2:
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+say fib(12)
+'''
+
+FOREVER = '''
+function forever(n):
+    return forever(n + 1)
+end
+say forever(0)
+'''
+
+GROW = '''
+function grow(s, n):
+    if n < 1:
+        return s
+    end
+    return grow(s + s, n - 1)
+end
+say len(grow("ab", 40))
+'''
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_step_budget_stops_unbounded_recursion(backend):
+    budget = Budget(steps=200)
+    with pytest.raises(BudgetExceeded) as info:
+        run_source(FOREVER, backend, budget=budget)
+    assert info.value.kind == 'steps' and info.value.limit == 200
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_size_budget_caps_strings(backend):
+    with pytest.raises(BudgetExceeded) as info:
+        run_source(GROW, backend, budget=Budget(max_size=10000))
+    assert info.value.kind == 'size'
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_size_budget_caps_ranges(backend):
+    with pytest.raises(BudgetExceeded):
+        run_source('say len(range(100000000))\n', backend, budget=Budget(max_size=10000))
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_programs_within_budget_run_normally(backend, capsys):
+    budget = Budget(steps=1000, max_size=1000)
+    run_source(FIB, backend, budget=budget)
+    assert capsys.readouterr().out.strip() == '144.0'
+    # one step per call of fib
+    assert budget.used in (465, 466)
+
+
+def test_budgeted_interpreter_skips_native_code():
+    from runtime.interpreter import Interpreter
+    from runtime.compiler import compile_to_ast
+    interp = Interpreter()
+    interp.set_budget(Budget(steps=5000))
+    for node in compile_to_ast(FIB.replace('say', 'r =')):
+        interp.execute(node)
+    assert interp.variables['r'] == 144.0
+    assert interp.variables['fib'].profile.native_calls == 0
+
+
+def test_run_budgeted_reports_like_run_file():
+    ok = sandbox.run_budgeted(FIB, steps=1000)
+    assert ok['returncode'] == 0 and ok['stdout'].strip() == '144.0'
+    assert ok['budget_exceeded'] is None and ok['timed_out'] is False
+
+    stopped = sandbox.run_budgeted(FOREVER, steps=100, backend='regvm')
+    assert stopped['returncode'] == 1
+    assert stopped['budget_exceeded'] == 'steps' and stopped['steps'] == 100
+    assert 'BudgetExceeded' in stopped['stderr']
+
+
+@pytest.mark.parametrize('backend', ['vm', 'regvm'])
+def test_vm_builtins_are_restored_after_budgeted_run(backend, capsys):
+    from runtime.bytecode_compiler import BytecodeCompiler
+    from runtime.compiler import _vm_globals, compile_to_ast
+    from runtime.register_compiler import compile_to_register_code
+    from runtime.register_vm import RegisterVM
+    from runtime.vm import VM
+    ast = compile_to_ast(FIB)
+    if backend == 'vm':
+        instrs, consts, names = BytecodeCompiler().compile_program(ast)
+        runner, reg_count = VM(), {}
+    else:
+        instrs, consts, names, reg_count = compile_to_register_code(ast, optimize=True)
+        runner, reg_count = RegisterVM(), {'reg_count': reg_count}
+    runner.globals.update(_vm_globals())
+    plain = dict(runner.globals)
+    runner.budget = budget = Budget(steps=1000, max_size=1000)
+    runner.run(instrs, consts=consts, names=names, **reg_count)
+    assert budget.used in (465, 466)
+    assert runner.globals['range'] is plain['range'] and runner.globals['list'] is plain['list']
+    assert capsys.readouterr().out.strip() == '144.0'
+
+
+def test_lifting_a_budget_restores_interpreter_builtins():
+    from runtime.interpreter import Interpreter
+    interp = Interpreter()
+    plain = dict(interp.builtins)
+    interp.set_budget(Budget(max_size=10))
+    assert interp.builtins['range'] is not plain['range']
+    interp.set_budget(None)
+    assert interp.builtins == plain
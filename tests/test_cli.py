@@ -0,0 +1,66 @@
+import pytest
+
+from compiler import jusu
+from runtime import tiering
+
+FIB = '''function fib(n):
+    if n < 2:
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+say fib(10)
+'''
+
+
+@pytest.fixture(autouse=True)
+def restore_policy():
+    previous = tiering.get_policy()
+    yield
+    tiering.set_policy(previous)
+
+
+@pytest.fixture
+def prog(tmp_path):
+    path = tmp_path / 'fib.jusu'
+    path.write_text(FIB)
+    return str(path)
+
+
+@pytest.mark.parametrize('backend', ['interp', 'vm', 'regvm'])
+def test_backend_selection_and_quiet(prog, backend, capsys):
+    jusu.main(['run', '--backend', backend, '--quiet', prog])
+    assert capsys.readouterr().out == '55.0\n'
+
+
+def test_options_before_the_file(prog, capsys):
+    jusu.main(['run', '--vm', '--no-jit', prog])
+    out = capsys.readouterr().out
+    assert '(backend=vm)' in out and 'Program finished successfully!' in out
+    assert tiering.get_policy().jit is False
+
+
+def test_time_reports_every_phase(prog, capsys):
+    jusu.main(['run', '-q', '--time', '--backend', 'regvm', prog])
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == '55.0'
+    assert out[1].startswith('[time] lex ') and all(p in out[1] for p in ('parse', 'compile', 'execute', 'total'))
+
+
+def test_batch_runs_every_file_and_fails_at_the_end(prog, tmp_path, capsys):
+    listing = tmp_path / 'files.txt'
+    listing.write_text(f'{prog}\n{tmp_path / "missing.jusu"}\n{prog}\n')
+    with pytest.raises(SystemExit) as exc:
+        jusu.main(['run', '--time', f'@{listing}'])
+    assert exc.value.code == 1
+    out = capsys.readouterr().out
+    assert out.count('55.0') == 2
+    assert "not found" in out
+    assert '[time] all 3 files:' in out
+    assert '2 of 3 programs succeeded' in out
+
+
+def test_unknown_backend_is_rejected(prog, capsys):
+    with pytest.raises(SystemExit):
+        jusu.main(['run', '--backend', 'llvm', prog])
+    assert 'invalid choice' in capsys.readouterr().err
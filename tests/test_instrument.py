@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from runtime import instrument, jit, tiering
+from runtime.compiler import compile_and_run, run_source
+
+SRC = '''function fib(n):
+    if n < 2:
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+say fib(10)
+'''
+
+
+@pytest.fixture(autouse=True)
+def interpreted():
+    previous = tiering.get_policy()
+    tiering.set_policy(tiering.TieringPolicy(jit=False))
+    yield
+    tiering.set_policy(previous)
+    instrument.disable()
+
+
+@pytest.mark.parametrize('backend, op', [('interp', 'CallExpression'), ('vm', 'CALL_FUNCTION'), ('regvm', 'CALL')])
+def test_counters_per_backend(backend, op, capsys):
+    with instrument.collect() as counters:
+        run_source(SRC, backend)
+    stats = json.loads(counters.to_json())
+    assert stats['backends'] == [backend]
+    assert stats['functions']['fib']['calls'] == 177
+    assert stats['functions']['fib']['time'] > 0
+    # print is a call too
+    assert stats['ops'][op] >= 177
+    assert stats['instructions'] == sum(stats['ops'].values())
+    assert stats['max_depth'] == 10
+
+
+@pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available")
+@pytest.mark.parametrize('backend', ['interp', 'vm', 'regvm'])
+def test_native_code_is_suspended(backend, capsys):
+    tiering.set_policy(tiering.TieringPolicy(thresholds={'jit': 1}))
+    with instrument.collect() as counters:
+        run_source(SRC, backend)
+    stats = counters.to_dict()
+    assert stats['functions']['fib']['calls'] == 177
+    assert stats['max_depth'] == 10
+    assert not tiering._suspended
+
+
+def test_vm_name_cache_and_stack():
+    with instrument.collect() as counters:
+        run_source('x = 2\ny = x + x\nz = y * x\n', 'vm')
+    stats = counters.to_dict()
+    assert stats['names'] == {'lookups': 4, 'hits': 4, 'hit_rate': 1.0}
+    assert stats['max_stack'] == 2
+    assert stats['functions'] == {}
+
+
+def test_disabled_runs_are_not_counted(capsys):
+    with instrument.collect() as counters:
+        pass
+    assert instrument.active is None
+    run_source(SRC, 'vm')
+    assert counters.to_dict()['instructions'] == 0
+
+
+def test_compile_and_run_writes_json(tmp_path, capsys):
+    prog = tmp_path / 'fib.jusu'
+    prog.write_text(SRC)
+    out = tmp_path / 'stats.json'
+    compile_and_run(str(prog), backend='regvm', quiet=True, stats=str(out))
+    assert json.loads(out.read_text())['functions']['fib']['calls'] == 177
+    assert instrument.active is None
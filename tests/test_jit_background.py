@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+from runtime.interpreter import Interpreter
+
+pytestmark = pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available")
+
+
+@pytest.fixture
+def background():
+    previous_cache, previous_bg = jit._code_cache, jit._background
+    jit.set_code_cache(None)
+    compiler = jit.BackgroundCompiler(max_pending=4)
+    jit.set_background_compiler(compiler)
+    yield compiler
+    compiler.shutdown()
+    jit.set_background_compiler(previous_bg)
+    jit.set_code_cache(previous_cache)
+
+
+def test_hot_function_is_compiled_off_the_calling_thread(background):
+    interp = Interpreter()
+    for node in compile_to_ast('function cube(x):\n    return x * x * x\nend\n'):
+        interp.execute(node)
+    cube = interp.variables['cube']
+    for _ in range(8):
+        assert cube(2) == 8
+    assert ('int',) in cube.profile.compiling or ('int',) in cube.profile.specializations
+    assert background.drain(timeout=30)
+    assert ('int',) in cube.profile.specializations and not cube.profile.compiling
+    assert cube(3) == 27
+
+    metrics = background.metrics()
+    assert metrics['submitted'] == 1 and metrics['completed'] == 1
+    assert metrics['queue_length'] == 0 and metrics['pending'] == 0
+    assert metrics['compile_time_max'] > 0
+
+
+def test_queue_is_bounded(background):
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def blocking_job():
+        started.set()
+        release.wait(10)
+        return None
+
+    assert background.submit('a', blocking_job, results.append)
+    assert started.wait(10)
+    for key in 'bcde':
+        assert background.submit(key, lambda: None, results.append)
+    # the worker is busy and the queue holds max_pending jobs
+    assert not background.submit('f', lambda: None, results.append)
+    # a key that is already pending is not queued twice
+    assert not background.submit('b', lambda: None, results.append)
+    assert background.metrics()['queue_length'] == 4
+    release.set()
+    assert background.drain(timeout=10)
+    metrics = background.metrics()
+    assert metrics['dropped'] == 1 and metrics['failed'] == 5 and len(results) == 5
+
+
+def test_worker_survives_a_raising_callback(background):
+    def bad_callback(result):
+        raise RuntimeError('boom')
+    results = []
+    assert background.submit('a', lambda: 1, bad_callback)
+    assert background.drain(timeout=10)
+    assert background.submit('b', lambda: 2, results.append)
+    assert background.drain(timeout=10)
+    assert results == [2]
+
+
+def test_dead_worker_is_restarted(background):
+    results = []
+    assert background.submit('a', lambda: 1, results.append)
+    assert background.drain(timeout=10)
+    # a worker that died (e.g. killed by an error outside the job) is replaced
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    background._thread = dead
+    assert background.submit('b', lambda: 2, results.append)
+    assert background.drain(timeout=10)
+    assert results == [1, 2]
+
+
+def test_shutdown_does_not_block_on_a_full_queue(background):
+    started, release = threading.Event(), threading.Event()
+    assert background.submit('a', lambda: (started.set(), release.wait(10)), lambda r: None)
+    assert started.wait(10)
+    for key in 'bcde':
+        assert background.submit(key, lambda: None, lambda r: None)
+    background.shutdown(timeout=0.1)
+    release.set()
+    assert background.drain(timeout=10)
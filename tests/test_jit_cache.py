@@ -0,0 +1,86 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+
+pytestmark = pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available")
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def _function(src):
+    return next(n for n in compile_to_ast(src) if n.type == 'FunctionDeclaration')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    previous = jit._code_cache
+    c = jit.JITCodeCache(str(tmp_path / 'cache'))
+    jit.set_code_cache(c)
+    yield c
+    jit.set_code_cache(previous)
+
+
+def test_ast_hash_ignores_source_positions():
+    a = _function('function f(x):\n    return x * 2\nend\n')
+    b = _function('\n\n  function f(x):\n      return x * 2\n  end\n')
+    c = _function('function f(x):\n    return x * 3\nend\n')
+    assert jit.ast_hash(a) == jit.ast_hash(b)
+    assert jit.ast_hash(a) != jit.ast_hash(c)
+
+
+def test_compiled_function_is_reused_from_cache(cache):
+    node = _function('function poly(x):\n    return x * x + 3\nend\n')
+    fn = jit.compile_simple_function(node)
+    assert fn(4) == 19
+    assert cache.stats()['stores'] == 1 and cache.stats()['entries'] == 1
+
+    # a fresh engine stands in for a new process
+    jit.reset_engine()
+    loaded = jit.load_cached_function(node)
+    assert loaded is not None and loaded(5) == 28
+    assert cache.hits == 1
+
+
+def test_batch_is_cached_as_one_module(cache):
+    src = ('function sq(x):\n    return x * x\nend\n'
+           'function hyp(a, b):\n    return sq(a) + sq(b)\nend\n')
+    nodes = [n for n in compile_to_ast(src) if n.type == 'FunctionDeclaration']
+    compiled = jit.compile_functions(nodes)
+    assert compiled['hyp'](3, 4) == 25
+    assert cache.stats()['stores'] == 1 and cache.stats()['entries'] == 1
+
+    jit.reset_engine()
+    loaded = jit.compile_functions(nodes)
+    assert cache.hits == 1 and cache.stats()['stores'] == 1
+    assert loaded['hyp'](6, 8) == 100 and loaded['sq'](5) == 25
+    # the functions' own entries are separate and can share the engine
+    assert jit.compile_simple_function(nodes[0])(7) == 49
+
+
+def test_cache_evicts_least_recently_used(cache):
+    cache.max_bytes = 1
+    for k in range(3):
+        jit.compile_simple_function(_function(f'function f{k}(x):\n    return x + {k}\nend\n'))
+    stats = cache.stats()
+    assert stats['stores'] == 3
+    assert stats['evictions'] == 3 and stats['entries'] == 0
+
+
+def test_new_process_loads_native_code_on_first_call(tmp_path):
+    script = tmp_path / 'hot.jusu'
+    script.write_text('function triple(n):\n    return n * 3\nend\n' + 'say triple(2)\n' * 9)
+    env = dict(os.environ, JUSU_JIT_CACHE_DIR=str(tmp_path / 'cache'))
+    code = ('import logging, sys; logging.basicConfig(level=logging.INFO, stream=sys.stdout); '
+            'from runtime.compiler import compile_and_run; compile_and_run(sys.argv[1])')
+    cmd = [sys.executable, '-c', code, str(script)]
+    first = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    second = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    assert "loaded 'triple' from code cache" not in first.stdout
+    assert "loaded 'triple' from code cache" in second.stdout
+    assert "compiling 'triple'" in first.stdout
+    assert "compiling 'triple'" not in second.stdout
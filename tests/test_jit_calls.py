@@ -0,0 +1,100 @@
+import pytest
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+from runtime.interpreter import Interpreter
+
+from conftest import functions
+
+pytestmark = [
+    pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available"),
+    pytest.mark.usefixtures('no_code_cache'),
+]
+
+SRC = '''
+function fib(n):
+    if n < 2:
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+function is_even(n):
+    if n == 0:
+        return 1
+    end
+    return is_odd(n - 1)
+end
+function is_odd(n):
+    if n == 0:
+        return 0
+    end
+    return is_even(n - 1)
+end
+function fib_sum(a, b):
+    return fib(a) + fib(b)
+end
+function shout(x):
+    say x
+    return x
+end
+'''
+
+
+def test_self_recursive_function_compiles():
+    fib = jit.compile_simple_function(functions(SRC)['fib'])
+    assert fib is not None
+    assert [fib(n) for n in range(10)] == [0, 1, 1, 2, 3, 5, 8, 13, 21, 34]
+    assert fib(25) == 75025
+    assert list(fib.jit_deps) == ['fib']
+
+
+def test_mutually_recursive_group_compiles_together():
+    nodes = functions(SRC)
+    is_even = jit.compile_simple_function(nodes['is_even'], nodes.get)
+    assert is_even is not None
+    assert is_even(10) == 1 and is_even(7) == 0
+    assert sorted(is_even.jit_deps) == ['is_even', 'is_odd']
+
+
+def test_calls_to_other_functions_are_native():
+    nodes = functions(SRC)
+    compiled = jit.compile_functions(list(nodes.values()))
+    assert compiled['fib_sum'](10, 12) == 55 + 144
+    assert sorted(compiled['fib_sum'].jit_deps) == ['fib']
+
+
+def test_unknown_callee_is_not_compiled():
+    nodes = functions(SRC)
+    assert jit.compile_simple_function(nodes['fib_sum']) is None
+    assert 'shout' not in jit.compile_functions([nodes['shout']])
+
+
+def test_call_group_key_depends_on_callees():
+    nodes = functions(SRC)
+    other = functions(SRC.replace('return fib(n - 1) + fib(n - 2)', 'return fib(n - 1) + fib(n - 3)'))
+    engine = jit.get_engine()
+    key = jit.cache_key(nodes['fib_sum'], ['int', 'int'], engine, jit.call_group(nodes['fib_sum'], nodes.get))
+    changed = jit.cache_key(nodes['fib_sum'], ['int', 'int'], engine, jit.call_group(nodes['fib_sum'], other.get))
+    assert key != changed
+
+
+def test_interpreter_drops_native_code_when_callee_is_redefined(capsys):
+    interp = Interpreter()
+    ast = compile_to_ast('''
+function double(x):
+    return x * 2
+end
+function quad(x):
+    return double(double(x))
+end
+''')
+    for node in ast:
+        interp.execute(node)
+    quad = interp.variables['quad']
+    for _ in range(10):
+        assert quad(3) == 12
+    assert quad.profile.specializations
+    for node in compile_to_ast('function double(x):\n    return x * 3\nend\n'):
+        interp.execute(node)
+    assert quad(3) == 27
+    assert not quad.profile.specializations
@@ -0,0 +1,66 @@
+import pytest
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+
+from conftest import functions
+
+# with the code cache enabled functions are compiled one module each
+pytestmark = [
+    pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available"),
+    pytest.mark.usefixtures('no_code_cache'),
+]
+
+
+def test_functions_share_one_engine():
+    first, second = [n for n in compile_to_ast('''
+function inc(n):
+    return n + 1
+end
+function inc(n):
+    return n + 2
+end
+''') if n.type == 'FunctionDeclaration']
+    engine = jit.get_engine()
+    a = jit.compile_simple_function(first)
+    b = jit.compile_simple_function(second)
+    assert jit.get_engine() is engine
+    # redefinitions get their own symbols in the shared engine
+    assert a(1) == 2 and b(1) == 3
+
+
+def test_batch_compiles_eligible_functions_in_one_module():
+    nodes = functions('''
+function add(a, b):
+    return a + b
+end
+function greet(name):
+    return "hi " + name
+end
+function scale(x):
+    y = x * 2.5
+    return y + 1
+end
+''')
+    engine = jit.get_engine()
+    batches = lambda: [m for m in engine.modules if m.name.startswith('jit_batch')]
+    before = len(batches())
+    compiled = jit.compile_functions(list(nodes.values()))
+    assert sorted(compiled) == ['add', 'scale']
+    # one module for the batch (call trampolines are separate modules)
+    assert len(batches()) == before + 1
+    assert compiled['add'](2, 3) == 5
+    assert compiled['scale'](2.0) == 6.0
+
+
+def test_reset_engine_keeps_compiled_functions_alive():
+    node, = functions('''
+function sq(x):
+    return x * x
+end
+''').values()
+    fn = jit.compile_simple_function(node)
+    old = jit.get_engine()
+    jit.reset_engine()
+    assert jit.get_engine() is not old
+    assert fn(7) == 49
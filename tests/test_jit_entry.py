@@ -0,0 +1,98 @@
+import pytest
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+
+pytestmark = pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available")
+
+SRC = '''
+function add(a, b):
+    return a + b
+end
+function half(x):
+    return x / 2
+end
+function positive(n):
+    return n > 0
+end
+function seven():
+    return 7
+end
+function inverse(x):
+    return 1 / x
+end
+function spread(x):
+    return inverse(x - 1) + inverse(x + 1)
+end
+'''
+
+
+@pytest.fixture
+def nodes():
+    return {n.name: n for n in compile_to_ast(SRC) if n.type == 'FunctionDeclaration'}
+
+
+def test_trampoline_and_wrapper_agree(nodes):
+    add = jit.compile_simple_function(nodes['add'], signature=('int', 'int'))
+    half = jit.compile_simple_function(nodes['half'], signature=('float',))
+    positive = jit.compile_simple_function(nodes['positive'], signature=('int',))
+    seven = jit.compile_simple_function(nodes['seven'], signature=())
+    for fn, args in ((add, (2, 40)), (half, (3,)), (half, (3.0,)),
+                     (positive, (5,)), (positive, (-5,)), (seven, ())):
+        assert fn.call is not fn
+        assert fn.call(*args) == fn(*args)
+        assert type(fn.call(*args)) is type(fn(*args))
+    assert positive.call(1) is True
+
+
+def test_trampoline_guards(nodes):
+    add = jit.compile_simple_function(nodes['add'], signature=('int', 'int'))
+    for fn in (add, add.call):
+        with pytest.raises(jit.JITDeopt):
+            fn(1, 2.0)
+        with pytest.raises(jit.JITDeopt):
+            fn(True, 2)
+        with pytest.raises(TypeError):
+            fn(1)
+    # ints beyond 64 bits do not fit the native code
+    for fn in (add, add.call):
+        with pytest.raises(jit.JITDeopt):
+            fn(2 ** 63, 1)
+        with pytest.raises(jit.JITDeopt):
+            fn(1, -2 ** 63 - 1)
+    assert add.call(2 ** 63 - 1, -1) == 2 ** 63 - 2
+    # -1 is a valid argument, not an error return
+    assert add.call(-1, -1) == -2
+
+
+def test_division_by_zero_raises(nodes):
+    inverse = jit.compile_simple_function(nodes['inverse'], signature=('int',))
+    spread = jit.compile_simple_function(nodes['spread'], nodes.get, signature=('int',))
+    for fn, args in ((inverse, (0,)), (spread, (1,)), (spread, (-1,))):
+        for entry in (fn, fn.call):
+            with pytest.raises(ZeroDivisionError, match='Division by zero'):
+                entry(*args)
+    # the flag is cleared for the next call
+    assert inverse.call(4) == 0.25 and spread(2) == pytest.approx(1 + 1 / 3)
+    assert inverse.map([1, 2]) == [1.0, 0.5]
+    with pytest.raises(ZeroDivisionError):
+        inverse.map([1, 0])
+
+
+def test_wrapper_without_trampolines(nodes, monkeypatch):
+    monkeypatch.setattr(jit, '_trampolines_ok', False)
+    add = jit.compile_simple_function(nodes['add'], signature=('int', 'float'))
+    assert add.call is add
+    assert add.__name__ == 'add'
+    assert add(1, 2) == 3.0
+    with pytest.raises(jit.JITDeopt, match=r"add: str argument for \(int, float\)"):
+        add(1, 'x')
+
+
+def test_wrappers_share_generated_guards(nodes):
+    first = jit.compile_simple_function(nodes['add'], signature=('int', 'int'))
+    second = jit.compile_simple_function(nodes['add'], signature=('int', 'int'))
+    assert first.__code__ is second.__code__
+    engine = jit.get_engine()
+    # int addition may overflow: the entry point checks the error flag
+    assert (('int', 'int'), 'int', True) in engine.trampolines
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+from runtime.interpreter import Interpreter
+
+pytestmark = pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available")
+
+SRC = '''
+function sq(x):
+    return x * x
+end
+function norm(a, b):
+    return math.sqrt(sq(a) + sq(b))
+end
+function wave(t):
+    return math.sin(t * math.pi) + abs(t - 3) + max(t, 2) - min(t, 1, 0.5)
+end
+function iabs(n):
+    return abs(n) + max(n, 0)
+end
+'''
+
+
+@pytest.fixture
+def nodes():
+    return {n.name: n for n in compile_to_ast(SRC) if n.type == 'FunctionDeclaration'}
+
+
+def _interpret(call):
+    interp = Interpreter()
+    for node in compile_to_ast(SRC + 'r = ' + call + '\n'):
+        interp.execute(node)
+    return interp.variables['r']
+
+
+def test_math_calls_match_the_interpreter(nodes):
+    norm = jit.compile_simple_function(nodes['norm'], nodes.get, ('float', 'float'))
+    wave = jit.compile_simple_function(nodes['wave'], nodes.get, ('float',))
+    assert norm(3.0, 4.0) == _interpret('norm(3, 4)') == 5.0
+    for t in (0.25, 1.5, 4.0):
+        assert wave(t) == pytest.approx(_interpret(f'wave({t})'))
+    assert math.isnan(norm(float('nan'), 1.0))
+
+
+def test_int_abs_and_max_stay_integers(nodes):
+    iabs = jit.compile_simple_function(nodes['iabs'], nodes.get, ('int',))
+    assert iabs(-7) == 7 and iabs(5) == 10
+    assert type(iabs(-7)) is int
+
+
+def test_small_callees_are_inlined(nodes):
+    module = jit.ir.Module(name='inline_test')
+    jit._lower_function(nodes['norm'], module, 'norm', [nodes['norm'], nodes['sq']], ['float', 'float'])
+    # sq was inlined, so only norm itself (and the sqrt intrinsic) remain
+    defined = [f.name for f in module.functions if not f.is_declaration]
+    assert defined == ['norm']
+    assert 'llvm.sqrt.f64' in str(module)
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from runtime import jit
+
+from conftest import functions
+
+pytestmark = pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available")
+
+SRC = '''
+function square(x):
+    return x * x
+end
+function dist(a, b):
+    d = a - b
+    if d < 0:
+        d = b - a
+    end
+    return square(d) + square(a)
+end
+'''
+
+
+@pytest.fixture(autouse=True)
+def fresh_engine(no_code_cache):
+    yield
+    jit.reset_engine()
+
+
+def test_opt_level_parsing():
+    assert jit._opt_level('O3') == 3
+    assert jit._opt_level(' o1 ') == 1
+    assert jit._opt_level(0) == 0
+    for bad in ('O4', '-1', 'fast'):
+        with pytest.raises(ValueError):
+            jit._opt_level(bad)
+
+
+def test_engine_reads_opt_level_from_env(monkeypatch):
+    monkeypatch.setenv('JUSU_JIT_OPT', 'O1')
+    assert jit.JITEngine().opt_level == 1
+    monkeypatch.delenv('JUSU_JIT_OPT')
+    assert jit.JITEngine().opt_level == jit.DEFAULT_OPT_LEVEL
+
+
+@pytest.mark.parametrize('level', jit.OPT_LEVELS)
+def test_every_level_gives_the_same_results(level):
+    jit.set_engine(jit.JITEngine(opt_level=level))
+    nodes = functions(SRC)
+    dist = jit.compile_simple_function(nodes['dist'], nodes.get, ('int', 'int'))
+    assert dist(3, 7) == 25
+    assert dist(7, 3) == 65
+    engine = jit.get_engine()
+    assert engine.target_machine.triple == engine.triple
+    assert engine.cpu == jit.binding.get_host_cpu_name()
+
+
+def test_dump_writes_ir_and_assembly(tmp_path):
+    jit.set_engine(jit.JITEngine(opt_level=2, dump_dir=str(tmp_path)))
+    nodes = functions(SRC)
+    assert jit.compile_simple_function(nodes['dist'], nodes.get, ('int', 'int'))(1, 2) == 2
+    files = sorted(f for f in os.listdir(tmp_path) if 'trampoline' not in f)
+    assert [f.split('.', 1)[1] for f in files] == ['ll', 'opt.ll', 's']
+    lowered, optimized = (tmp_path / files[0]).read_text(), (tmp_path / files[1]).read_text()
+    # square is inlined before lowering, and nothing but intrinsics (the int
+    # overflow checks) is left to call at O2
+    calls = [line for line in optimized.splitlines() if 'call ' in line and '@llvm.' not in line]
+    assert 'define' in lowered and not calls
+    assert (tmp_path / files[2]).read_text().strip()
+
+
+def test_cache_key_includes_opt_level():
+    node = functions(SRC)['square']
+    keys = {jit.cache_key(node, ['int'], jit.JITEngine(opt_level=level)) for level in jit.OPT_LEVELS}
+    assert len(keys) == len(jit.OPT_LEVELS)
@@ -0,0 +1,200 @@
+import pytest
+
+from runtime import jit, tiering
+from runtime.compiler import compile_and_run, compile_to_ast
+from runtime.interpreter import Interpreter
+
+pytestmark = [
+    pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available"),
+    pytest.mark.usefixtures('no_code_cache'),
+]
+
+INVERSE = '''
+function inverse(x):
+    return 1 / x
+end
+'''
+
+POWER = '''
+function power(a):
+    return a * a * a * a * a * a * a * a * a * a * a
+end
+'''
+
+ROOT = '''
+function root(x):
+    return math.sqrt(x)
+end
+'''
+
+# (source, argument tuples); fewer than 8 calls each so the interpreter side
+# never JIT-compiles itself. Calls that raise must raise the same error; ints
+# beyond 64 bits make the native code deoptimize instead.
+CORPUS = [
+    ('''
+function sign(x):
+    if x < 0:
+        return 0 - 1
+    end
+    if x > 0:
+        return 1
+    end
+    return 0
+end
+''', [(-5,), (0,), (7,)]),
+    ('''
+function clamp(x, lo, hi):
+    if x < lo:
+        return lo
+    else:
+        if x > hi:
+            return hi
+        end
+    end
+    return x
+end
+''', [(5, 0, 10), (-3, 0, 10), (42, 0, 10), (10, 0, 10)]),
+    ('''
+function piecewise(x):
+    y = x * 2
+    if y > 10:
+        y = y - 10
+        z = y * y
+    else:
+        z = y + 1
+    end
+    return z + y
+end
+''', [(1,), (5,), (6,), (20,)]),
+    ('''
+function smooth(t):
+    if t <= 0.0:
+        return 0.0
+    end
+    if t >= 1.0:
+        return 1.0
+    end
+    return t * t * (3.5 - 2.5 * t)
+end
+''', [(-1.0,), (0.25,), (0.5,), (0.9,), (2.0,)]),
+    ('''
+function ratio(a, b):
+    if b == 0:
+        return 0
+    end
+    r = a / b
+    if r > 1:
+        r = 1 / r
+    end
+    return r
+end
+''', [(1, 4), (8, 2), (3, 0), (-6, 3)]),
+    ('''
+function bucket(x):
+    b = 0
+    if x > 10:
+        b = 1
+        if x > 100:
+            b = 2
+        end
+    end
+    return b * 10 + x
+end
+''', [(3,), (50,), (500,)]),
+    ('''
+function same(a, b):
+    return a == b
+end
+''', [(1, 1), (1, 2)]),
+    (INVERSE, [(4,), (0,), (-2,)]),
+    (POWER, [(3,), (-7,), (100,)]),
+    ('''
+function fact(n):
+    if n < 2:
+        return 1
+    end
+    return n * fact(n - 1)
+end
+''', [(5,), (20,), (21,)]),
+    (ROOT, [(4.0,), (0.0,), (-1.0,)]),
+    ('''
+function wave(x):
+    return math.sin(x)
+end
+''', [(0.5,), (float('inf'),), (float('-inf'),)]),
+]
+
+
+@pytest.mark.parametrize('src,calls', CORPUS, ids=[c[0].split('(')[0].split()[-1] for c in CORPUS])
+def test_jit_matches_interpreter(src, calls):
+    (node,) = [n for n in compile_to_ast(src) if n.type == 'FunctionDeclaration']
+    interp = Interpreter()
+    interp.execute(node)
+    interpreted = interp.variables[node.name]
+
+    compiled = jit.compile_simple_function(node)
+    assert compiled is not None, f"{node.name} was not compiled"
+    for args in calls:
+        try:
+            expected = interpreted(*args)
+        except ZeroDivisionError as e:
+            for entry in (compiled, compiled.call):
+                with pytest.raises(ZeroDivisionError, match=f"^{e}$"):
+                    entry(*args)
+            continue
+        except RuntimeError as e:
+            # math errors; the interpreter adds their location
+            for entry in (compiled, compiled.call):
+                with pytest.raises(ValueError) as raised:
+                    entry(*args)
+                assert str(e).startswith(f"{raised.value} (at line")
+            continue
+        for entry in (compiled, compiled.call):
+            try:
+                actual = entry(*args)
+            except jit.JITDeopt:
+                # ints beyond 64 bits; callers interpret the call instead
+                assert not -2**63 <= expected < 2**63, (node.name, args)
+                continue
+            assert actual == pytest.approx(expected), (node.name, args)
+
+
+@pytest.mark.parametrize('backend', ['interp', 'vm', 'regvm'])
+@pytest.mark.parametrize('hot', [False, True])
+def test_division_by_zero_matches_interpreter(backend, hot, tmp_path, capsys):
+    path = tmp_path / 'inverse.jusu'
+    warm_up = ''.join(f"say inverse({i})\n" for i in range(1, 11)) if hot else ''
+    path.write_text(INVERSE + warm_up + 'say inverse(0)\n')
+    with pytest.raises(SystemExit):
+        compile_and_run(str(path), backend=backend, quiet=True)
+    assert capsys.readouterr().out.splitlines()[-1] == 'Runtime Error: Division by zero'
+
+
+@pytest.mark.parametrize('backend', ['interp', 'vm', 'regvm'])
+def test_native_failures_match_interpreter(backend, tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(jit, '_background', None)
+    previous = tiering.get_policy()
+    tiering.set_policy(tiering.TieringPolicy(thresholds={'jit': 1}))
+    path = tmp_path / 'fail.jusu'
+    # string lengths are ints (number literals are floats): power gets an int specialization
+    path.write_text(POWER + ROOT + 'n = len("xxxxxxxxxx") * len("xxxxxxxxxx")\n'
+                    + 'say power(n)\nsay power(n)\nsay root(4)\nsay root(4)\nsay root(0 - 1)\n')
+    try:
+        with pytest.raises(SystemExit):
+            compile_and_run(str(path), backend=backend, quiet=True)
+    finally:
+        tiering.set_policy(previous)
+    out = capsys.readouterr().out.splitlines()
+    assert out[-5:-1] == ['10000000000000000000000', '10000000000000000000000', '2.0', '2.0']
+    assert out[-1].startswith('Runtime Error: math domain error')
+
+
+def test_paths_without_return_are_not_compiled():
+    (node,) = [n for n in compile_to_ast('''
+function maybe(x):
+    if x > 0:
+        return x
+    end
+end
+''') if n.type == 'FunctionDeclaration']
+    assert jit.compile_simple_function(node) is None
@@ -0,0 +1,71 @@
+import pytest
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+
+from conftest import declare
+
+pytestmark = [
+    pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available"),
+    pytest.mark.usefixtures('no_code_cache'),
+]
+
+
+def test_signature_of_arguments():
+    assert jit.signature((1, 2.5, True)) == ('int', 'float', 'bool')
+    assert jit.signature((1, 'x')) is None
+
+
+def test_specializations_follow_observed_types():
+    interp = declare('''
+function step(x, dx):
+    return x + dx * 2
+end
+''')
+    step = interp.variables['step']
+    for _ in range(8):
+        assert step(1, 2) == 5
+    for _ in range(8):
+        assert step(1.5, 0.25) == 2.0
+    for _ in range(8):
+        assert step(3, 0.5) == 4.0
+    assert set(step.profile.specializations) == {('int', 'int'), ('float', 'float'), ('int', 'float')}
+    # native results keep the interpreter's types
+    assert type(step(1, 2)) is int
+    assert step(2.5, 0.5) == 3.5
+
+
+def test_float_argument_is_not_truncated_by_int_specialization():
+    interp = declare('''
+function twice(x):
+    return x * 2
+end
+''')
+    twice = interp.variables['twice']
+    for _ in range(10):
+        twice(3)
+    assert ('int',) in twice.profile.specializations
+    assert twice(1.25) == 2.5
+    assert twice.profile.guard_failures == 1
+
+
+def test_non_numeric_arguments_stay_interpreted():
+    interp = declare('''
+function greet(name):
+    return "hi " + name
+end
+''')
+    greet = interp.variables['greet']
+    for _ in range(10):
+        assert greet("jusu") == "hi jusu"
+    assert not greet.profile.specializations
+
+
+def test_entry_guard_raises_deopt():
+    (node,) = [n for n in compile_to_ast('function inc(n):\n    return n + 1\nend\n')
+               if n.type == 'FunctionDeclaration']
+    inc = jit.compile_simple_function(node, signature=('int',))
+    assert inc.signature == ('int',)
+    assert inc(41) == 42
+    with pytest.raises(jit.JITDeopt):
+        inc(1.5)
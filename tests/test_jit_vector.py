@@ -0,0 +1,101 @@
+import array
+
+import pytest
+
+from runtime import jit, tiering
+from runtime.compiler import compile_to_ast
+from runtime.interpreter import Interpreter
+
+from conftest import functions
+
+pytestmark = pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available")
+
+SRC = '''
+function poly(x, y):
+    return x * x * 2.5 + y * 3.5 - 1.5
+end
+function clamp(n):
+    if n < 0:
+        return 0
+    end
+    if n > 10:
+        return 10
+    end
+    return n
+end
+function positive(n):
+    return n > 0
+end
+'''
+
+
+@pytest.fixture(autouse=True)
+def fresh_policy():
+    tiering.set_policy(tiering.TieringPolicy())
+    yield
+    tiering.set_policy(None)
+
+
+def test_vector_entry_matches_scalar_results():
+    nodes = functions(SRC)
+    vec = jit.compile_vector_function(nodes['poly'], signature=('float', 'float'))
+    scalar = jit.compile_simple_function(nodes['poly'], signature=('float', 'float'))
+    xs = array.array('d', [0.5 * i for i in range(37)])
+    ys = array.array('d', [3.0 - i for i in range(37)])
+    out = vec(xs, ys)
+    assert isinstance(out, array.array) and out.typecode == 'd'
+    assert list(out) == [scalar(x, y) for x, y in zip(xs, ys)]
+
+
+def test_containers_scalars_and_result_kinds():
+    nodes = functions(SRC)
+    clamp = jit.compile_vector_function(nodes['clamp'], signature=('int',))
+    assert clamp([-5, 3, 12]) == [0, 3, 10]
+    assert clamp(array.array('i', [-1, 11])).tolist() == [0, 10]
+    assert clamp([]) == []
+    poly = jit.compile_vector_function(nodes['poly'], signature=('float', 'float'))
+    # ints widen to float parameters, scalars are broadcast
+    assert poly([1, 2], 0) == [1.0, 8.5]
+    positive = jit.compile_vector_function(nodes['positive'], signature=('int',))
+    assert positive((3, -3)) == [True, False]
+    with pytest.raises(ValueError):
+        poly([1.0], [1.0, 2.0])
+
+
+def test_guard_rejects_elements_outside_signature():
+    clamp = jit.compile_vector_function(functions(SRC)['clamp'], signature=('int',))
+    with pytest.raises(jit.JITDeopt):
+        clamp([1, 2.5])
+    with pytest.raises(jit.JITDeopt):
+        clamp(array.array('d', [1.0]))
+
+
+def test_native_wrapper_map():
+    clamp = jit.compile_simple_function(functions(SRC)['clamp'], signature=('int',))
+    assert clamp.map([-2, 20, 7]) == [0, 10, 7]
+    # elements the specialization does not accept fall back to per-element calls
+    assert jit.map_array(lambda n: n * 2, [1.5]) == [3.0]
+
+
+def test_array_signature():
+    assert jit.array_signature([array.array('d'), [1, 2], 3.0]) == ('float', 'int', 'float')
+    assert jit.array_signature([[1, 2.5], [True]]) == ('float', 'bool')
+    assert jit.array_signature([['a']]) is None
+
+
+def test_jusu_map_compiles_once_hot():
+    interp = Interpreter()
+    for node in compile_to_ast(SRC + '''
+small = np.map(clamp, [0 - 4, 4])
+'''):
+        interp.execute(node)
+    # below the threshold: ordinary calls
+    assert interp.variables['small'] == [0, 4.0]
+    clamp = interp.variables['clamp']
+    assert not clamp.profile.vectors
+
+    values = [float(i - 50) for i in range(100)]
+    assert clamp.map(values) == [max(0, min(10, v)) for v in values]
+    assert list(clamp.profile.vectors) == [('float',)]
+    stats = tiering.function_stats(clamp.profile)
+    assert stats['native_calls'] == 100 and stats['vectors'] == [['float']]
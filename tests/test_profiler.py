@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from runtime import bytecode_compiler, jit, profiler, tiering
+from runtime.compiler import compile_to_ast
+
+SRC = '''function work(n):
+    x = n * 2
+    return x + 1
+end
+function fib(n):
+    if n < 2:
+        return work(n)
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+say fib(17)
+'''
+
+
+@pytest.fixture(autouse=True)
+def interpreted():
+    # native code would hide the function bodies from line attribution
+    previous = tiering.get_policy()
+    tiering.set_policy(tiering.TieringPolicy(jit=False))
+    yield
+    tiering.set_policy(previous)
+
+
+def test_deterministic_counts_calls_and_lines(capsys):
+    prof = profiler.profile_source(SRC, mode='deterministic', filename='fib.jusu')
+    assert prof.calls['fib'] == 5167 and prof.calls['work'] == 2584
+    functions = prof.functions()
+    assert functions['<module>'][1] == pytest.approx(prof.total)
+    assert functions['fib'][1] >= functions['work'][1] > 0
+    assert {line for (name, line) in prof.lines() if name == 'fib'} <= {5, 6, 7, 9}
+    flat = prof.format_flat()
+    assert 'fib.jusu:9  fib' in flat and '5167  fib' in flat
+
+
+@pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available")
+def test_deterministic_mode_suspends_native_code(capsys):
+    tiering.set_policy(tiering.TieringPolicy(thresholds={'jit': 1}))
+    prof = profiler.profile_source(SRC, mode='deterministic')
+    assert prof.calls['fib'] == 5167 and prof.calls['work'] == 2584
+    assert not tiering._suspended
+
+
+def test_collapsed_stacks():
+    prof = profiler.profile_source(SRC, mode='deterministic', filename='fib.jusu')
+    rows = prof.collapsed().splitlines()
+    assert rows
+    for row in rows:
+        frames, weight = row.rsplit(' ', 1)
+        assert int(weight) > 0
+        assert frames.startswith('<module> (fib.jusu:')
+    assert any(row.startswith('<module> (fib.jusu:11);fib (fib.jusu:9);fib (fib.jusu:9);')
+               and ';fib (fib.jusu:7);work (fib.jusu:' in row for row in rows)
+
+
+@pytest.mark.parametrize('backend', ['interp', 'vm', 'regvm'])
+def test_sampling_attributes_to_jusu_functions(backend, capsys):
+    prof = profiler.profile_source(SRC, backend=backend, interval=0.0002, filename='fib.jusu')
+    assert prof.total > 0
+    assert set(prof.functions()) <= {'<module>', 'fib', 'work'}
+    assert 'fib' in prof.functions()
+    if backend != 'regvm':
+        # None: the implicit return at the end of a function
+        assert {line for (_, line) in prof.lines()} <= {1, 2, 3, 5, 6, 7, 9, 11, None}
+
+
+def test_sampling_from_a_thread(capsys):
+    # off the main thread there is no SIGPROF; a sampler thread is used instead
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(
+        prof=profiler.profile_source(SRC, backend='vm', interval=0.0002)))
+    worker.start()
+    worker.join()
+    assert result['prof'].total > 0
+
+
+def test_bytecode_line_table():
+    compiler = bytecode_compiler.BytecodeCompiler()
+    instrs, consts, _ = compiler.compile_program(compile_to_ast(SRC))
+    assert len(compiler.lines) == len(instrs)
+    fib = next(c for c in consts if isinstance(c, tuple) and c[0] == 'code' and c[5].name == 'fib')
+    assert len(fib[6]) == len(fib[1])
+    assert set(fib[6]) == {6, 7, 9, None}
+
+
+def test_deterministic_mode_needs_the_interpreter():
+    with pytest.raises(ValueError):
+        profiler.profile_source(SRC, backend='vm', mode='deterministic')
+    with pytest.raises(ValueError):
+        profiler.Profiler(mode='exact')
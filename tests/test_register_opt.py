@@ -0,0 +1,54 @@
+from runtime.compiler import compile_to_ast
+from runtime.register_compiler import compile_to_register_code
+from runtime.register_vm import RegisterVM, LOADC, LOAD_NAME, MOVE
+from runtime.stdlib import get_builtins
+
+
+SRC = '''
+function area(r):
+    return math.pi * r * r + math.pi * 2 + 2 - 2
+end
+function pick(x):
+    if x > 2:
+        return x * 2
+    else:
+        return x + 2
+    end
+end
+a = area(3)
+b = pick(1) + pick(5)
+'''
+
+
+def _run(optimize, dump=None):
+    instrs, consts, names, reg_count = compile_to_register_code(compile_to_ast(SRC), optimize=optimize, dump=dump)
+    vm = RegisterVM()
+    vm.globals.update(get_builtins())
+    vm.run(instrs, consts=consts, names=names, reg_count=reg_count)
+    return vm.globals, consts
+
+
+def test_optimized_code_matches_unoptimized():
+    plain, _ = _run(False)
+    opt, _ = _run(True)
+    assert opt['a'] == plain['a']
+    assert opt['b'] == plain['b'] == 13
+
+
+def test_constants_and_module_attrs_are_loaded_once():
+    _, consts = _run(True)
+    area = consts[0]
+    instrs, fn_consts, fn_names = area[1], area[2], area[3]
+    pi_loads = [ins for ins in instrs if ins[0] == LOAD_NAME and fn_names[ins[2]] == 'math.pi']
+    assert len(pi_loads) == 1
+    two = fn_consts.index(2.0)
+    assert len([ins for ins in instrs if ins[0] == LOADC and ins[2] == two]) == 1
+    # copies are propagated and the MOVEs removed
+    assert not [ins for ins in instrs if ins[0] == MOVE]
+
+
+def test_dump_reports_every_pass():
+    titles = []
+    _run(True, dump=lambda title, lines: titles.append(title))
+    assert '<module>/const#0: before hoist_constants' in titles
+    assert '<module>: after dead_code_elimination' in titles
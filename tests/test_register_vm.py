@@ -21,3 +21,88 @@ def test_register_add_and_call(tmp_path, capsys):
 
     # just ensure it runs without exceptions; captured output is printed by test runner
     # we won't assert on stdout here because print uses the real stdout
+
+
+def test_register_if_else_and_recursion():
+    from runtime.register_compiler import compile_to_register_code
+    from runtime.register_vm import RegisterVM
+    from runtime.compiler import compile_to_ast
+
+    code = '''
+    function fib(n):
+        if n < 2:
+            return n
+        end
+        return fib(n - 1) + fib(n - 2)
+    end
+    function sign(x):
+        if x < 0:
+            return 0 - 1
+        else:
+            return 1
+        end
+    end
+    result = fib(10)
+    neg = sign(0 - 5)
+    pos = sign(5)
+    '''
+    instrs, consts, names, reg_count = compile_to_register_code(compile_to_ast(code))
+    vm = RegisterVM()
+    vm.run(instrs, consts=consts, names=names, reg_count=reg_count)
+    assert vm.globals['result'] == 55
+    assert vm.globals['neg'] == -1
+    assert vm.globals['pos'] == 1
+
+
+def test_register_disassemble():
+    from runtime.register_compiler import compile_to_register_code
+    from runtime.register_vm import disassemble
+    from runtime.compiler import compile_to_ast
+
+    code = '''
+    function add(x, y):
+        return x + y
+    end
+    say add(math.pi, 2)
+    '''
+    instrs, consts, names, reg_count = compile_to_register_code(compile_to_ast(code))
+    listing = '\n'.join(disassemble(instrs, consts, names))
+    assert 'STORE_NAME    add, r0' in listing
+    assert 'LOAD_NAME     r1, math.pi' in listing
+    assert 'ADD           r2, r0, r1' in listing
+    assert 'regcode params=2' in listing
+
+
+def test_register_function_locals_match_interpreter():
+    from runtime.register_compiler import compile_to_register_code
+    from runtime.register_vm import RegisterVM
+    from runtime.compiler import compile_to_ast
+    from runtime.interpreter import Interpreter
+
+    # `f` reads a local assigned on one branch only, so it is not compiled through SSA
+    code = '''
+    x = 7
+    function f(c):
+        if c > 0:
+            x = 3
+        end
+        return x
+    end
+    function g(c):
+        x = c
+        return x
+    end
+    a = f(1)
+    b = f(0)
+    c = g(5)
+    '''
+    interp = Interpreter()
+    for node in compile_to_ast(code):
+        interp.execute(node)
+    for optimize in (False, True):
+        instrs, consts, names, reg_count = compile_to_register_code(compile_to_ast(code), optimize=optimize)
+        vm = RegisterVM()
+        vm.run(instrs, consts=consts, names=names, reg_count=reg_count)
+        for name in 'abcx':
+            assert vm.globals[name] == interp.variables[name], (name, optimize)
+    assert (interp.variables['b'], interp.variables['x']) == (7, 7)
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import sandbox
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='ForkServer needs os.fork')
+
+FOREVER = '''
+function forever(n):
+    return forever(n + 1)
+end
+say forever(0)
+'''
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    with sandbox.ForkServer(timeout=5.0, memory_limit_mb=300) as server:
+        yield server
+
+
+def test_fork_results_match_run_file(server, tmp_path):
+    path = tmp_path / 'prog.jusu'
+    path.write_text('say 1 + 2\n')
+    forked, spawned = server.run_file(str(path)), sandbox.run_file(str(path), memory_limit_mb=300)
+    assert forked.keys() == spawned.keys()
+    for key in ('returncode', 'stdout', 'stderr', 'timed_out', 'killed', 'counters'):
+        assert forked[key] == spawned[key]
+
+    failed = server.run_source('say missing\n')
+    assert failed['returncode'] == 1
+
+
+def test_timeout_kills_only_the_child(server):
+    res = server.run_source(FOREVER, timeout=0.5, backend='vm')
+    assert res['timed_out'] is True and res['killed'] is True
+    assert res['returncode'] is None
+    assert server.run_source('say "again"\n')['stdout'].splitlines()[2] == 'again'
+    assert server.restarts == 0
+
+
+def test_memory_limit_applies_per_run(server):
+    res = server.run_source('say len(list(range(50000000)))\n')
+    assert res['returncode'] == 1 and res['timed_out'] is False
+    assert server.run_source('say 1\n')['returncode'] == 0
+
+
+def test_closed_server_refuses_runs(server):
+    server.close()
+    with pytest.raises(RuntimeError):
+        server.run_source('say 1\n')
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import sandbox
+
+FOREVER = '''
+function forever(n):
+    return forever(n + 1)
+end
+say forever(0)
+'''
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    with sandbox.SandboxPool(size=1, timeout=5.0, max_runs=3) as pool:
+        yield pool
+
+
+def test_pool_results_match_run_file(pool, tmp_path, monkeypatch):
+    path = tmp_path / 'prog.jusu'
+    path.write_text('say 1 + 2\n')
+    monkeypatch.chdir(ROOT)
+    pooled, spawned = pool.run_file(str(path)), sandbox.run_file(str(path))
+    # limit warnings go to a worker's own stderr, not into each result;
+    # wall time and usage differ from run to run
+    assert pooled.keys() == spawned.keys()
+    for key in ('returncode', 'stdout', 'timed_out', 'killed', 'counters'):
+        assert pooled[key] == spawned[key]
+
+    failed = pool.run_source('say missing\n')
+    assert failed['returncode'] == 1 and 'missing' in failed['stdout']
+
+
+def test_worker_is_replaced_after_timeout(pool):
+    res = pool.run_source(FOREVER, timeout=0.5, backend='vm')
+    assert res['timed_out'] is True and res['killed'] is True
+    assert pool.recycled == 1
+    assert pool.run_source('say "again"\n')['stdout'].splitlines()[2] == 'again'
+
+
+def test_worker_is_recycled_after_max_runs(pool):
+    for _ in range(4):
+        assert pool.run_source('say 1\n')['returncode'] == 0
+    assert pool.recycled == 1
+
+
+def test_closed_pool_refuses_runs(pool):
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.run_source('say 1\n')
@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import sandbox
+
+FOREVER = '''
+function forever(n):
+    return forever(n + 1)
+end
+say forever(0)
+'''
+
+
+def test_run_source_writes_no_temp_file(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+    def no_temp_file(*args, **kwargs):
+        raise AssertionError('run_source wrote a temp file')
+    monkeypatch.setattr(tempfile, 'NamedTemporaryFile', no_temp_file)
+    res = sandbox.run_source('say 1 + 2\n')
+    assert res['returncode'] == 0
+    assert res['stdout'].splitlines()[0] == 'Running: <stdin>  (backend=interp)'
+    assert res['stdout'].splitlines()[2] == '3.0'
+
+
+def test_stream_yields_chunks_then_exit(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    chunks = list(sandbox.stream_source('say 1\nsay 2\n', backend='vm'))
+    name, result = chunks[-1]
+    assert name == 'exit'
+    assert (result['returncode'], result['timed_out'], result['killed']) == (0, False, False)
+    stdout = ''.join(text for name, text in chunks[:-1] if name == 'stdout')
+    assert stdout.splitlines()[2:4] == ['1.0', '2.0']
+    assert {name for name, _ in chunks[:-1]} <= {'stdout', 'stderr'}
+
+
+def test_stream_times_out(monkeypatch, tmp_path):
+    monkeypatch.chdir(ROOT)
+    path = tmp_path / 'forever.jusu'
+    path.write_text(FOREVER)
+    name, result = list(sandbox.stream_file(str(path), timeout=0.5, backend='vm'))[-1]
+    assert name == 'exit'
+    assert (result['returncode'], result['timed_out'], result['killed']) == (None, True, True)
+
+
+def test_pool_and_fork_server_take_source(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    with sandbox.SandboxPool(size=1) as pool:
+        assert pool.run_source('say 7\n')['stdout'].splitlines()[2] == '7.0'
+    if hasattr(os, 'fork'):
+        with sandbox.ForkServer() as server:
+            assert server.run_source('say 7\n')['stdout'].splitlines()[2] == '7.0'
@@ -0,0 +1,82 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import sandbox
+
+unix_only = pytest.mark.skipif(not hasattr(os, 'wait4'), reason='resource usage needs os.wait4')
+
+FOREVER = '''
+function forever(n):
+    return forever(n + 1)
+end
+say forever(0)
+'''
+
+FIB = '''
+function fib(n):
+    if n < 2:
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+say fib(8)
+'''
+
+
+@unix_only
+def test_run_reports_usage_and_counters(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    res = sandbox.run_source(FIB, counters=True)
+    assert res['returncode'] == 0
+    assert res['wall_time'] > 0
+    usage = res['usage']
+    assert usage['user_time'] + usage['system_time'] > 0
+    assert usage['max_rss_kb'] > 0
+    assert res['counters']['functions']['fib']['calls'] == 67
+    assert sandbox.run_source('say 1\n')['counters'] is None
+
+
+@unix_only
+def test_cpu_limit_kills_the_child(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    res = sandbox.run_source(FOREVER, timeout=20.0, cpu_limit_s=1, backend='vm')
+    assert res['timed_out'] is False
+    assert res['returncode'] is not None and res['returncode'] < 0
+    assert res['usage']['user_time'] + res['usage']['system_time'] < 5
+
+
+@unix_only
+def test_fork_server_and_pool_report_usage(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    with sandbox.ForkServer(cpu_limit_s=1) as server:
+        res = server.run_source(FIB, counters=True)
+        assert res['usage']['max_rss_kb'] > 0
+        assert res['counters']['functions']['fib']['calls'] == 67
+        assert server.run_source(FOREVER, timeout=20.0, backend='vm')['returncode'] < 0
+        assert server.usage.to_dict()['runs'] == 2
+    with sandbox.SandboxPool(size=1) as pool:
+        res = pool.run_source(FIB, counters=True)
+        assert res['usage'] is not None and res['wall_time'] > 0
+        assert res['counters']['instructions'] > 0
+
+
+def test_summarize_totals_results():
+    results = [
+        {'returncode': 0, 'timed_out': False, 'wall_time': 0.5,
+         'usage': {'user_time': 0.25, 'system_time': 0.125, 'max_rss_kb': 100,
+                   'voluntary_switches': 1, 'involuntary_switches': 2},
+         'counters': {'instructions': 10, 'functions': {'f': {'calls': 3, 'time': 0.0}}}},
+        {'returncode': None, 'timed_out': True, 'wall_time': 1.5, 'usage': None, 'counters': None},
+        sandbox.run_budgeted('say 1\n'),
+    ]
+    summary = sandbox.summarize(results)
+    assert (summary['runs'], summary['failures'], summary['timeouts']) == (3, 1, 1)
+    assert summary['max_wall_time'] == 1.5
+    assert summary['user_time'] == 0.25 and summary['max_rss_kb'] == 100
+    assert (summary['instructions'], summary['calls']) == (10, 3)
@@ -0,0 +1,126 @@
+import pytest
+
+from runtime import ssa
+from runtime.compiler import compile_to_ast
+from runtime.interpreter import Interpreter
+from runtime.register_compiler import compile_to_register_code
+from runtime.register_vm import RegisterVM
+
+
+def _function(src, name):
+    for node in compile_to_ast(src):
+        if node.type == 'FunctionDeclaration' and node.name == name:
+            return node
+    raise AssertionError(name)
+
+
+def test_if_else_merges_locals_with_phi():
+    node = _function('''
+function clamp(x):
+    y = x
+    if x > 10:
+        y = 10
+    else:
+        y = y + 1
+    end
+    return y
+end
+''', 'clamp')
+    fn = ssa.build_function(node)
+    listing = '\n'.join(fn.dump())
+    assert 'phi [' in listing
+    assert [b.name for b in fn.blocks] == ['entry', 'then0', 'else0', 'merge0']
+
+
+def test_constant_branches_are_folded():
+    fn = ssa.build_function(_function('''
+function f(x):
+    a = 2 * 3
+    if a > 5:
+        return x + a
+    end
+    return 0
+end
+''', 'f'))
+    ssa.optimize(fn, param_types=['int'])
+    assert len(fn.blocks) == 1
+    assert fn.return_type() == 'int'
+    assert not [v for v in fn.values() if v.op == 'binop' and v.operator == '>']
+
+
+def test_small_callees_are_inlined():
+    src = '''
+function sq(v):
+    return v * v
+end
+function f(x):
+    return sq(x) + sq(3)
+end
+'''
+    callees = {'sq': ssa.build_function(_function(src, 'sq'))}
+    fn = ssa.build_function(_function(src, 'f'))
+    ssa.optimize(fn, lookup=callees.get, param_types=['float'])
+    assert not [v for v in fn.values() if v.op == 'call']
+    assert [v.value for v in fn.values() if v.op == 'const'] == [9.0]
+
+
+CORPUS = '''
+function clamp(x, lo, hi):
+    if x < lo:
+        return lo
+    end
+    if x > hi:
+        return hi
+    end
+    return x
+end
+function poly(x):
+    y = x * x
+    if y > 50:
+        y = y - 50
+    else:
+        y = y + clamp(x, 0, 5)
+    end
+    return y * 2 + 1
+end
+function fib(n):
+    if n < 2:
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+a = poly(3) + poly(9) + clamp(7, 0, 5)
+b = fib(12)
+y = 100
+c = poly(2) + y
+'''
+
+
+def test_register_vm_matches_interpreter():
+    interp = Interpreter()
+    interp.interpret(compile_to_ast(CORPUS))
+
+    instrs, consts, names, reg_count = compile_to_register_code(compile_to_ast(CORPUS), optimize=True)
+    vm = RegisterVM()
+    vm.run(instrs, consts=consts, names=names, reg_count=reg_count)
+    for name in ('a', 'b', 'c', 'y'):
+        assert vm.globals[name] == interp.variables[name]
+
+
+def test_llvm_lowering_verifies():
+    jit = pytest.importorskip('runtime.jit')
+    if not jit._HAS_LLVM:
+        pytest.skip('llvmlite not available')
+    from llvmlite import ir, binding
+
+    fn = ssa.build_function(_function('''
+function f(a, b):
+    t = a * b
+    return t / b + 1.5
+end
+''', 'f'))
+    ssa.optimize(fn, param_types=['float', 'float'])
+    module = ir.Module(name='t')
+    _, ret_t = jit._lower_ssa_to_llvm(fn, module, ['float', 'float'])
+    assert ret_t == 'float'
+    binding.parse_assembly(str(module)).verify()
@@ -0,0 +1,83 @@
+import subprocess
+import sys
+import os
+
+import pytest
+
+from runtime import pkgmgr, stdlib
+from runtime.compiler import compile_and_run
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def plugins(monkeypatch):
+    loads = []
+
+    class FakeEP:
+        name = 'greeter'
+
+        def load(self):
+            loads.append(self.name)
+            return lambda: type('Greeter', (), {'hello': lambda self, who: 'hello ' + who})()
+
+    monkeypatch.setattr(stdlib, '_plugin_entry_points', {'greeter': FakeEP()})
+    monkeypatch.setattr(stdlib, '_plugins', {})
+    yield loads
+
+
+def test_startup_imports_no_optional_modules():
+    code = ('import sys; from runtime.interpreter import Interpreter; Interpreter(); '
+            'print(sorted(m for m in sys.modules if m in ("runtime.web", "runtime.js", '
+            '"runtime.wasm", "runtime.datascience", "importlib.metadata")))')
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == '[]'
+
+
+def test_lazy_module_loads_on_first_attribute():
+    http = stdlib.get_builtins()['http']
+    assert isinstance(http, stdlib.LazyModule) and not http.loaded
+    assert repr(http) == "<lazy module 'http'>"
+    assert callable(http.get)
+    assert http.loaded and 'WebModule' in repr(http)
+
+
+@pytest.mark.parametrize('backend', ['interp', 'vm', 'regvm'])
+def test_plugins_load_when_first_used(plugins, backend, tmp_path, capsys):
+    src = tmp_path / 'prog.jusu'
+    src.write_text('say "no plugins"\n')
+    compile_and_run(str(src), backend=backend)
+    assert plugins == []
+    src.write_text('say greeter.hello("jusu")\n')
+    compile_and_run(str(src), backend=backend)
+    assert 'hello jusu' in capsys.readouterr().out
+    assert plugins == ['greeter']
+
+
+def test_registered_builtins_win(plugins, monkeypatch):
+    monkeypatch.setitem(pkgmgr._registered, 'greeter', 'registered')
+    assert stdlib.load_plugin('greeter') == 'registered'
+    assert stdlib.load_plugin('missing') is None
+    assert plugins == []
+
+
+class _EntryPoint:
+    def __init__(self, name, obj):
+        self.name, self.obj = name, obj
+
+    def load(self):
+        return lambda: self.obj
+
+
+@pytest.mark.parametrize('backend', ['interp', 'vm', 'regvm'])
+def test_plugins_can_be_functions_and_replace_stdlib_modules(backend, tmp_path, capsys, monkeypatch):
+    fake_math = type('Math', (), {'sqrt': staticmethod(lambda x: 'plugin sqrt')})()
+    monkeypatch.setattr(stdlib, '_plugin_entry_points', {
+        'shout': _EntryPoint('shout', lambda text: text.upper() + '!'),
+        'math': _EntryPoint('math', fake_math),
+    })
+    monkeypatch.setattr(stdlib, '_plugins', {})
+    src = tmp_path / 'prog.jusu'
+    src.write_text('say shout("hi")\nsay math.sqrt(4)\nsay json.dumps(1)\n')
+    compile_and_run(str(src), backend=backend, quiet=True)
+    assert capsys.readouterr().out.splitlines() == ['HI!', 'plugin sqrt', '1.0']
@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from runtime import jit, tiering
+
+from conftest import declare
+
+needs_llvm = pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available")
+
+SRC = '''
+function inc(n):
+    return n + 1
+end
+function dec(n):
+    return n - 1
+end
+'''
+
+
+@pytest.fixture
+def policy(no_code_cache):
+    previous = tiering._policy
+    p = tiering.TieringPolicy()
+    tiering.set_policy(p)
+    yield p
+    tiering.set_policy(previous)
+
+
+@pytest.mark.parametrize('backend', ['interp', 'vm', 'regvm'])
+def test_cold_functions_do_not_import_the_jit(backend):
+    # calls below the threshold leave llvmlite unloaded, even with a code cache
+    code = ('import sys; from runtime.compiler import run_source; '
+            f'run_source({SRC + "say inc(dec(1))"!r}, {backend!r}); '
+            'print(sorted(m for m in sys.modules if m in ("runtime.jit", "llvmlite")))')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, JUSU_JIT='1', JUSU_JIT_THRESHOLD='8')
+    out = subprocess.run([sys.executable, '-c', code], cwd=root, env=env, capture_output=True, text=True,
+                         check=True)
+    assert out.stdout.splitlines() == ['1.0', '[]']
+
+
+def test_policy_from_environment():
+    p = tiering.TieringPolicy.from_env({
+        'JUSU_JIT_THRESHOLD': '3',
+        'JUSU_JIT_MAX_COMPILED': '5',
+        'JUSU_JIT_DISABLE': 'slow, other',
+    })
+    assert p.threshold('jit') == 3 and p.max_compiled == 5
+    assert not p.allows('slow') and p.allows('fast')
+    p.enable('slow')
+    assert p.allows('slow')
+    assert not tiering.TieringPolicy.from_env({'JUSU_JIT': '0'}).allows('fast')
+    only = tiering.TieringPolicy.from_env({'JUSU_JIT_ONLY': 'a,b'})
+    assert only.allows('a') and not only.allows('c')
+
+
+@needs_llvm
+def test_threshold_and_disabled_functions(policy):
+    policy.thresholds['jit'] = 3
+    policy.disable('dec')
+    interp = declare(SRC)
+    inc, dec = interp.variables['inc'], interp.variables['dec']
+    for _ in range(3):
+        inc(1)
+        dec(1)
+    assert inc.profile.specializations and not dec.profile.specializations
+
+
+@needs_llvm
+def test_code_cache_is_probed_at_the_threshold(policy, monkeypatch):
+    probes = []
+    monkeypatch.setattr(jit, 'load_cached_function', lambda node, resolve, sig: probes.append(sig))
+    policy.thresholds['jit'] = 3
+    inc = declare(SRC).variables['inc']
+    for _ in range(2):
+        inc(1)
+    assert probes == []
+    inc(1)
+    assert probes == [('int',)] and inc.profile.specializations
+
+
+@needs_llvm
+def test_max_compiled_functions(policy):
+    policy.max_compiled = 1
+    interp = declare(SRC)
+    for _ in range(10):
+        interp.variables['inc'](1)
+        interp.variables['dec'](1)
+    compiled = [n for n in ('inc', 'dec') if interp.variables[n].profile.specializations]
+    assert compiled == ['inc'] and policy.compiled == 1
+
+
+@needs_llvm
+def test_jit_stats_and_quiet_output(policy, capsys):
+    interp = declare(SRC)
+    inc = interp.variables['inc']
+    for _ in range(12):
+        inc(1)
+    interp.variables['dec'](1)
+    assert capsys.readouterr().out == ''
+
+    inc_stats = tiering.function_stats(inc.profile)
+    assert inc_stats['tier'] == 'jit' and inc_stats['calls'] == 12
+    assert inc_stats['native_calls'] == 5 and inc_stats['compile_time'] > 0
+    assert inc_stats['specializations'] == [['int']]
+    dec_stats = tiering.function_stats(interp.variables['dec'].profile)
+    assert dec_stats['tier'] == 'interp' and dec_stats['native_calls'] == 0
+
+    stats = tiering.jit_stats()
+    assert inc_stats in stats['functions']
+    assert stats['policy']['thresholds'] == {'jit': 8}
+    assert 'inc' in tiering.format_stats(stats)
+
+
+@needs_llvm
+def test_ints_beyond_64_bits_are_interpreted(policy):
+    policy.thresholds['jit'] = 3
+    inc = declare(SRC).variables['inc']
+    for _ in range(3):
+        inc(1)
+    assert ('int',) in inc.profile.specializations
+    # Jusu number literals are floats
+    assert inc(2 ** 63) == 2 ** 63 + 1.0
+    assert inc.map([1, 2 ** 63]) == [2.0, 2 ** 63 + 1.0]
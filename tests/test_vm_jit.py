@@ -0,0 +1,72 @@
+import pytest
+
+from runtime import jit, tiering
+from runtime import bytecode_compiler
+from runtime.compiler import compile_to_ast
+from runtime.register_compiler import compile_to_register_code
+from runtime.register_vm import RegisterVM
+from runtime.vm import VM
+
+pytestmark = [
+    pytest.mark.skipif(not jit._HAS_LLVM, reason="llvmlite not available"),
+    pytest.mark.usefixtures('no_code_cache'),
+]
+
+SRC = '''
+function fib(n):
+    if n < 2:
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+result = fib(15)
+'''
+
+
+def _profiles(runner):
+    return {p.node.name: p for _, p in runner.profiles.values() if p is not None}
+
+
+def test_stack_vm_runs_hot_functions_natively():
+    instrs, consts, names = bytecode_compiler.compile_to_bytecode(compile_to_ast(SRC))
+    runner = VM()
+    runner.run(instrs, consts=consts, names=names)
+    assert runner.globals['result'] == 610
+    profile = _profiles(runner)['fib']
+    assert profile.backend == 'vm' and profile.native_calls > 0
+    assert profile.call_count < 1973  # fib(15) makes 1973 calls when interpreted
+
+
+def test_register_vm_runs_hot_functions_natively():
+    instrs, consts, names, reg_count = compile_to_register_code(compile_to_ast(SRC), optimize=True)
+    runner = RegisterVM()
+    runner.run(instrs, consts=consts, names=names, reg_count=reg_count)
+    assert runner.globals['result'] == 610
+    profile = _profiles(runner)['fib']
+    assert profile.backend == 'regvm' and profile.native_calls > 0
+    assert tiering.function_stats(profile)['tier'] == 'jit'
+
+
+def test_stack_vm_keeps_functions_with_assignments_interpreted():
+    src = '''
+function bump(n):
+    total = n + 1
+    return total
+end
+r = bump(1)
+r = bump(r)
+r = bump(r)
+r = bump(r)
+r = bump(r)
+r = bump(r)
+r = bump(r)
+r = bump(r)
+r = bump(r)
+'''
+    instrs, consts, names = bytecode_compiler.compile_to_bytecode(compile_to_ast(src))
+    runner = VM()
+    runner.run(instrs, consts=consts, names=names)
+    assert runner.globals['r'] == 10
+    # the stack VM stores `total` as a global, which native code would skip
+    assert runner.globals['total'] == 10
+    assert not _profiles(runner)
@@ -0,0 +1,84 @@
+"""Per-call overhead of JIT-compiled functions.
+
+Calls a trivial native `add(a, b)` through each layer:
+- ctypes: the CFUNCTYPE object alone
+- generic wrapper: the closure compiled functions used to have (len check,
+  guard loop over zip(args, accepts), cfunc(*args))
+- generated wrapper: the per-signature wrapper with the guard inlined
+- trampoline: `wrapper.call`, a CPython builtin that unboxes, guards and calls
+  the native code without ctypes
+- Jusu function: the interpreter's function object once `add` is native
+"""
+import os
+import sys
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import jit, tiering
+from runtime.compiler import compile_to_ast
+from runtime.interpreter import Interpreter
+
+SRC = '''
+function add(a, b):
+    return a + b
+end
+'''
+
+
+def generic_wrapper(cfunc, param_types):
+    accepts = [jit._ACCEPTS[t] for t in param_types]
+
+    def wrapper(*args):
+        if len(args) != len(param_types):
+            raise TypeError("wrong number of arguments")
+        for a, ok in zip(args, accepts):
+            if type(a) not in ok:
+                raise jit.JITDeopt()
+        return cfunc(*args)
+
+    return wrapper
+
+
+def per_call_ns(fn, number=300_000):
+    best = min(timeit.repeat(lambda: fn(20, 22), number=number, repeat=3))
+    return best / number * 1e9
+
+
+def main():
+    if not jit._HAS_LLVM:
+        print('llvmlite not available')
+        return
+    jit.set_code_cache(None)
+    jit.set_background_compiler(None)
+    tiering.set_policy(tiering.TieringPolicy(thresholds={'jit': 1}))
+    node = [n for n in compile_to_ast(SRC) if n.type == 'FunctionDeclaration'][0]
+    wrapper = jit.compile_simple_function(node, signature=('int', 'int'))
+    module = jit.ir.Module(name='bench_add')
+    jit._lower_function(node, module, 'bench_add', param_types=['int', 'int'])
+    cfunc = jit._compile_ir_to_callable(module, 'bench_add', [jit._CTYPES['int']] * 2, jit._CTYPES['int'])
+
+    interp = Interpreter()
+    for stmt in compile_to_ast(SRC):
+        interp.execute(stmt)
+    jusu_add = interp.variables['add']
+    jusu_add(1, 2)
+
+    baseline = per_call_ns(lambda a, b: None)
+    rows = [
+        ('ctypes', cfunc),
+        ('generic wrapper', generic_wrapper(cfunc, ['int', 'int'])),
+        ('generated wrapper', wrapper),
+        ('trampoline', wrapper.call),
+        ('Jusu function', jusu_add),
+    ]
+    print(f"{'entry point':<18} {'ns/call':>8}   (empty lambda: {baseline:.0f} ns)")
+    for label, fn in rows:
+        assert fn(20, 22) == 42
+        print(f"{label:<18} {per_call_ns(fn):>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
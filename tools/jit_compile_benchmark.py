@@ -0,0 +1,88 @@
+"""Time-to-compile for many small functions through runtime.jit.
+
+Compares three strategies for 100 small numeric functions:
+- engine per function: a fresh target machine and MCJIT engine per function
+  (how runtime/jit used to compile)
+- shared engine: one module per function added to the process-wide engine
+- batched: all functions lowered into one module added to the shared engine once
+
+Every strategy targets the host CPU and runs the same LLVM pass pipeline at
+one pinned optimization level (`--opt`, default 2), and the code cache is
+disabled, so each run measures real compilation rather than cache hits.
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+
+
+def build_functions(count=100):
+    lines = []
+    for i in range(count):
+        lines.append(f'function f{i}(a, b):')
+        lines.append(f'    t = a * {i + 1} + b')
+        lines.append(f'    return t - a * b + {i}')
+        lines.append('end')
+    return [n for n in compile_to_ast('\n'.join(lines) + '\n') if n.type == 'FunctionDeclaration']
+
+
+def engine_per_function(nodes, opt_level):
+    from llvmlite import binding, ir
+    target = binding.Target.from_default_triple()
+    cpu, features = binding.get_host_cpu_name(), binding.get_host_cpu_features().flatten()
+    engines = []
+    for node in nodes:
+        module = ir.Module(name=node.name)
+        spec = jit._lower_function(node, module, node.name)
+        tm = target.create_target_machine(cpu=cpu, features=features, opt=opt_level)
+        module.triple = tm.triple
+        module.data_layout = str(tm.target_data)
+        mod = binding.parse_assembly(str(module))
+        mod.verify()
+        jit._optimize_module(mod, tm, opt_level)
+        engine = binding.create_mcjit_compiler(mod, tm)
+        engine.finalize_object()
+        assert engine.get_function_address(node.name) and spec
+        engines.append(engine)
+    return engines
+
+
+def shared_engine(nodes, opt_level):
+    return [jit.compile_simple_function(node) for node in nodes]
+
+
+def batched(nodes, opt_level):
+    return jit.compile_functions(nodes)
+
+
+def main(count=100, opt_level=jit.DEFAULT_OPT_LEVEL):
+    if not jit._HAS_LLVM:
+        print('llvmlite not available')
+        return
+    jit.set_code_cache(None)
+    nodes = build_functions(count)
+    print(f"O{opt_level}, code cache disabled")
+    for label, fn in (('engine per function', engine_per_function),
+                      ('shared engine', shared_engine),
+                      ('batched module', batched)):
+        jit.set_engine(jit.JITEngine(opt_level=opt_level))
+        t0 = time.perf_counter()
+        result = fn(nodes, opt_level)
+        dt = time.perf_counter() - t0
+        print(f"{label:<20} {count} functions: {dt * 1000:8.1f} ms  ({dt / count * 1000:.2f} ms/function)")
+        del result
+
+
+if __name__ == '__main__':
+    import argparse
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument('count', nargs='?', type=int, default=100)
+    p.add_argument('--opt', type=int, default=jit.DEFAULT_OPT_LEVEL, choices=jit.OPT_LEVELS)
+    args = p.parse_args()
+    main(args.count, args.opt)
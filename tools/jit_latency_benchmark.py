@@ -0,0 +1,72 @@
+"""Per-call latency of a function while it becomes hot, with and without
+background JIT compilation.
+
+With synchronous compilation the call that crosses the JIT threshold pays for
+the whole llvmlite compile; with the background compiler every call stays on
+the interpreter until the native entry point is swapped in. Lowering to LLVM IR
+is Python code that shares the GIL with the interpreter, so calls made while
+the worker runs can still wait up to one thread switch interval (5 ms by default).
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+from runtime.interpreter import Interpreter
+
+SRC = '''
+function kernel(x, y):
+    t = x * y + 3
+    if t > 100:
+        t = t - x
+    else:
+        t = t + y
+    end
+    return t * 2
+end
+'''
+
+
+def run(calls=200):
+    interp = Interpreter()
+    for node in compile_to_ast(SRC):
+        interp.execute(node)
+    kernel = interp.variables['kernel']
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(calls):
+            t0 = time.perf_counter()
+            kernel(i, 7)
+            latencies.append(time.perf_counter() - t0)
+        background = jit.get_background_compiler()
+        if background is not None:
+            background.drain()
+    return latencies
+
+
+def main():
+    if not jit._HAS_LLVM:
+        print('llvmlite not available')
+        return
+    jit.set_code_cache(None)
+    for label, compiler in (('synchronous', None), ('background', jit.BackgroundCompiler())):
+        jit.set_background_compiler(compiler)
+        jit.reset_engine()
+        latencies = sorted(run())
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[int(len(latencies) * 0.99)]
+        print(f"{label:<12} p50={p50 * 1e6:8.1f} us  p99={p99 * 1e6:8.1f} us  max={latencies[-1] * 1e3:7.2f} ms")
+        if compiler is not None:
+            print(f"{'':<12} {compiler.metrics()}")
+            compiler.shutdown()
+
+
+if __name__ == '__main__':
+    main()
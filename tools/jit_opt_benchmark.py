@@ -0,0 +1,82 @@
+"""Compile time vs run time of JIT code at each LLVM optimization level.
+
+For every level O0-O3 a fresh engine compiles a set of kernels (recursive
+`fib`, a call-heavy `collatz` and 50 small arithmetic functions) and then
+runs the recursive kernels natively. Higher levels spend more time in
+llvmlite but should run the native code faster; O2 is the default
+(`JUSU_JIT_OPT`).
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+
+KERNELS = '''
+function fib(n):
+    if n < 2:
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+function collatz(n, steps):
+    if n == 1:
+        return steps
+    end
+    half = n / 2
+    if half * 2 == n:
+        return collatz(half, steps + 1)
+    end
+    return collatz(3 * n + 1, steps + 1)
+end
+'''
+
+
+def build_functions(count=50):
+    lines = [KERNELS]
+    for i in range(count):
+        lines.append(f'function f{i}(a, b):')
+        lines.append(f'    t = a * {i + 1} + b')
+        lines.append(f'    if t > {i * 3}:')
+        lines.append('        t = t - b * 2')
+        lines.append('    end')
+        lines.append(f'    return t * t - a + {i}')
+        lines.append('end')
+    return [n for n in compile_to_ast('\n'.join(lines) + '\n') if n.type == 'FunctionDeclaration']
+
+
+def bench(level, nodes):
+    jit.set_engine(jit.JITEngine(opt_level=level))
+    t0 = time.perf_counter()
+    compiled = jit.compile_functions(nodes, signatures={'collatz': ('float', 'int')})
+    compile_time = time.perf_counter() - t0
+
+    fib, collatz = compiled['fib'], compiled['collatz']
+    t0 = time.perf_counter()
+    fib(27)
+    for n in range(1, 2000):
+        collatz(float(n), 0)
+    run_time = time.perf_counter() - t0
+    return len(compiled), compile_time, run_time
+
+
+def main():
+    if not jit._HAS_LLVM:
+        print('llvmlite not available')
+        return
+    jit.set_code_cache(None)
+    nodes = build_functions()
+    print(f"host cpu: {jit.binding.get_host_cpu_name()}")
+    print(f"{'level':<6} {'functions':>9} {'compile ms':>11} {'run ms':>9}")
+    for level in jit.OPT_LEVELS:
+        count, compile_time, run_time = bench(level, nodes)
+        print(f"O{level:<5} {count:>9} {compile_time * 1000:>11.1f} {run_time * 1000:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Throughput of JIT kernels over arrays: per-element calls vs the vector entry point.
+
+Per-element calls go through the Python wrapper and ctypes for every element;
+`compile_vector_function` runs the whole loop in native code (vectorized by
+LLVM at O2 and above). Input is `array('d')`, or plain lists to include the
+conversion into a buffer.
+"""
+import array
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import jit
+from runtime.compiler import compile_to_ast
+
+SRC = '''
+function poly(x, y):
+    return x * x * 2.5 + y * 3.5 - 1.5
+end
+function clamp(x):
+    if x < 0.5:
+        return 0.5
+    end
+    if x > 100.5:
+        return 100.5
+    end
+    return x
+end
+'''
+
+
+def best(fn, repeat=5):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main(n=200_000):
+    if not jit._HAS_LLVM:
+        print('llvmlite not available')
+        return
+    jit.set_code_cache(None)
+    nodes = {node.name: node for node in compile_to_ast(SRC) if node.type == 'FunctionDeclaration'}
+    xs = array.array('d', (i * 0.001 for i in range(n)))
+    ys = array.array('d', (1.0 - i * 0.002 for i in range(n)))
+    print(f"{n} elements, O{jit.get_engine().opt_level} on {jit.get_engine().cpu}")
+    print(f"{'kernel':<8} {'per-element':>12} {'vector':>10} {'vector(list)':>13} {'speedup':>8}")
+    for name, args in (('poly', (xs, ys)), ('clamp', (xs,))):
+        sig = ('float',) * len(args)
+        scalar = jit.compile_simple_function(nodes[name], signature=sig)
+        vector = jit.compile_vector_function(nodes[name], signature=sig)
+        lists = [a.tolist() for a in args]
+        per_element = best(lambda: [scalar(*e) for e in zip(*args)], repeat=2)
+        whole = best(lambda: vector(*args))
+        from_lists = best(lambda: vector(*lists))
+        print(f"{name:<8} {per_element * 1e3:>10.1f}ms {whole * 1e3:>8.2f}ms "
+              f"{from_lists * 1e3:>11.2f}ms {per_element / whole:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Measure RegisterVM dispatch throughput (instructions/second) on arithmetic-heavy code.
+
+The kernel is straight-line, so the number of executed instructions is known
+statically: the top-level program once plus the kernel body per call.
+"""
+import os
+import sys
+import time
+import statistics
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime.compiler import compile_to_ast
+from runtime.register_compiler import compile_to_register_code
+from runtime.register_vm import RegisterVM
+
+
+def build_program(calls=5000):
+    lines = [
+        'function kernel(a, b, c):',
+        '    return (a * b + c) - (a - b) * c + (a + b + c) * (a - c) - b * b',
+        'end',
+        's = 0',
+    ]
+    for i in range(calls):
+        lines.append(f's = s + kernel({i % 10}, {i % 7}, {i % 13})')
+    lines.append('say s')
+    return '\n'.join(lines) + '\n'
+
+
+def executed_instructions(instrs, consts, calls):
+    kernel = next(c for c in consts if isinstance(c, tuple) and c and c[0] == 'regcode')
+    # +1 for the HALT appended by the decoder
+    return len(instrs) + 1 + calls * len(kernel[1])
+
+
+def main(calls=5000, runs=5):
+    ast = compile_to_ast(build_program(calls))
+    instrs, consts, names, reg_count = compile_to_register_code(ast)
+    total = executed_instructions(instrs, consts, calls)
+
+    times = []
+    for _ in range(runs):
+        vm = RegisterVM()
+        vm.globals['print'] = lambda *a: None
+        t0 = time.perf_counter()
+        vm.run(instrs, consts=consts, names=names, reg_count=reg_count)
+        times.append(time.perf_counter() - t0)
+
+    best = min(times)
+    print(f"executed instructions per run: {total}")
+    print(f"times: {[round(t, 4) for t in times]}  mean: {statistics.mean(times):.4f}s")
+    print(f"throughput: {total / best / 1e6:.2f} M instructions/s (best run)")
+
+
+if __name__ == '__main__':
+    main()
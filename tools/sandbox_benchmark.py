@@ -0,0 +1,59 @@
+"""Throughput of sandboxed runs (runs/second) for short scripts.
+
+Compares spawning `python -m runtime._sandbox_child` per run
+(`sandbox.run_file`) with a pool of pre-started workers (`SandboxPool`),
+each driven by as many client threads as the pool has workers.
+"""
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import sandbox
+
+SCRIPT = '''
+function fib(n):
+    if n < 2:
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+say fib(10)
+'''
+
+
+def throughput(run, path, runs, workers):
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(workers) as executor:
+        results = list(executor.map(lambda _: run(path), range(runs)))
+    elapsed = time.perf_counter() - t0
+    failed = sum(r['returncode'] != 0 for r in results)
+    if failed:
+        print(f"  warning: {failed} of {runs} runs failed")
+    return runs / elapsed
+
+
+def main(runs=40, workers=2):
+    os.chdir(ROOT)  # the children import `runtime` from here
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.jusu')
+        with open(path, 'w') as f:
+            f.write(SCRIPT)
+        spawn = throughput(sandbox.run_file, path, runs, workers)
+        print(f"spawn per run (run_file):  {spawn:8.1f} runs/s")
+        t0 = time.perf_counter()
+        with sandbox.SandboxPool(size=workers) as pool:
+            pooled = throughput(pool.run_file, path, runs * 10, workers)
+        total = time.perf_counter() - t0
+        print(f"SandboxPool(size={workers}):     {pooled:8.1f} runs/s  "
+              f"({total:.2f}s including worker start-up)")
+        print(f"speedup: {pooled / spawn:.1f}x")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,63 @@
+"""Latency percentiles of one sandboxed run of a short script.
+
+Compares spawning `python -m runtime._sandbox_child` per run
+(`sandbox.run_file`), forking each run from a warm zygote (`ForkServer`)
+and reusing a pre-started worker (`SandboxPool`, no per-run isolation).
+Runs are sequential, so each figure is end-to-end latency for one caller.
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from runtime import sandbox
+
+SCRIPT = '''
+function fib(n):
+    if n < 2:
+        return n
+    end
+    return fib(n - 1) + fib(n - 2)
+end
+say fib(10)
+'''
+
+
+def latencies(run, path, runs):
+    run(path)  # warm-up
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        res = run(path)
+        samples.append(time.perf_counter() - t0)
+        if res['returncode'] != 0:
+            print(f"  warning: run failed: {res['stderr'].strip()}")
+    return sorted(samples)
+
+
+def report(label, samples):
+    def pct(p):
+        return samples[min(len(samples) - 1, int(len(samples) * p))] * 1e3
+    print(f"{label:<22} p50={pct(0.50):8.2f} ms  p90={pct(0.90):8.2f} ms  "
+          f"p99={pct(0.99):8.2f} ms  max={samples[-1] * 1e3:8.2f} ms")
+
+
+def main(runs=50):
+    os.chdir(ROOT)  # the children import `runtime` from here
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.jusu')
+        with open(path, 'w') as f:
+            f.write(SCRIPT)
+        report('run_file (spawn)', latencies(sandbox.run_file, path, runs))
+        with sandbox.ForkServer() as server:
+            report('ForkServer (fork)', latencies(server.run_file, path, runs))
+        with sandbox.SandboxPool(size=1) as pool:
+            report('SandboxPool (reuse)', latencies(pool.run_file, path, runs))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
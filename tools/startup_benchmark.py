@@ -0,0 +1,70 @@
+"""Startup cost of `jusu run` for a hello-world program and one calling a function.
+
+Prints the wall time of whole runs (best and median of several processes,
+next to a bare `python -c pass`) and a `python -X importtime` breakdown of
+the slowest imports of the last program, so regressions like an eagerly
+imported optional dependency (llvmlite before any function is hot) show up
+by name. Pass a .jusu file to measure another program.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+JUSU = os.path.join(ROOT, 'compiler', 'jusu.py')
+
+PROGRAMS = {
+    'hello.jusu': 'say "hi"\n',
+    'one_call.jusu': 'function inc(x):\n    return x + 1\nend\nsay inc(1)\n',
+}
+
+
+def wall_times(cmd, runs):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    return min(times), statistics.median(times)
+
+
+def import_times(cmd):
+    """(cumulative us, self us, module) per import of one run, slowest first."""
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + cmd[1:], check=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), int(self_us), name.rstrip()))
+    return sorted(rows, reverse=True)
+
+
+def main(path=None, runs=10, top=15):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [path] if path is not None else []
+        if path is None:
+            for name, source in PROGRAMS.items():
+                paths.append(os.path.join(tmp, name))
+                with open(paths[-1], 'w') as f:
+                    f.write(source)
+        base_best, base_median = wall_times([sys.executable, '-c', 'pass'], runs)
+        print(f"python -c pass: best {base_best * 1e3:.1f} ms, median {base_median * 1e3:.1f} ms")
+        for path in paths:
+            cmd = [sys.executable, JUSU, 'run', path]
+            best, median = wall_times(cmd, runs)
+            print(f"jusu run {os.path.basename(path)}: best {best * 1e3:.1f} ms, median {median * 1e3:.1f} ms")
+        rows = import_times(cmd)
+        total = sum(self_us for _, self_us, _ in rows)
+        print(f"\n{len(rows)} modules imported, {total / 1e3:.1f} ms total")
+        print(f"{'cumulative':>10} {'self':>8}  module")
+        for cumulative, self_us, name in rows[:top]:
+            print(f"{cumulative / 1e3:>8.1f}ms {self_us / 1e3:>6.1f}ms  {name}")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2])